@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+DFIR Pipeline Benchmarks
+Throughput and latency of the Volatility, MISP and case-study paths on synthetic evidence
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+sys.path.insert(0, os.path.join(CODE_DIR, "misp"))
+sys.path.insert(0, os.path.join(CODE_DIR, "volatility"))
+sys.path.insert(0, os.path.join(CODE_DIR, "end-to-end-demo"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dfir.memscan import scan_memory
+from dfir.ioc import extract_iocs, iocs_of_type
+from dfir.feedmatch import FeedMatcher, compile_feed, load_feed, sweep_memory
+from dfir.pcapng import read_capture
+from dfir.scheduler import captured_stdout
+from dfir import icsflows, timeline, custody, yarascan, proccarve, pagemap, entropy
+import misp_demo
+import volatility_demo
+import complete_case_study
+import synthetic
+
+DEFAULT_IMAGE_MB = 256
+DEFAULT_PACKETS = 200000
+DEFAULT_FEED_ENTRIES = 100000
+DEFAULT_PROCESSES = 500
+DEFAULT_REPEAT = 3
+
+GROUPS = ["volatility", "misp", "case-study"]
+
+def generate(workdir, config):
+    """Create the synthetic evidence for a config, reusing files from an identical earlier run"""
+    data_dir = os.path.join(workdir, "benchmark_data")
+    meta_path = os.path.join(data_dir, "config.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["config"] == config:
+            return meta["data"]
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+
+    print(f"Generating {config['image_mb']} MB image, {config['packets']} packets, "
+          f"{config['feed_entries']} feed entries (seed {config['seed']})...")
+    image = os.path.join(data_dir, "synthetic-20230622-143255.raw")
+    planted = synthetic.make_memory_image(image, config["image_mb"], config["seed"])
+    processes = synthetic.plant_processes(image, config["processes"], config["seed"], planted)
+    feed = os.path.join(data_dir, "ioc_feed.txt")
+    feed_planted = synthetic.make_ioc_feed(feed, config["feed_entries"], planted, config["seed"])
+    pcap = os.path.join(data_dir, "capture.pcapng")
+    synthetic.make_pcapng(pcap, config["packets"], config["seed"])
+    rules = os.path.join(data_dir, "synthetic.yar")
+    synthetic.make_yara_rules(rules)
+    data = {"image": image, "feed": feed, "pcap": pcap, "rules": rules, "planted": planted,
+            "feed_planted": feed_planted, "processes": processes}
+    with open(meta_path, "w") as f:
+        json.dump({"config": config, "data": data}, f)
+    return data
+
+def clear_caches():
+    """Drop on-disk caches so the next run is cold"""
+    shutil.rmtree("datasets/cache", ignore_errors=True)
+
+def planted_recall(analysis, planted):
+    """Fraction of planted artifacts the scan reported at their offsets"""
+    found = {(offset, text) for hits in analysis.values() for offset, text in hits}
+    hits = sum(1 for offset, category, text in planted if (offset, text) in found)
+    return hits / len(planted) if planted else 1.0
+
+# Each benchmark returns (amount processed, unit, extra metrics) for one run
+
+def bench_scan_memory(ctx):
+    analysis = scan_memory(ctx["image"], limits=None, workers=ctx["workers"])
+    return ctx["image_bytes"], "bytes", {"planted_recall": planted_recall(analysis, ctx["planted"])}
+
+def bench_extract_iocs_cold(ctx):
+    clear_caches()
+    extraction = extract_iocs(ctx["image"], workers=ctx["workers"])
+    return ctx["image_bytes"], "bytes", {"iocs": len(extraction.iocs)}
+
+def bench_extract_iocs_cached(ctx):
+    extract_iocs(ctx["image"], workers=ctx["workers"])
+    return ctx["image_bytes"], "bytes", {}
+
+def bench_compile_feed(ctx):
+    matcher = FeedMatcher(load_feed(ctx["feed"]))
+    return ctx["feed_entries"], "entries", {"patterns": len(matcher.keys)}
+
+def bench_feed_sweep(ctx):
+    hits = sweep_memory(ctx["image"], compile_feed(ctx["feed"], cache_dir=None), ctx["workers"])
+    distinct = len({value for _, _, value in hits})
+    return ctx["image_bytes"], "bytes", {"hits": len(hits), "distinct_planted_found": distinct,
+                                         "planted_in_feed": ctx["feed_planted"]}
+
+def bench_page_map(ctx):
+    pages, zero, duplicate, unscanned = pagemap.classify_pages(ctx["image"], ctx["workers"]).summary()
+    return ctx["image_bytes"], "bytes", {"zero_pages": zero, "duplicate_pages": duplicate,
+                                         "unscanned_bytes": unscanned}
+
+def bench_block_entropy(ctx):
+    emap = entropy.measure(ctx["image"], ctx["workers"])
+    zero, low, mid, high = entropy.summary(emap)
+    return ctx["image_bytes"], "bytes", {"high_blocks": high, "regions": len(entropy.high_entropy_regions(emap))}
+
+def bench_carve_processes(ctx):
+    carved = proccarve.carve_processes(ctx["image"], ctx["workers"])
+    found = {(process.offset, process.pid, process.ppid, process.name) for process in carved}
+    planted = [tuple(p[:4]) for p in ctx["processes"]]
+    recall = sum(1 for process in planted if process in found) / len(planted) if planted else 1.0
+    return ctx["image_bytes"], "bytes", {"processes": len(carved), "planted_recall": recall}
+
+def bench_yara_scan(ctx):
+    if not yarascan.available():
+        return 0, "bytes", {"skipped": "yara-python not installed"}
+    matches = yarascan.scan_memory(ctx["image"], yarascan.compile_rules(ctx["rules"], cache_dir=None), ctx["workers"])
+    found = {match.offset for match in matches}
+    processes = [offset for offset, category, _ in ctx["planted"] if category == "processes"]
+    recall = sum(1 for offset in processes if offset in found) / len(processes) if processes else 1.0
+    return ctx["image_bytes"], "bytes", {"matches": len(matches), "planted_recall": recall}
+
+def bench_volatility_report(ctx):
+    clear_caches()
+    if os.path.exists(pagemap.sidecar_path(ctx["image"])):
+        os.remove(pagemap.sidecar_path(ctx["image"]))
+    with captured_stdout():
+        # Synthetic images hold no kernel, so the Volatility plugins are left out
+        volatility_demo.run_real_volatility_analysis(ctx["image"], ctx["workers"], feed=ctx["feed"], rules=ctx["rules"],
+                                                     plugins=())
+    return ctx["image_bytes"], "bytes", {}
+
+def bench_ip_triage(ctx):
+    ips = ctx["ips"]
+    counts = misp_demo.ip_index().triage(ips)
+    return len(ips), "addresses", {label: count for label, count in counts.items()}
+
+def bench_misp_report(ctx):
+    clear_caches()
+    misp_demo._reputation_cache = None
+    with captured_stdout():
+        misp_demo.run_real_misp_demo(ctx["extraction"])
+    return 1, "reports", {}
+
+def bench_read_capture(ctx):
+    stats = read_capture(ctx["pcap"], workers=ctx["workers"])
+    return ctx["pcap_bytes"], "bytes", {"packets": stats.packets, "flows": len(stats.flows)}
+
+def bench_ics_table(ctx):
+    table = icsflows.build_ics_table(ctx["pcap"], workers=ctx["workers"], cache_dir=None)
+    return ctx["pcap_bytes"], "bytes", {"operations": len(table)}
+
+def bench_evidence_hash(ctx):
+    custody.hash_file(ctx["image"])
+    return ctx["image_bytes"], "bytes", {}
+
+def bench_timeline(ctx):
+    table, stats = ctx["ics_table"], ctx["capture_stats"]
+    index = timeline.TimelineIndex.from_streams(timeline.ics_events(table), timeline.flow_events(stats))
+    anchors = table.loc[icsflows.writes(table), "timestamp"].to_numpy()
+    started = time.perf_counter()
+    index.count_around(anchors, 5, ["network"])
+    return len(index), "events", {"query_seconds": time.perf_counter() - started, "anchors": len(anchors)}
+
+def bench_case_study(ctx):
+    stage_case_study(ctx)
+    clear_caches()
+    with captured_stdout():
+        complete_case_study.run_complete_case_study()
+    return ctx["image_bytes"] + ctx["pcap_bytes"], "bytes", {}
+
+def stage_case_study(ctx):
+    """Link the synthetic evidence into the DFRWS layout the case study expects"""
+    for source, target in ((ctx["image"], complete_case_study.DFRWS_MEMORY_DUMP),
+                           (ctx["pcap"], complete_case_study.NETWORK_TRACE)):
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.symlink(source, target)
+
+BENCHMARKS = [
+    ("volatility", "page_map", bench_page_map),
+    ("volatility", "block_entropy", bench_block_entropy),
+    ("volatility", "carve_processes", bench_carve_processes),
+    ("volatility", "scan_memory", bench_scan_memory),
+    ("volatility", "extract_iocs_cold", bench_extract_iocs_cold),
+    ("volatility", "extract_iocs_cached", bench_extract_iocs_cached),
+    ("volatility", "compile_feed", bench_compile_feed),
+    ("volatility", "feed_sweep", bench_feed_sweep),
+    ("volatility", "yara_scan", bench_yara_scan),
+    ("volatility", "volatility_report", bench_volatility_report),
+    ("misp", "ip_triage", bench_ip_triage),
+    ("misp", "misp_report", bench_misp_report),
+    ("case-study", "read_capture", bench_read_capture),
+    ("case-study", "ics_table", bench_ics_table),
+    ("case-study", "evidence_hash", bench_evidence_hash),
+    ("case-study", "timeline", bench_timeline),
+    ("case-study", "complete_case_study", bench_case_study),
+]
+
+def git_commit():
+    """Commit the benchmarked code is at, with a -dirty suffix for uncommitted changes"""
+    try:
+        commit = subprocess.run(["git", "-C", CODE_DIR, "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "-C", CODE_DIR, "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, timeout=10).stdout.strip()
+        return commit + ("-dirty" if dirty else "") if commit else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def measure(function, ctx, repeat):
+    """Run a benchmark repeat times; throughput uses the median run"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        amount, unit, extra = function(ctx)
+        runs.append(time.perf_counter() - started)
+    median = statistics.median(runs)
+    result = {"unit": unit, "amount": amount, "runs": runs, "min": min(runs), "median": median,
+              "throughput": amount / median if median else None, "extra": extra}
+    if unit == "bytes":
+        result["mb_per_s"] = amount / (1024 * 1024) / median if median else None
+    return result
+
+def prepare_context(data, config):
+    """Inputs shared by the benchmarks, including results some of them build on"""
+    ctx = dict(data, workers=config["workers"], feed_entries=config["feed_entries"])
+    ctx["image_bytes"] = os.path.getsize(data["image"])
+    ctx["pcap_bytes"] = os.path.getsize(data["pcap"])
+    ctx["planted"] = [tuple(p) for p in data["planted"]]
+    ctx["extraction"] = extract_iocs(data["image"], workers=config["workers"])
+    ips = [text for _, category, text in ctx["planted"] if category == "ips"]
+    ips += [ioc.value for ioc in iocs_of_type(ctx["extraction"].iocs, "ip")]
+    ctx["ips"] = (ips * (1000000 // max(len(ips), 1) + 1))[:1000000]
+    ctx["ics_table"] = icsflows.build_ics_table(data["pcap"], workers=config["workers"], cache_dir=None)
+    ctx["capture_stats"] = read_capture(data["pcap"], workers=config["workers"])
+    return ctx
+
+def print_comparison(results, baseline_path):
+    """Median latency of each benchmark against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path} ({baseline.get('commit')}):")
+    if baseline.get("config") != results["config"]:
+        print("  [WARNING] different synthetic evidence config; compare rates, not times")
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<24} new")
+            continue
+        change = (before["median"] / result["median"] - 1) * 100 if result["median"] else 0.0
+        print(f"  {name:<24} {before['median']:8.3f}s -> {result['median']:8.3f}s  "
+              f"({'faster' if change >= 0 else 'slower'} {abs(change):.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DFIR pipelines on synthetic evidence")
+    parser.add_argument("--image-mb", type=float, default=DEFAULT_IMAGE_MB, help="synthetic memory image size")
+    parser.add_argument("--packets", type=int, default=DEFAULT_PACKETS, help="packets in the synthetic capture")
+    parser.add_argument("--feed-entries", type=int, default=DEFAULT_FEED_ENTRIES, help="IOC feed size")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="EPROCESS structures planted in the image")
+    parser.add_argument("--seed", type=int, default=0, help="seed for all generated evidence")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per benchmark")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scan worker processes")
+    parser.add_argument("--group", action="append", choices=GROUPS, help="only run these groups")
+    parser.add_argument("--only", action="append", help="only run benchmarks with these names")
+    parser.add_argument("--workdir", help="keep generated evidence and caches here between runs")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    config = {"image_mb": args.image_mb, "packets": args.packets, "feed_entries": args.feed_entries,
+              "processes": args.processes, "seed": args.seed, "workers": args.workers}
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="dfir-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # All relative evidence and cache paths resolve inside the work directory
+    os.chdir(workdir)
+
+    try:
+        data = generate(workdir, config)
+        ctx = prepare_context(data, config)
+        results = {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+                   "python": platform.python_version(), "machine": platform.machine(),
+                   "cpus": os.cpu_count(), "config": config, "results": {}}
+        for group, name, function in BENCHMARKS:
+            if (args.group and group not in args.group) or (args.only and name not in args.only):
+                continue
+            result = measure(function, ctx, args.repeat)
+            result["group"] = group
+            results["results"][name] = result
+            rate = f"{result['mb_per_s']:.1f} MB/s" if "mb_per_s" in result else \
+                   f"{result['throughput']:.0f} {result['unit']}/s"
+            print(f"{group:<11} {name:<24} median {result['median']:8.3f}s  min {result['min']:8.3f}s  {rate}")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    if baseline:
+        print_comparison(results, baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Synthetic Evidence Generator
+Deterministic memory images, pcapng captures and IOC feeds with planted, known artifacts
+"""
+
+import hashlib
+import os
+import random
+import struct
+
+import numpy as np
+
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# One planted artifact every PLANT_INTERVAL bytes on average
+PLANT_INTERVAL = 64 * 1024
+
+EXE_NAMES = ['svchost.exe', 'lsass.exe', 'explorer.exe', 'powershell.exe', 'mimikatz.exe',
+             'rundll32.exe', 'plc_loader.exe', 'elevator_hmi.exe', 'psexec.exe', 'nc.exe']
+FILE_PATHS = ['C:\\Windows\\System32\\drivers\\etc\\hosts', 'C:\\Users\\Public\\payload.dll',
+              'C:\\ProgramData\\Siemens\\Step7\\project.s7p', 'C:\\Windows\\Temp\\elev.bat']
+REGISTRY_KEYS = ['HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run',
+                 'HKEY_CURRENT_USER\\Software\\Classes\\ms-settings\\shell\\open\\command',
+                 'SYSTEM\\CurrentControlSet\\Services\\PlcBridge']
+TLDS = ['com', 'net', 'org', 'ru', 'io', 'xyz']
+
+def _rng(seed, *parts):
+    """Independent, reproducible generator for one part of an artifact"""
+    return np.random.default_rng([seed, *parts])
+
+def planted_domain(seed, i):
+    return f"c2-{seed}-{i}.{TLDS[i % len(TLDS)]}"
+
+def planted_hash(seed, i):
+    return hashlib.sha256(f"{seed}:{i}".encode()).hexdigest()
+
+def planted_ip(seed, i):
+    r = random.Random(seed * 1000003 + i)
+    if (i // 6) % 3 == 0:
+        return f"192.168.{r.randint(0, 255)}.{r.randint(1, 254)}"
+    return f"{r.randint(11, 223)}.{r.randint(0, 255)}.{r.randint(0, 255)}.{r.randint(1, 254)}"
+
+def planted_artifact(seed, i):
+    """(category, text) of the i-th planted artifact"""
+    kind = i % 6
+    if kind == 0:
+        return 'processes', EXE_NAMES[i % len(EXE_NAMES)]
+    if kind == 1:
+        return 'ips', planted_ip(seed, i)
+    if kind == 2:
+        return 'files', FILE_PATHS[i % len(FILE_PATHS)]
+    if kind == 3:
+        return 'registry', REGISTRY_KEYS[i % len(REGISTRY_KEYS)]
+    if kind == 4:
+        return 'domains', planted_domain(seed, i)
+    return 'hashes', planted_hash(seed, i)
+
+def _memory_block(seed, index, size, plant_from):
+    """One block of the image: zero pages, random pages and text pages, plus planted artifacts"""
+    rng = _rng(seed, index)
+    pages = size // 4096
+    block = np.zeros(size, dtype=np.uint8)
+    kinds = rng.choice(3, size=pages, p=[0.45, 0.4, 0.15])
+    noisy = np.flatnonzero(kinds == 1)
+    block.reshape(pages, 4096)[noisy] = rng.integers(0, 256, size=(len(noisy), 4096), dtype=np.uint8)
+    texty = np.flatnonzero(kinds == 2)
+    block.reshape(pages, 4096)[texty] = rng.integers(0x61, 0x7b, size=(len(texty), 4096), dtype=np.uint8)
+    block.reshape(pages, 4096)[texty, ::8] = 0
+
+    planted = []
+    count = size // PLANT_INTERVAL
+    offsets = np.sort(rng.choice(max(pages, 1), size=count, replace=count > pages)) * 4096
+    offsets += rng.integers(16, 3072, size=count)
+    for n, offset in enumerate(offsets.tolist()):
+        category, text = planted_artifact(seed, plant_from + n)
+        raw = b'\0' + text.encode() + b'\0'
+        if offset + len(raw) <= size:
+            block[offset:offset + len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+            planted.append((index * BLOCK_SIZE + offset + 1, category, text))
+    return block, planted
+
+def make_memory_image(path, size_mb, seed=0):
+    """Write a deterministic memory image; returns the planted (offset, category, text) list"""
+    size = int(size_mb * 1024 * 1024)
+    planted = []
+    with open(path, 'wb') as f:
+        for index, start in enumerate(range(0, size, BLOCK_SIZE)):
+            length = min(BLOCK_SIZE, size - start)
+            block, found = _memory_block(seed, index, length, index * (BLOCK_SIZE // PLANT_INTERVAL))
+            f.write(block.tobytes())
+            planted.extend(found)
+    return planted
+
+# Windows 10 (19041) x64 EPROCESS layout, matching dfir.proccarve
+EPROCESS_FIELDS = {'pid': 0x440, 'links': 0x448, 'create_time': 0x468, 'ppid': 0x540, 'image_name': 0x5a8}
+EPROCESS_SIZE = 0xa40
+
+def plant_processes(path, count, seed=0, planted=(), start=1687444375.0):
+    """Overwrite page-aligned spots of an image with pool-tagged EPROCESS structures
+
+    Every other planted allocation carries a different set of optional object
+    headers, so the body sits at a different distance from its pool tag. A
+    decoy "Proc" tag with garbage behind it is planted after each process.
+    Pages holding the artifacts in planted are left alone. Returns the
+    planted (EPROCESS offset, pid, ppid, name, create time) list.
+    """
+    r = random.Random(seed)
+    size = os.path.getsize(path)
+    taken = {offset // 4096 for offset, _, _ in planted}
+    free = [page for page in range(size // 4096) if page not in taken]
+    slots = sorted(r.sample(free, min(count * 2, len(free))))
+    processes = []
+    with open(path, 'r+b') as f:
+        for i in range(0, len(slots) - 1, 2):
+            pid = 4 * (i // 2 + 1) + 4
+            ppid = 4 if not processes else r.choice(processes)[1]
+            name = EXE_NAMES[(i // 2) % len(EXE_NAMES)][:14]
+            created = start + i * 7.5
+            header = slots[i] * 4096
+            body = header + (0x40 if (i // 2) % 2 else 0x80)
+            record = bytearray(EPROCESS_SIZE + 0x100)
+            record[0:16] = struct.pack('<I4s8s', (EPROCESS_SIZE + 0x100) // 16 << 16, b'Proc', b'\0' * 8)
+            base = body - header
+            record[base] = 3
+            struct.pack_into('<Q', record, base + EPROCESS_FIELDS['pid'], pid)
+            struct.pack_into('<QQ', record, base + EPROCESS_FIELDS['links'], 0xffffa00000000000 + pid,
+                             0xffffa00000010000 + pid)
+            struct.pack_into('<Q', record, base + EPROCESS_FIELDS['create_time'],
+                             int((created + 11644473600) * 10 ** 7))
+            struct.pack_into('<Q', record, base + EPROCESS_FIELDS['ppid'], ppid)
+            record[base + EPROCESS_FIELDS['image_name']:base + EPROCESS_FIELDS['image_name'] + 15] = \
+                name.encode().ljust(15, b'\0')
+            f.seek(header)
+            f.write(record[:min(len(record), size - header)])
+            f.seek(slots[i + 1] * 4096)
+            f.write(b'\0\0\0\0Proc' + r.randbytes(0x700))
+            processes.append((body, pid, ppid, name, created))
+    return processes
+
+def make_ioc_feed(path, entries, planted=(), seed=0):
+    """Write a typed IOC feed of random entries plus the planted domains and hashes
+
+    Returns the number of planted values included, i.e. the expected
+    minimum number of distinct feed hits in the matching image.
+    """
+    r = random.Random(seed)
+    planted_values = sorted({(('domain' if c == 'domains' else 'hash'), text) for _, c, text in planted
+                             if c in ('domains', 'hashes')})
+    with open(path, 'w') as f:
+        f.write(f"# synthetic IOC feed, seed {seed}\n")
+        for i in range(max(entries - len(planted_values), 0)):
+            kind = i % 3
+            if kind == 0:
+                f.write(f"domain,{''.join(r.choices('abcdefghijklmnopqrstuvwxyz', k=12))}.{r.choice(TLDS)}\n")
+            elif kind == 1:
+                f.write(f"hash,{r.getrandbits(256):064x}\n")
+            else:
+                f.write(f"string,{''.join(r.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ_', k=16))}\n")
+        for ioc_type, value in planted_values:
+            f.write(f"{ioc_type},{value}\n")
+    return len(planted_values)
+
+def make_yara_rules(path):
+    """Write a rule file matching every planted executable name; returns the rule count"""
+    with open(path, 'w') as f:
+        f.write('rule planted_executables : synthetic\n{\n    meta:\n        description = "planted process names"\n'
+                '    strings:\n')
+        for i, name in enumerate(EXE_NAMES):
+            f.write(f'        $exe{i} = "{name}" nocase\n')
+        f.write('    condition:\n        any of them\n}\n')
+    return 1
+
+# pcapng building blocks (little-endian section, Ethernet, microsecond timestamps)
+
+def _block(block_type, body):
+    body += b'\0' * (-len(body) % 4)
+    return struct.pack('<II', block_type, len(body) + 12) + body + struct.pack('<I', len(body) + 12)
+
+def _ethernet(src, dst, proto, sport, dport, payload):
+    if proto == 6:
+        l4 = struct.pack('!HHIIBBHHH', sport, dport, 0, 0, 5 << 4, 0x18, 1024, 0, 0) + payload
+    else:
+        l4 = struct.pack('!HHHH', sport, dport, 8 + len(payload), 0) + payload
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(l4), 0, 0, 64, proto, 0, bytes(src), bytes(dst))
+    return b'\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00' + ip + l4
+
+def _modbus(tid, function, data):
+    return struct.pack('!HHHBB', tid, 0, 2 + len(data), 1, function) + data
+
+def _s7_write(ref, db, address, value):
+    item = struct.pack('!BBBBHHB', 0x12, 10, 0x10, 2, len(value) // 2, db, 0x84) + (address << 3).to_bytes(3, 'big')
+    params = bytes([0x05, 1]) + item
+    data = struct.pack('!BBH', 0, 4, len(value) * 8) + value
+    s7 = struct.pack('!BBHHHH', 0x32, 1, 0, ref, len(params), len(data)) + params + data
+    return struct.pack('!BBH', 3, 0, 7 + len(s7)) + b'\x02\xf0\x80' + s7
+
+def _packet(r, i):
+    """One packet of a mixed HMI/PLC/attacker capture"""
+    hmi, plc, s7plc, attacker = [192, 168, 1, 10], [192, 168, 1, 20], [192, 168, 1, 30], [192, 168, 1, 66]
+    tid = i & 0xFFFF
+    kind = i % 8
+    if kind in (0, 1):
+        return _ethernet(hmi, plc, 6, 40000, 502, _modbus(tid, 3, struct.pack('!HH', 100, 4)))
+    if kind == 2:
+        return _ethernet(plc, hmi, 6, 502, 40000, _modbus(tid - 1, 3, b'\x08' + r.randbytes(8)))
+    if kind == 3:
+        return _ethernet(hmi, plc, 6, 40000, 502, _modbus(tid, 16, struct.pack('!HHB', 200, 2, 4) + r.randbytes(4)))
+    if kind == 4:
+        return _ethernet(attacker, plc, 6, 41000, 502, _modbus(tid, 6, struct.pack('!HH', 105, r.randrange(65536))))
+    if kind == 5:
+        return _ethernet(attacker, s7plc, 6, 41001, 102, _s7_write(tid, 5, 16, r.randbytes(2)))
+    if kind == 6:
+        return _ethernet(hmi, [8, 8, 8, 8], 17, 5353, 53, r.randbytes(24))
+    return _ethernet(hmi, [10, 0, 0, r.randrange(1, 255)], 6, 443, 50000 + r.randrange(1000), r.randbytes(r.randrange(64, 1400)))
+
+def make_pcapng(path, packets, seed=0, start=1687444375.0):
+    """Write a deterministic capture of Modbus/TCP, S7comm, DNS and bulk TCP traffic; returns its size"""
+    r = random.Random(seed)
+    timestamp = int(start * 1e6)
+    written = 0
+    with open(path, 'wb') as f:
+        header = _block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)) + \
+                 _block(1, struct.pack('<HHI', 1, 0, 65535))
+        f.write(header)
+        written += len(header)
+        batch = []
+        for i in range(packets):
+            timestamp += r.randint(100, 5000)
+            frame = _packet(r, i)
+            batch.append(_block(6, struct.pack('<IIIII', 0, timestamp >> 32, timestamp & 0xFFFFFFFF,
+                                               len(frame), len(frame)) + frame))
+            if len(batch) == 4096:
+                data = b''.join(batch)
+                f.write(data)
+                written += len(data)
+                batch = []
+        data = b''.join(batch)
+        f.write(data)
+        written += len(data)
+    return written
@@ -0,0 +1,4 @@
+"""
+Shared DFIR analysis library
+Reusable building blocks for the Volatility, MISP and case study demos
+"""
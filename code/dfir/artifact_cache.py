@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Persistent Artifact Index
+On-disk, offset-indexed cache of memory scan results keyed by evidence fingerprint
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from dfir.custody import DEFAULT_MANIFEST, EvidenceManifest, stat_key
+from dfir.memscan import CATEGORIES, scan_memory
+
+DEFAULT_CACHE_PATH = "datasets/cache/artifacts.db"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Fingerprint samples: head, tail and evenly spaced blocks in between
+FINGERPRINT_SAMPLES = 64
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+# Approximate per-row storage overhead used for eviction accounting
+ROW_OVERHEAD = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    fingerprint TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    source TEXT,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (fingerprint, profile)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    fingerprint TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    category TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_offset
+    ON artifacts (fingerprint, profile, category, offset);
+"""
+
+def fingerprint(path, samples=FINGERPRINT_SAMPLES, sample_size=FINGERPRINT_SAMPLE_SIZE,
+                manifest_path=DEFAULT_MANIFEST):
+    """Fast content fingerprint of an evidence file
+
+    The SHA-256 recorded in the custody manifest is reused when the file is
+    unchanged since it was hashed. Otherwise the file size, mtime and a fixed
+    number of sampled blocks are hashed, so the cost does not grow with the
+    dump; files small enough to be fully covered by the samples are hashed
+    completely.
+    """
+    key = stat_key(path)
+    digests = EvidenceManifest(manifest_path).lookup(key, ('sha256',)) if manifest_path else None
+    if digests is not None:
+        return f"sha256-{digests['sha256']}"
+
+    _, size, mtime_ns, _ = key
+    digest = hashlib.blake2b(f"{size}:{mtime_ns}".encode(), digest_size=20)
+    with open(path, 'rb') as f:
+        if size <= samples * sample_size:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        else:
+            step = (size - sample_size) // (samples - 1)
+            for i in range(samples):
+                f.seek(i * step)
+                digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+def scan_profile(limits=None, skip_pages=False):
+    """Canonical key for the scan limits a result was produced with
+
+    Scans that skipped zero and duplicate pages miss the repeats found in
+    duplicates, so they are cached under their own profile.
+    """
+    profile = "all" if not limits else json.dumps({c: limits.get(c) for c in CATEGORIES}, sort_keys=True)
+    return profile + "+skip-pages" if skip_pages else profile
+
+class ArtifactCache:
+    """SQLite-backed artifact index with size-bounded LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the underlying database"""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key, limits=None, skip_pages=False):
+        """Return the cached analysis dict for a fingerprint, or None on a miss"""
+        profile = scan_profile(limits, skip_pages)
+        with self.db:
+            touched = self.db.execute(
+                "UPDATE scans SET last_used = ? WHERE fingerprint = ? AND profile = ?",
+                (time.time(), key, profile)).rowcount
+        if not touched:
+            return None
+
+        analysis = {category: [] for category in CATEGORIES}
+        rows = self.db.execute(
+            "SELECT category, offset, value FROM artifacts WHERE fingerprint = ? AND profile = ? "
+            "ORDER BY category, offset", (key, profile))
+        for category, offset, value in rows:
+            analysis[category].append((offset, value))
+        return analysis
+
+    def put(self, key, analysis, limits=None, source=None, skip_pages=False):
+        """Store an analysis dict for a fingerprint and evict old scans if over budget"""
+        profile = scan_profile(limits, skip_pages)
+        rows = [(key, profile, category, offset, value)
+                for category, hits in analysis.items() for offset, value in hits]
+        size = sum(len(row[4]) + ROW_OVERHEAD for row in rows)
+        now = time.time()
+        with self.db:
+            self.db.execute("DELETE FROM artifacts WHERE fingerprint = ? AND profile = ?", (key, profile))
+            self.db.execute("INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, profile, source, size, now, now))
+            self.db.executemany("INSERT INTO artifacts VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def query(self, key, category, start=None, end=None, contains=None, limits=None, skip_pages=False):
+        """Return (offset, value) hits of one category, optionally within [start, end)"""
+        sql = "SELECT offset, value FROM artifacts WHERE fingerprint = ? AND profile = ? AND category = ?"
+        params = [key, scan_profile(limits, skip_pages), category]
+        if start is not None:
+            sql += " AND offset >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND offset < ?"
+            params.append(end)
+        if contains is not None:
+            sql += " AND instr(value, ?) > 0"
+            params.append(contains)
+        sql += " ORDER BY offset"
+        return self.db.execute(sql, params).fetchall()
+
+    def invalidate(self, key=None):
+        """Drop every cached scan for a fingerprint, or the whole cache when key is None"""
+        with self.db:
+            if key is None:
+                self.db.execute("DELETE FROM artifacts")
+                self.db.execute("DELETE FROM scans")
+            else:
+                self.db.execute("DELETE FROM artifacts WHERE fingerprint = ?", (key,))
+                self.db.execute("DELETE FROM scans WHERE fingerprint = ?", (key,))
+
+    def total_bytes(self):
+        """Approximate size of all cached scans"""
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM scans").fetchone()[0]
+
+    def evict(self):
+        """Remove least recently used scans until the cache fits in max_bytes"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        victims = self.db.execute("SELECT fingerprint, profile, size FROM scans ORDER BY last_used").fetchall()
+        with self.db:
+            for key, profile, size in victims:
+                if total <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM artifacts WHERE fingerprint = ? AND profile = ?", (key, profile))
+                self.db.execute("DELETE FROM scans WHERE fingerprint = ? AND profile = ?", (key, profile))
+                total -= size
+
+def cached_scan(path, limits=None, cache_path=DEFAULT_CACHE_PATH, pagemap=None, **scan_kwargs):
+    """Scan a memory dump, reusing the on-disk index when the content is unchanged"""
+    key = fingerprint(path)
+    skip_pages = pagemap is not None
+    with ArtifactCache(cache_path) as cache:
+        analysis = cache.get(key, limits, skip_pages)
+        if analysis is None:
+            analysis = scan_memory(path, limits=limits, pagemap=pagemap, **scan_kwargs)
+            cache.put(key, analysis, limits, source=os.path.abspath(path), skip_pages=skip_pages)
+    return analysis
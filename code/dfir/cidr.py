@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+CIDR Interval Index
+Vectorized IPv4 classification against RFC1918, reserved ranges and imported blocklists
+"""
+
+import os
+import socket
+from functools import partial
+
+import numpy as np
+
+PUBLIC = "public"
+PRIVATE = "private"
+RESERVED = "reserved"
+BLOCKLISTED = "blocklisted"
+INVALID = "invalid"
+
+# RFC 1918
+PRIVATE_RANGES = ["10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16"]
+
+# IANA IPv4 special-purpose registry (RFC 6890 and successors)
+RESERVED_RANGES = [
+    "0.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16", "192.0.0.0/24",
+    "192.0.2.0/24", "192.88.99.0/24", "198.18.0.0/15", "198.51.100.0/24", "203.0.113.0/24",
+    "224.0.0.0/4", "240.0.0.0/4", "255.255.255.255/32",
+]
+
+# inet_pton only accepts strict dotted quads, unlike inet_aton
+_pack = partial(socket.inet_pton, socket.AF_INET)
+
+def ips_to_array(ips):
+    """Parse dotted-quad strings into a uint32 array plus a validity mask"""
+    ips = list(ips)
+    try:
+        # Fast path: the whole batch parses in C
+        packed = b"".join(map(_pack, ips))
+        return np.frombuffer(packed, dtype=">u4").astype(np.uint32), np.ones(len(ips), dtype=bool)
+    except (OSError, TypeError):
+        # Some entries are not addresses: parse one by one to find them
+        values = np.zeros(len(ips), dtype=np.uint32)
+        valid = np.zeros(len(ips), dtype=bool)
+        for i, ip in enumerate(ips):
+            try:
+                values[i] = int.from_bytes(_pack(ip), "big")
+                valid[i] = True
+            except (OSError, TypeError):
+                pass
+    return values, valid
+
+def parse_cidrs(cidrs):
+    """Parse CIDR strings into (first, last + 1, prefix length) int64 arrays"""
+    addresses, prefixes = [], []
+    for entry in cidrs:
+        address, _, prefix = entry.partition("/")
+        addresses.append(address)
+        prefixes.append(int(prefix) if prefix else 32)
+    values, valid = ips_to_array(addresses)
+    prefixes = np.array(prefixes, dtype=np.int64)
+    if not valid.all() or ((prefixes < 0) | (prefixes > 32)).any():
+        bad = next(c for c, ok, p in zip(cidrs, valid, prefixes) if not ok or not 0 <= p <= 32)
+        raise ValueError(f"invalid CIDR block: {bad}")
+    sizes = np.left_shift(1, 32 - prefixes)
+    starts = values.astype(np.int64) & ~(sizes - 1)
+    return starts, starts + sizes, prefixes
+
+def load_blocklist(path):
+    """Read one CIDR or address per line, ignoring blanks and # comments"""
+    networks = []
+    with open(path) as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip()
+            if entry:
+                networks.append(entry)
+    return networks
+
+class CidrIndex:
+    """Sorted, non-overlapping interval table over the IPv4 space
+
+    When ranges overlap the most specific one wins, so a blocklisted /32
+    inside a private /8 is reported as blocklisted.
+    """
+
+    def __init__(self, ranges):
+        """ranges is an iterable of (cidr, label) pairs"""
+        ranges = list(ranges)
+        self.labels = [PUBLIC] + sorted({label for _, label in ranges})
+        codes = {label: code for code, label in enumerate(self.labels)}
+        starts, ends, prefixes = parse_cidrs([cidr for cidr, _ in ranges])
+        range_codes = np.array([codes[label] for _, label in ranges], dtype=np.uint16)
+
+        # Elementary intervals between all range boundaries, painted from the
+        # least to the most specific range
+        edges = np.unique(np.concatenate([[0, 1 << 32], starts, ends]))
+        codes_per_interval = np.zeros(len(edges) - 1, dtype=np.uint16)
+        first = np.searchsorted(edges, starts)
+        last = np.searchsorted(edges, ends)
+        for i in np.argsort(prefixes, kind="stable"):
+            codes_per_interval[first[i]:last[i]] = range_codes[i]
+
+        # Merge neighbours with the same label to keep the table compact
+        keep = np.ones(len(codes_per_interval), dtype=bool)
+        keep[1:] = codes_per_interval[1:] != codes_per_interval[:-1]
+        self.starts = edges[:-1][keep].astype(np.uint32)
+        self.codes = codes_per_interval[keep]
+
+    def lookup(self, values):
+        """Label codes for a uint32 array of addresses"""
+        return self.codes[np.searchsorted(self.starts, values, side="right") - 1]
+
+    def classify(self, ips):
+        """Label every dotted-quad string; unparsable entries are marked invalid"""
+        values, valid = ips_to_array(ips)
+        labels = np.array(self.labels + [INVALID], dtype=object)
+        codes = self.lookup(values).astype(np.int64)
+        codes[~valid] = len(self.labels)
+        return labels[codes].tolist()
+
+    def classify_one(self, ip):
+        """Label a single address"""
+        return self.classify([ip])[0]
+
+    def triage(self, ips):
+        """Count addresses per label"""
+        values, valid = ips_to_array(ips)
+        counts = np.bincount(self.lookup(values[valid]), minlength=len(self.labels))
+        summary = {label: int(count) for label, count in zip(self.labels, counts)}
+        summary[INVALID] = int((~valid).sum())
+        return summary
+
+def build_index(blocklists=()):
+    """Index of private and reserved ranges plus any blocklist files that exist"""
+    ranges = [(cidr, PRIVATE) for cidr in PRIVATE_RANGES]
+    ranges += [(cidr, RESERVED) for cidr in RESERVED_RANGES]
+    for path in blocklists:
+        if os.path.exists(path):
+            ranges += [(cidr, BLOCKLISTED) for cidr in load_blocklist(path)]
+    return CidrIndex(ranges)
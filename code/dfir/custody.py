@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Evidence Hashing
+Single-read MD5/SHA-1/SHA-256 digests of evidence files with a manifest that skips unchanged files
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MANIFEST = "datasets/cache/evidence_manifest.json"
+DEFAULT_ALGORITHMS = ('md5', 'sha1', 'sha256')
+
+# Reads go into one page-aligned buffer per file, large enough that each
+# digest update releases the GIL for a long stretch
+DEFAULT_BUFFER_SIZE = 16 * 1024 * 1024
+
+EvidenceHash = namedtuple('EvidenceHash', ['path', 'size', 'digests', 'cached'])
+
+def stat_key(path):
+    """Manifest key of a file: (absolute path, size, mtime in ns, inode)"""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino
+
+def hash_file(path, algorithms=DEFAULT_ALGORITHMS, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Every requested digest of a file from a single sequential read
+
+    Each buffer is read once and fed to all digests; hashlib drops the GIL
+    while hashing large buffers, so several files hash in parallel threads.
+    """
+    digests = [hashlib.new(name) for name in algorithms]
+    buf = mmap.mmap(-1, buffer_size)
+    view = memoryview(buf)
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while True:
+                count = f.readinto(view)
+                if not count:
+                    break
+                block = view[:count]
+                for digest in digests:
+                    digest.update(block)
+                block.release()
+    finally:
+        view.release()
+        buf.close()
+    return {name: digest.hexdigest() for name, digest in zip(algorithms, digests)}
+
+def collect_files(paths):
+    """Files named by paths, with directories expanded recursively in sorted order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+class EvidenceManifest:
+    """JSON manifest of evidence digests keyed on (path, size, mtime, inode)"""
+
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for entry in json.load(f).get('files', []):
+                    key = (entry['path'], entry['size'], entry['mtime_ns'], entry['inode'])
+                    self.entries[key] = entry
+
+    def lookup(self, key, algorithms=DEFAULT_ALGORITHMS):
+        """Stored digests for an unchanged file, or None if it must be hashed"""
+        entry = self.entries.get(key)
+        if entry is None or any(name not in entry['digests'] for name in algorithms):
+            return None
+        return {name: entry['digests'][name] for name in algorithms}
+
+    def record(self, key, digests):
+        path, size, mtime_ns, inode = key
+        # Entries for earlier versions of the same path are superseded
+        for old in [k for k in self.entries if k[0] == path and k != key]:
+            del self.entries[old]
+        self.entries[key] = {'path': path, 'size': size, 'mtime_ns': mtime_ns, 'inode': inode,
+                             'digests': digests, 'hashed_at': time.time()}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'files': sorted(self.entries.values(), key=lambda e: e['path'])}, f, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+def hash_evidence(paths, manifest_path=DEFAULT_MANIFEST, algorithms=DEFAULT_ALGORITHMS, workers=4):
+    """Digests of every evidence file under paths, hashing only new or changed files
+
+    Files are hashed concurrently, one thread and one read pass per file.
+    Returns EvidenceHash tuples in the order of collect_files(paths).
+    """
+    manifest = EvidenceManifest(manifest_path)
+    files = collect_files(paths)
+    keys = [stat_key(path) for path in files]
+    known = [manifest.lookup(key, algorithms) for key in keys]
+    pending = [i for i, digests in enumerate(known) if digests is None]
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            fresh = list(executor.map(lambda i: hash_file(files[i], algorithms), pending))
+        for i, digests in zip(pending, fresh):
+            manifest.record(keys[i], digests)
+        manifest.save()
+
+    fresh = dict(zip(pending, fresh)) if pending else {}
+    return [EvidenceHash(path, key[1], known[i] if known[i] is not None else fresh[i], known[i] is not None)
+            for i, (path, key) in enumerate(zip(files, keys))]
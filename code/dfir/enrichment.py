@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Async Reputation Enrichment
+Batched, rate-limited IOC reputation lookups over pooled keep-alive connections
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import quote, urlsplit
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 20.0
+DEFAULT_BURST = 20
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_RETRIES = 2
+REQUEST_TIMEOUT = 30
+
+# Stand-in provider API; a real provider is wired in by matching these routes
+SINGLE_PATH = "/api/v1/reputation/{type}/{value}"
+BATCH_PATH = "/api/v1/reputation/batch"
+
+# Result for a lookup that got no answer; "failed" keeps it out of the reputation cache
+UNKNOWN = {"malicious": False, "detections": 0, "total": 0, "description": "Lookup failed", "failed": True}
+
+class TokenBucket:
+    """Token-bucket rate limiter: rate tokens per second, up to burst stored"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        """Wait until tokens are available and take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+class HTTPError(Exception):
+    """Non-success HTTP status from the reputation provider"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+class ConnectionPool:
+    """Minimal asyncio HTTP/1.1 client that keeps up to size connections alive"""
+
+    def __init__(self, base_url, size=DEFAULT_CONCURRENCY, headers=None):
+        parts = urlsplit(base_url)
+        self.ssl = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.headers = headers or {}
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+        self.opened = 0
+
+    async def _connect(self):
+        if self._idle:
+            return self._idle.pop(), True
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None), False
+
+    async def request(self, method, path, payload=None):
+        """Send a JSON request and return (status, decoded JSON body)"""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}",
+                 "Connection: keep-alive", "Accept: application/json", f"Content-Length: {len(body)}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        async with self._slots:
+            connection, reused = await self._connect()
+            try:
+                try:
+                    status, data, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, message), REQUEST_TIMEOUT)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not reused:
+                        raise
+                    # The server dropped an idle keep-alive connection; retry on a fresh one
+                    connection[1].close()
+                    self.opened += 1
+                    connection = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+                    status, data, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, message), REQUEST_TIMEOUT)
+            except BaseException:
+                connection[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+
+        result = json.loads(data) if data else None
+        if status >= 300:
+            raise HTTPError(status, result)
+        return status, result
+
+    async def _exchange(self, connection, message):
+        reader, writer = connection
+        writer.write(message)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return status, data, keep_alive
+
+    async def close(self):
+        """Close every idle connection"""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+class ReputationClient:
+    """Enrich IOCs against a reputation service using batch calls where supported"""
+
+    def __init__(self, base_url, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 batch_size=DEFAULT_BATCH_SIZE, retries=DEFAULT_RETRIES, api_key=None):
+        headers = {"x-apikey": api_key} if api_key else None
+        self.pool = ConnectionPool(base_url, concurrency, headers)
+        self.bucket = TokenBucket(rate, burst)
+        self.batch_size = batch_size
+        self.retries = retries
+        self.supports_batch = batch_size > 1
+        self.requests = 0
+
+    async def _call(self, method, path, payload=None):
+        """Rate-limited request with exponential backoff on throttling and server errors"""
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                return (await self.pool.request(method, path, payload))[1]
+            except HTTPError as e:
+                if e.status != 429 and e.status < 500 or attempt == self.retries:
+                    raise
+            except (ConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _lookup_one(self, indicator):
+        path = SINGLE_PATH.format(type=quote(indicator["type"], safe=""), value=quote(indicator["value"], safe=""))
+        try:
+            return await self._call("GET", path)
+        except (HTTPError, ConnectionError, asyncio.TimeoutError):
+            return dict(UNKNOWN)
+
+    async def _lookup_batch(self, batch):
+        if self.supports_batch:
+            try:
+                response = await self._call("POST", BATCH_PATH, {"indicators": batch})
+                return response["results"]
+            except HTTPError as e:
+                if e.status not in (404, 405, 501):
+                    return [dict(UNKNOWN) for _ in batch]
+                # Provider has no batch endpoint: fall back to single lookups
+                self.supports_batch = False
+            except (ConnectionError, asyncio.TimeoutError):
+                return [dict(UNKNOWN) for _ in batch]
+        return await asyncio.gather(*(self._lookup_one(indicator) for indicator in batch))
+
+    async def enrich(self, indicators):
+        """Return one reputation result per indicator, in input order"""
+        batches = [indicators[i:i + self.batch_size] for i in range(0, len(indicators), self.batch_size)]
+        try:
+            results = await asyncio.gather(*(self._lookup_batch(batch) for batch in batches))
+        finally:
+            await self.pool.close()
+        return [result for batch in results for result in batch]
+
+def enrich_indicators(indicators, base_url, **options):
+    """Synchronous entry point: enrich a list of {"type", "value"} indicators"""
+    client = ReputationClient(base_url, **options)
+    return asyncio.run(client.enrich(list(indicators)))
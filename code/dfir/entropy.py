@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Block Entropy Map
+Per-4 KiB Shannon entropy and byte histogram of a memory dump, with text and image overviews for triage
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dfir.artifact_cache import fingerprint
+from dfir.memscan import open_dump, chunk_ranges
+
+try:
+    from matplotlib.figure import Figure
+except ImportError:
+    Figure = None
+
+BLOCK_SIZE = 4096
+
+# Blocks histogrammed per bincount call: large enough to amortize the call,
+# small enough to keep its index array at a few MiB
+BATCH_BLOCKS = 256
+
+# Chunks are whole blocks, so no block straddles two workers
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+DEFAULT_CACHE_DIR = "datasets/cache/entropy"
+
+# Bits per byte above which a block looks compressed, encrypted or packed;
+# code and text sit well below, random data just under 8
+HIGH_ENTROPY = 7.2
+DEFAULT_MIN_REGION_BLOCKS = 4
+
+# Text overview: one row per span of the dump, one character per cell,
+# shaded by the cell's mean block entropy (0 to 8 bits per byte)
+OVERVIEW_COLUMNS = 64
+OVERVIEW_ROWS = 16
+SHADES = " .:-=+*#%@"
+
+# Image overview: blocks per heatmap row (256 x 4 KiB = 1 MiB)
+IMAGE_ROW_BLOCKS = 256
+
+# Entropy per block in bits per byte (float16 is plenty for triage) and the byte histogram of the whole dump
+EntropyMap = namedtuple('EntropyMap', ['size', 'block_size', 'entropy', 'histogram'])
+
+# A run of high-entropy blocks: byte range, mean and peak bits per byte
+Region = namedtuple('Region', ['start', 'end', 'mean', 'peak'])
+
+def available():
+    """True when matplotlib is installed and image overviews can be rendered"""
+    return Figure is not None
+
+def _contributions(block_size):
+    """-p*log2(p) for every possible count of one byte value in a block, indexed by count"""
+    counts = np.arange(block_size + 1)
+    p = counts / block_size
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, -p * np.log2(p), 0.0)
+
+def block_entropy(buf, start=0, end=None, block_size=BLOCK_SIZE):
+    """Entropy of each whole block in buf[start:end] plus the byte histogram of those blocks
+
+    Per-block byte counts come from one bincount per batch, offsetting
+    each block's bytes into its own 256 bins; entropy is then a table
+    lookup and a row sum. All-zero blocks are recognised from a word view
+    and never histogrammed.
+    """
+    end = len(buf) if end is None else end
+    blocks = (end - start) // block_size
+    data = np.frombuffer(buf, dtype=np.uint8, count=blocks * block_size, offset=start).reshape(blocks, block_size)
+    table = _contributions(block_size)
+    offsets = np.arange(BATCH_BLOCKS, dtype=np.intp)[:, None] * 256
+    entropy = np.zeros(blocks, dtype=np.float32)
+    histogram = np.zeros(256, dtype=np.int64)
+    for first in range(0, blocks, BATCH_BLOCKS):
+        batch = data[first:first + BATCH_BLOCKS]
+        live = np.flatnonzero(batch.view('<u8').any(axis=1)) if block_size % 8 == 0 else np.arange(len(batch))
+        histogram[0] += (len(batch) - len(live)) * block_size
+        if not len(live):
+            continue
+        indexes = np.add(batch[live], offsets[:len(live)], dtype=np.intp)
+        counts = np.bincount(indexes.ravel(), minlength=len(live) * 256).reshape(len(live), 256)
+        entropy[first + live] = table[counts].sum(axis=1)
+        histogram += counts.sum(axis=0)
+    return entropy, histogram
+
+def _tail_entropy(buf, start, end):
+    """Entropy and histogram of a trailing partial block"""
+    counts = np.bincount(np.frombuffer(buf, dtype=np.uint8, count=end - start, offset=start), minlength=256)
+    p = counts[counts > 0] / (end - start)
+    return np.float32(-(p * np.log2(p)).sum()), counts
+
+def _entropy_chunk(task):
+    """Process pool worker: map the dump and measure a single chunk"""
+    path, start, end, block_size = task
+    buf = open_dump(path)
+    try:
+        return block_entropy(buf, start, end, block_size)
+    finally:
+        buf.close()
+
+def measure(path, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, block_size=BLOCK_SIZE):
+    """Compute the EntropyMap of a dump, chunks spread across a process pool"""
+    size = os.path.getsize(path)
+    whole = size - size % block_size
+    chunk_size -= chunk_size % block_size
+    tasks = [(path, start, end, block_size) for start, end in chunk_ranges(whole, chunk_size)]
+    if workers <= 1 or len(tasks) <= 1:
+        parts = [_entropy_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_entropy_chunk, tasks))
+    entropy = [part[0] for part in parts]
+    histogram = sum((part[1] for part in parts), np.zeros(256, dtype=np.int64))
+    if whole < size:
+        buf = open_dump(path)
+        try:
+            tail, counts = _tail_entropy(buf, whole, size)
+        finally:
+            buf.close()
+        entropy.append(np.array([tail], dtype=np.float32))
+        histogram += counts
+    entropy = np.concatenate(entropy) if entropy else np.zeros(0, dtype=np.float32)
+    return EntropyMap(size, block_size, entropy.astype(np.float16), histogram)
+
+def entropy_map(path, workers=1, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """The EntropyMap of a dump, measured once and saved under cache_dir by fingerprint
+
+    The saved array costs two bytes per 4 KiB block. Returns None for
+    empty or missing dumps.
+    """
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return None
+    cached = os.path.join(cache_dir, fingerprint(path) + '.npz') if cache_dir else None
+    if cached and not refresh and os.path.exists(cached):
+        with np.load(cached) as data:
+            return EntropyMap(int(data['size']), int(data['block_size']), data['entropy'], data['histogram'])
+
+    emap = measure(path, workers)
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cached + '.tmp', 'wb') as f:
+            np.savez_compressed(f, size=emap.size, block_size=emap.block_size, entropy=emap.entropy,
+                                histogram=emap.histogram)
+        os.replace(cached + '.tmp', cached)
+    return emap
+
+def high_entropy_regions(emap, threshold=HIGH_ENTROPY, min_blocks=DEFAULT_MIN_REGION_BLOCKS):
+    """Regions of at least min_blocks consecutive blocks above threshold, in offset order"""
+    high = np.concatenate(([False], emap.entropy >= threshold, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(high))
+    regions = []
+    for first, last in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        if last - first < min_blocks:
+            continue
+        values = emap.entropy[first:last].astype(np.float32)
+        regions.append(Region(first * emap.block_size, min(last * emap.block_size, emap.size),
+                              float(values.mean()), float(values.max())))
+    return regions
+
+def summary(emap, threshold=HIGH_ENTROPY):
+    """Block counts by class: (zero, low < 3, mid, high >= threshold) bits per byte"""
+    entropy = emap.entropy
+    zero = int((entropy == 0).sum())
+    high = int((entropy >= threshold).sum())
+    low = int(((entropy > 0) & (entropy < 3)).sum())
+    return zero, low, len(entropy) - zero - low - high, high
+
+def text_overview(emap, columns=OVERVIEW_COLUMNS, rows=OVERVIEW_ROWS):
+    """Lines of a terminal heatmap: start offset, then one shaded character per cell
+
+    Each cell shows the mean entropy of its blocks; runs too small to
+    shade a cell are still reported by high_entropy_regions.
+    """
+    entropy = emap.entropy.astype(np.float32)
+    if not len(entropy):
+        return []
+    cells = min(columns * rows, len(entropy))
+    bounds = np.linspace(0, len(entropy), cells + 1).astype(np.int64)
+    means = np.add.reduceat(entropy, bounds[:-1]) / np.diff(bounds)
+    shades = np.minimum((means / 8 * len(SHADES)).astype(int), len(SHADES) - 1)
+    lines = []
+    for row in range(0, cells, columns):
+        text = ''.join(SHADES[s] for s in shades[row:row + columns])
+        lines.append(f"0x{int(bounds[row]) * emap.block_size:010x} |{text}|")
+    return lines
+
+def render_overview(emap, path, regions=None, title=None):
+    """Write a PNG with the entropy heatmap (one row per MiB) above the byte histogram
+
+    High-entropy regions, if given, are outlined on the heatmap. Returns
+    the path, or None when matplotlib is not installed.
+    """
+    if Figure is None:
+        return None
+    entropy = emap.entropy.astype(np.float32)
+    rows = -(-len(entropy) // IMAGE_ROW_BLOCKS)
+    grid = np.full(rows * IMAGE_ROW_BLOCKS, np.nan, dtype=np.float32)
+    grid[:len(entropy)] = entropy
+    grid = grid.reshape(rows, IMAGE_ROW_BLOCKS)
+
+    figure = Figure(figsize=(10, 3 + min(rows, 1024) / 128), constrained_layout=True)
+    heatmap, histogram = figure.subplots(2, 1, gridspec_kw={'height_ratios': [4, 1]})
+    row_bytes = IMAGE_ROW_BLOCKS * emap.block_size
+    image = heatmap.imshow(grid, aspect='auto', interpolation='nearest', cmap='magma', vmin=0, vmax=8,
+                           extent=(0, row_bytes / 1024, rows, 0))
+    figure.colorbar(image, ax=heatmap, label='bits per byte')
+    for region in regions or []:
+        start = region.start
+        while start < region.end:
+            row, column = divmod(start, row_bytes)
+            heatmap.plot([column / 1024, min(region.end - row * row_bytes, row_bytes) / 1024], [row + 0.5] * 2,
+                         color='cyan', linewidth=1)
+            start = (row + 1) * row_bytes
+    heatmap.set_xlabel('offset within row (KiB)')
+    heatmap.set_ylabel('row (MiB)')
+    heatmap.set_title(title or 'Block entropy')
+    histogram.bar(np.arange(256), emap.histogram, width=1.0, color='tab:blue')
+    histogram.set_yscale('log')
+    histogram.set_xlim(-0.5, 255.5)
+    histogram.set_xlabel('byte value')
+    histogram.set_ylabel('count')
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    figure.savefig(path, dpi=100)
+    return path
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+IOC Feed Sweep
+Multi-pattern matching of memory dumps against large IOC feeds in one linear pass
+"""
+
+import hashlib
+import os
+import pickle
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dfir.memscan import open_dump, chunk_ranges, live_ranges
+
+FeedHit = namedtuple('FeedHit', ['offset', 'type', 'value'])
+
+FEED_TYPES = ['domain', 'hash', 'string']
+DEFAULT_CACHE_DIR = "datasets/cache/feeds"
+
+# Shorter entries would match all over a multi-GB image
+MIN_PATTERN_LENGTH = 4
+
+# Candidate windows are the first PREFIX_LENGTH bytes of every offset, read
+# as one little-endian integer
+PREFIX_LENGTH = 8
+
+# Prefilters: most offsets are rejected by a lookup of their first two bytes
+# in a cache-resident table, most of the rest by a hashed bitmap of prefixes
+LEAD_BITS = 16
+FILTER_BITS = 24
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Bytes read past a hit to check it is not part of a longer token: the next
+# byte, and the one after a trailing dot
+RIGHT_CONTEXT = 2
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+HASH_VALUE = re.compile(r'[0-9a-f]{32}|[0-9a-f]{40}|[0-9a-f]{64}')
+DOMAIN_VALUE = re.compile(r'(?:[a-z0-9-]{1,63}\.)+[a-z]{2,63}')
+
+# Bytes that may not touch a domain or hash hit on either side
+DOMAIN_CHARS = frozenset(b'abcdefghijklmnopqrstuvwxyz0123456789-')
+HEX_CHARS = frozenset(b'0123456789abcdef')
+
+def infer_type(value):
+    """Guess the feed type of an untyped entry"""
+    if HASH_VALUE.fullmatch(value):
+        return 'hash'
+    if DOMAIN_VALUE.fullmatch(value):
+        return 'domain'
+    return 'string'
+
+def load_feed(path):
+    """Read a feed of `value` or `type,value` lines, ignoring blanks and # comments"""
+    entries = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            ioc_type, sep, value = line.partition(',')
+            if not sep or ioc_type.strip().lower() not in FEED_TYPES:
+                ioc_type, value = None, line
+            value = value.strip().lower()
+            entries.append((ioc_type.strip().lower() if ioc_type else infer_type(value), value))
+    return entries
+
+def feed_digest(path):
+    """Content hash of a feed file, used as its compiled-matcher cache key"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _prefix_key(pattern, length):
+    return int.from_bytes(pattern[:length], 'little')
+
+class FeedMatcher:
+    """Compiled feed: every entry is found wherever it occurs, case-insensitively
+
+    Each offset's first prefix_length bytes form an integer key that is
+    checked against the lead-byte table, a hashed bitmap and then the sorted
+    feed prefixes, all with array operations over a whole block. Only offsets whose prefix
+    matches a feed entry are verified byte by byte in Python.
+    """
+
+    def __init__(self, entries):
+        patterns = {}
+        for ioc_type, value in entries:
+            pattern = value.lower().encode('utf-8')
+            if len(pattern) >= MIN_PATTERN_LENGTH:
+                patterns.setdefault(pattern, (ioc_type, value))
+
+        self.count = len(patterns)
+        self.prefix_length = min([PREFIX_LENGTH] + [len(p) for p in patterns])
+        self.max_length = max([len(p) for p in patterns], default=0)
+
+        self.groups = {}
+        for pattern, (ioc_type, value) in patterns.items():
+            self.groups.setdefault(_prefix_key(pattern, self.prefix_length), []).append(
+                (pattern, ioc_type, value))
+        self.keys = np.array(sorted(self.groups), dtype=np.uint64)
+        self._build_filter()
+
+    def _build_filter(self):
+        self.mask = np.uint64((1 << (8 * self.prefix_length)) - 1)
+        self.lead = np.zeros(1 << LEAD_BITS, dtype=bool)
+        self.lead[(self.keys & np.uint64((1 << LEAD_BITS) - 1)).astype(np.int64)] = True
+        self.bitmap = np.zeros(1 << FILTER_BITS, dtype=bool)
+        self.bitmap[self._bucket(self.keys)] = True
+
+    def _bucket(self, keys):
+        return (keys * HASH_MULTIPLIER) >> np.uint64(64 - FILTER_BITS)
+
+    def __getstate__(self):
+        # The prefilter tables are cheap to rebuild, keep cached files small
+        state = dict(self.__dict__)
+        del state['lead'], state['bitmap'], state['mask']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_filter()
+
+    def candidates(self, data, count, start=0):
+        """Offsets in [start, count) whose prefix equals some feed entry's prefix"""
+        if not self.count or count <= start:
+            return np.zeros(0, dtype=np.int64)
+        # View every offset as unaligned 2- and 8-byte integers; data is padded
+        # so the last windows stay inside the buffer
+        leads = np.ndarray((count - start,), dtype='<u2', buffer=data, offset=start, strides=(1,))
+        offsets = np.flatnonzero(self.lead[leads])
+        windows = np.ndarray((count - start,), dtype='<u8', buffer=data, offset=start, strides=(1,))
+        keys = windows[offsets] & self.mask
+        hashed = self.bitmap[self._bucket(keys)]
+        offsets, keys = offsets[hashed], keys[hashed]
+        found = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return offsets[self.keys[found] == keys] + start
+
+    def scan_block(self, block, own=None, base=0):
+        """Feed hits starting in block[base:own] as (offset in block, type, value) tuples
+
+        block holds lowercased bytes; hits may extend past own into the rest
+        of the block, which is how callers pass the overlap with the next one.
+        Bytes before base and after the last hit are context for the boundary
+        check, so a block must start at base 0 only at the true start of the
+        data and end before a hit's RIGHT_CONTEXT bytes only at its true end.
+        """
+        own = len(block) if own is None else own
+        data = block + b'\0' * PREFIX_LENGTH
+        hits = []
+        for offset in self.candidates(data, own, base).tolist():
+            for pattern, ioc_type, value in self.groups[_prefix_key(data[offset:offset + PREFIX_LENGTH],
+                                                                     self.prefix_length)]:
+                end = offset + len(pattern)
+                if end <= len(block) and block.startswith(pattern, offset) and \
+                        self._on_boundary(block, offset, end, ioc_type):
+                    hits.append((offset, ioc_type, value))
+        return hits
+
+    @staticmethod
+    def _on_boundary(block, start, end, ioc_type):
+        """Reject domains and hashes that are only part of a longer token; block edges are the data's edges"""
+        before = block[start - 1] if start > 0 else None
+        after = block[end] if end < len(block) else None
+        if ioc_type == 'hash':
+            return before not in HEX_CHARS and after not in HEX_CHARS
+        if ioc_type == 'domain':
+            # Subdomains of a listed domain count, longer names ending in it do not
+            if before in DOMAIN_CHARS or after in DOMAIN_CHARS:
+                return False
+            return not (after == ord('.') and end + 1 < len(block) and block[end + 1] in DOMAIN_CHARS)
+        return True
+
+_compiled = {}
+
+def compile_feed(path, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the compiled matcher for a feed, built once per feed content
+
+    Compiled feeds are kept in memory for the process and pickled under
+    cache_dir, keyed by the feed's content hash.
+    """
+    key = feed_digest(path)
+    if key in _compiled:
+        return _compiled[key]
+
+    cached = os.path.join(cache_dir, key + '.pkl') if cache_dir else None
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            matcher = pickle.load(f)
+    else:
+        matcher = FeedMatcher(load_feed(path))
+        if cached:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cached + '.tmp', 'wb') as f:
+                pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cached + '.tmp', cached)
+    _compiled[key] = matcher
+    return matcher
+
+def sweep_buffer(buf, matcher, start=0, end=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Sweep buf[start:end] block by block; hits may run up to max_length past end
+
+    Each block is read with the byte before it and RIGHT_CONTEXT bytes past
+    its overlap, so hits are checked against their real neighbours whatever
+    the block, chunk or page map layout.
+    """
+    end = len(buf) if end is None else end
+    overlap = max(matcher.max_length - 1, 0) + RIGHT_CONTEXT
+    hits = []
+    for block_start in range(start, end, block_size):
+        own = min(block_size, end - block_start)
+        first = max(block_start - 1, 0)
+        block = buf[first:min(block_start + own + overlap, len(buf))].lower()
+        hits.extend(FeedHit(first + offset, ioc_type, value)
+                    for offset, ioc_type, value in matcher.scan_block(block, block_start - first + own,
+                                                                      block_start - first))
+    return hits
+
+_worker_matcher = None
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+def _sweep_chunk(task):
+    """Process pool worker: map the dump and sweep the live ranges of a single chunk"""
+    path, ranges = task
+    buf = open_dump(path)
+    try:
+        return [hit for start, end in ranges for hit in sweep_buffer(buf, _worker_matcher, start, end)]
+    finally:
+        buf.close()
+
+def sweep_memory(path, matcher, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, pagemap=None):
+    """Find every feed entry in a memory dump; returns FeedHits in offset order
+
+    With a pagemap, zero and duplicate pages are not swept.
+    """
+    size = os.path.getsize(path)
+    if size == 0 or not matcher.count:
+        return []
+
+    if workers <= 1 or size <= chunk_size:
+        buf = open_dump(path)
+        try:
+            return [hit for start, end in live_ranges(pagemap, 0, size)
+                    for hit in sweep_buffer(buf, matcher, start, end)]
+        finally:
+            buf.close()
+
+    tasks = [(path, live_ranges(pagemap, start, end)) for start, end in chunk_ranges(size, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matcher,)) as executor:
+        return [hit for hits in executor.map(_sweep_chunk, tasks) for hit in hits]
+
+def sweep_stream(stream, matcher, block_size=DEFAULT_BLOCK_SIZE):
+    """Sweep a readable stream, carrying the overlap plus one byte of left context between blocks"""
+    overlap = max(matcher.max_length - 1, 0) + RIGHT_CONTEXT
+    hits = []
+    carry = b''
+    base = 0
+    swept = 0
+    while matcher.count:
+        block = stream.read(block_size)
+        buf = carry + block
+        if not buf:
+            break
+        own = len(buf) - overlap if block else len(buf)
+        if own > swept:
+            hits.extend(FeedHit(base + offset, ioc_type, value)
+                        for offset, ioc_type, value in matcher.scan_block(buf.lower(), own, swept))
+            carry, base, swept = buf[own - 1:], base + own - 1, 1
+        else:
+            carry = buf
+        if not block:
+            break
+    return hits
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Findings Store
+Partitioned Parquet store of extracted artifacts, appended per run and queried with predicate pushdown
+"""
+
+import os
+import time
+import uuid
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DEFAULT_STORE = "datasets/cache/findings"
+DEFAULT_CASE = "default"
+
+# Evidence partition for artifacts that describe the whole case, e.g. the data inventory
+CASE_LEVEL = "case"
+
+# Each artifact type is its own dataset, since types have different columns:
+#   <store>/<artifact>/case=<case>/evidence=<item>/part-<run>-<id>.parquet
+PARTITION_COLUMNS = ('case', 'evidence')
+
+COMPRESSION = 'zstd'
+
+def available():
+    """True when pyarrow is installed and the store can be used"""
+    return pa is not None
+
+def evidence_name(path):
+    """Partition value for an evidence item: its file name, also for archive members ("a.zip::b.raw")"""
+    return os.path.basename(os.path.normpath(str(path).split('::')[-1]))
+
+def analysis_rows(analysis):
+    """A memscan analysis dict as a (category, offset, value) frame"""
+    categories, offsets, values = [], [], []
+    for category, hits in analysis.items():
+        categories.extend([category] * len(hits))
+        offsets.extend(offset for offset, value in hits)
+        values.extend(value for offset, value in hits)
+    return pd.DataFrame({'category': categories, 'offset': pd.array(offsets, dtype='int64'), 'value': values})
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor='hive')
+
+class FindingsStore:
+    """Append-only artifact tables for one case, one Parquet file per append
+
+    Every row written in this process carries the same run id, so repeated
+    runs over the same evidence can be told apart or filtered to the latest.
+    """
+
+    def __init__(self, root=DEFAULT_STORE, case=DEFAULT_CASE, run=None):
+        if not available():
+            raise RuntimeError("pyarrow is required for the findings store")
+        self.root = root
+        self.case = case
+        self.run = run or time.strftime('%Y%m%dT%H%M%S')
+
+    def _partition_dir(self, artifact, evidence):
+        return os.path.join(self.root, artifact, f"case={quote(self.case, safe='')}",
+                            f"evidence={quote(evidence, safe='')}")
+
+    def append(self, evidence, artifact, rows, columns=None):
+        """Append rows (a DataFrame, namedtuples, dicts or tuples with columns) for one evidence item
+
+        Returns the number of rows written. The file appears atomically, so
+        concurrent phases can append to the same partition.
+        """
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows), columns=columns)
+        if not len(frame):
+            return 0
+        frame = frame.assign(run=self.run)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        directory = self._partition_dir(artifact, evidence)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{self.run}-{uuid.uuid4().hex[:12]}.parquet"
+        # Dataset discovery skips dot-files, so readers never see a partial file
+        temp = os.path.join(directory, '.' + name)
+        pq.write_table(table, temp, compression=COMPRESSION)
+        os.replace(temp, os.path.join(directory, name))
+        return len(frame)
+
+    def query(self, artifact, columns=None, filters=None, evidence=None, all_cases=False, latest=False):
+        """Rows of one artifact type as a DataFrame
+
+        filters are pyarrow/pandas DNF predicates, e.g. [('type', '==', 'ip')].
+        They are pushed down: partition directories that cannot match are
+        never opened and row groups are skipped on their column statistics.
+        latest keeps only rows from the most recent run.
+        """
+        path = os.path.join(self.root, artifact)
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns)
+        predicates = list(filters or [])
+        if not all_cases:
+            predicates.append(('case', '==', self.case))
+        if evidence is not None:
+            predicates.append(('evidence', '==', evidence))
+        if latest:
+            runs = self.runs(artifact, evidence)
+            if not runs:
+                return pd.DataFrame(columns=columns)
+            predicates.append(('run', '==', runs[-1]))
+        return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=predicates or None,
+                               partitioning=_partitioning())
+
+    def runs(self, artifact, evidence=None):
+        """Run ids recorded for an artifact type, oldest first, from file names alone"""
+        runs = set()
+        for item, names in self._partitions(artifact):
+            if evidence is None or item == evidence:
+                runs.update(name[len('part-'):].rsplit('-', 1)[0] for name in names)
+        return sorted(runs)
+
+    def _partitions(self, artifact):
+        """(evidence, part file names) for each of this case's partitions of an artifact type"""
+        case_dir = os.path.join(self.root, artifact, f"case={quote(self.case, safe='')}")
+        if not os.path.isdir(case_dir):
+            return
+        for item in sorted(os.listdir(case_dir)):
+            names = [name for name in sorted(os.listdir(os.path.join(case_dir, item)))
+                     if name.startswith('part-') and name.endswith('.parquet')]
+            yield unquote(item.split('=', 1)[1]), names
+
+    def contents(self):
+        """(artifact, evidence, files, rows) per partition of this case, using Parquet footers only"""
+        rows = []
+        artifacts = sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        for artifact in artifacts:
+            for evidence, names in self._partitions(artifact):
+                directory = self._partition_dir(artifact, evidence)
+                count = sum(pq.ParquetFile(os.path.join(directory, name)).metadata.num_rows for name in names)
+                rows.append((artifact, evidence, len(names), count))
+        return pd.DataFrame(rows, columns=['artifact', 'evidence', 'files', 'rows'])
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Columnar ICS Flow Table
+Modbus/TCP and S7comm operations decoded from a capture into a pandas table
+"""
+
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dfir.artifact_cache import fingerprint
+from dfir.memscan import open_dump
+from dfir.pcapng import iter_packets, dissect, plan_ranges, DEFAULT_CHUNK_SIZE
+
+DEFAULT_CACHE_DIR = "datasets/cache/ics"
+
+MODBUS_PORT = 502
+
+# Missing address/count/value/db entries are stored as -1
+NONE = -1
+
+MODBUS_FUNCTIONS = {1: 'read_coils', 2: 'read_discrete_inputs', 3: 'read_holding_registers',
+                    4: 'read_input_registers', 5: 'write_single_coil', 6: 'write_single_register',
+                    7: 'read_exception_status', 8: 'diagnostics', 15: 'write_multiple_coils',
+                    16: 'write_multiple_registers', 17: 'report_server_id', 22: 'mask_write_register',
+                    23: 'read_write_multiple_registers', 43: 'encapsulated_interface'}
+MODBUS_SPACES = {1: 'coil', 5: 'coil', 15: 'coil', 2: 'discrete_input', 4: 'input_register',
+                 3: 'holding_register', 6: 'holding_register', 16: 'holding_register',
+                 22: 'holding_register', 23: 'holding_register'}
+MODBUS_WRITES = (5, 6, 15, 16, 22, 23)
+
+S7_FUNCTIONS = {0x00: 'cpu_services', 0x04: 'read_var', 0x05: 'write_var', 0x1A: 'request_download',
+                0x1B: 'download_block', 0x1C: 'download_ended', 0x1D: 'start_upload', 0x1E: 'upload',
+                0x1F: 'end_upload', 0x28: 'pi_service', 0x29: 'plc_stop', 0xF0: 'setup_communication'}
+S7_AREAS = {0x03: 'sysinfo', 0x05: 'sysflags', 0x06: 'analog_inputs', 0x07: 'analog_outputs',
+            0x1C: 'counters', 0x1D: 'timers', 0x81: 'inputs', 0x82: 'outputs', 0x83: 'flags', 0x84: 'db'}
+S7_JOB = 1
+S7_ACK_DATA = 3
+S7_WRITE_VAR = 0x05
+S7_READ_VAR = 0x04
+# Transport sizes whose length field counts bits rather than bytes
+S7_BIT_LENGTHS = (0x03, 0x04, 0x05)
+
+NUMERIC_COLUMNS = {'timestamp': 'd', 'src': 'L', 'dst': 'L', 'sport': 'H', 'dport': 'H', 'request': 'b',
+                   'unit': 'l', 'function_code': 'B', 'exception': 'B', 'db': 'l', 'address': 'q',
+                   'count': 'l', 'value': 'q'}
+CATEGORY_COLUMNS = ['protocol', 'function', 'space']
+COLUMNS = ['timestamp', 'src', 'dst', 'sport', 'dport', 'protocol', 'request', 'unit', 'function_code',
+           'function', 'exception', 'space', 'db', 'address', 'count', 'value']
+
+# Outstanding requests remembered for matching responses per decoder
+MAX_PENDING = 65536
+
+class IcsTableBuilder:
+    """Accumulates one row per ICS operation (per register/coil/item where known)
+
+    Read responses carry values but no addresses, so requests are
+    remembered by flow and transaction (Modbus) or PDU reference (S7) and
+    their addresses are applied to the matching response.
+    """
+
+    def __init__(self):
+        self.numeric = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+        self.categories = {name: [] for name in CATEGORY_COLUMNS}
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.numeric['timestamp'])
+
+    def _row(self, packet, protocol, request, unit, code, function, space,
+             address=NONE, count=NONE, value=NONE, db=NONE, exception=0):
+        timestamp, src, dst, sport, dport = packet
+        for name, item in (('timestamp', timestamp), ('src', src), ('dst', dst), ('sport', sport),
+                           ('dport', dport), ('request', request), ('unit', unit), ('function_code', code),
+                           ('exception', exception), ('db', db), ('address', address), ('count', count),
+                           ('value', value)):
+            self.numeric[name].append(item)
+        self.categories['protocol'].append(protocol)
+        self.categories['function'].append(function)
+        self.categories['space'].append(space)
+
+    def _remember(self, key, item):
+        if len(self.pending) >= MAX_PENDING:
+            del self.pending[next(iter(self.pending))]
+        self.pending[key] = item
+
+    def add(self, timestamp, dissection, frame):
+        """Decode a dissected frame if it carries Modbus/TCP or S7comm"""
+        protocols = dissection.protocols
+        if dissection.src is None or len(dissection.src) != 4 or dissection.payload is None:
+            return
+        if 'modbus' not in protocols and 's7comm' not in protocols:
+            return
+        packet = (timestamp if timestamp is not None else float('nan'),
+                  int.from_bytes(dissection.src, 'big'), int.from_bytes(dissection.dst, 'big'),
+                  dissection.sport, dissection.dport)
+        payload = frame[dissection.payload:]
+        try:
+            if 'modbus' in protocols:
+                self._modbus(packet, payload, dissection.dport == MODBUS_PORT)
+            else:
+                self._s7comm(packet, payload)
+        except (struct.error, IndexError):
+            # Truncated or malformed PDU: keep what was decoded so far
+            pass
+
+    def _modbus(self, packet, payload, request):
+        _, src, dst, sport, dport = packet
+        flow = (src, sport, dst, dport) if request else (dst, dport, src, sport)
+        offset = 0
+        while offset + 8 <= len(payload):
+            tid, _, length, unit = struct.unpack_from('!HHHB', payload, offset)
+            pdu = payload[offset + 7:offset + 6 + length]
+            offset += 6 + length
+            if not pdu:
+                continue
+            code = pdu[0] & 0x7F
+            function = MODBUS_FUNCTIONS.get(code, f'function_{code}')
+            space = MODBUS_SPACES.get(code, '')
+            row = lambda **fields: self._row(packet, 'modbus', request, unit, code, function, space, **fields)
+
+            if pdu[0] & 0x80:
+                self.pending.pop(flow + (tid,), None)
+                row(exception=pdu[1])
+            elif request and code in (1, 2, 3, 4):
+                address, quantity = struct.unpack_from('!HH', pdu, 1)
+                self._remember(flow + (tid,), (address, quantity))
+                row(address=address, count=quantity)
+            elif code in (5, 6):
+                address, value = struct.unpack_from('!HH', pdu, 1)
+                row(address=address, count=1, value=int(value == 0xFF00) if code == 5 else value)
+            elif request and code in (15, 16, 23):
+                if code == 23:
+                    # The response carries the registers read from the first range
+                    self._remember(flow + (tid,), struct.unpack_from('!HH', pdu, 1))
+                    address, quantity, size = struct.unpack_from('!4xHHB', pdu, 1)
+                    data = pdu[10:10 + size]
+                else:
+                    address, quantity, size = struct.unpack_from('!HHB', pdu, 1)
+                    data = pdu[6:6 + size]
+                for i, value in enumerate(_unpack_values(data, quantity, code == 15)):
+                    row(address=address + i, count=quantity, value=value)
+            elif not request and code in (1, 2, 3, 4, 23):
+                address, quantity = self.pending.pop(flow + (tid,), (NONE, NONE))
+                values = _unpack_values(pdu[2:2 + pdu[1]], quantity if code in (1, 2) else None, code in (1, 2))
+                for i, value in enumerate(values):
+                    row(address=address + i if address != NONE else NONE, count=len(values), value=value)
+            elif not request and code in (15, 16):
+                address, quantity = struct.unpack_from('!HH', pdu, 1)
+                row(address=address, count=quantity)
+            elif code == 22:
+                address, and_mask, or_mask = struct.unpack_from('!HHH', pdu, 1)
+                row(address=address, count=1, value=or_mask)
+            else:
+                row()
+
+    def _s7comm(self, packet, payload):
+        _, src, dst, sport, dport = packet
+        offset = 0
+        # One or more TPKT frames, each holding a COTP header and an S7 PDU
+        while offset + 7 <= len(payload) and payload[offset] == 3:
+            length = struct.unpack_from('!H', payload, offset + 2)[0]
+            frame = payload[offset:offset + length]
+            offset += max(length, 4)
+            s7 = 5 + frame[4]
+            if frame[5] != 0xF0 or len(frame) < s7 + 10 or frame[s7] != 0x32:
+                continue
+            rosctr, reference, param_length, data_length = struct.unpack_from('!BxxHHH', frame, s7 + 1)
+            header = s7 + (12 if rosctr in (2, 3) else 10)
+            params = frame[header:header + param_length]
+            data = frame[header + param_length:header + param_length + data_length]
+            if not params:
+                continue
+            code = params[0]
+            function = S7_FUNCTIONS.get(code, f'function_0x{code:02x}')
+            request = rosctr == S7_JOB
+            key = (src, sport, dst, dport, reference) if request else (dst, dport, src, sport, reference)
+            row = lambda **fields: self._row(packet, 's7comm', request, NONE, code, function, **fields)
+
+            if code in (S7_READ_VAR, S7_WRITE_VAR) and request:
+                items = _s7_items(params)
+                self._remember(key, items)
+                values = _s7_data(data) if code == S7_WRITE_VAR else [NONE] * len(items)
+                for (space, db, address, count), value in zip(items, values + [NONE] * len(items)):
+                    row(space=space, db=db, address=address, count=count, value=value)
+            elif code in (S7_READ_VAR, S7_WRITE_VAR) and rosctr == S7_ACK_DATA:
+                items = self.pending.pop(key, [])
+                if code == S7_READ_VAR:
+                    values = _s7_data(data)
+                else:
+                    # Write acknowledgements only carry one return code per item
+                    values = [NONE] * len(data)
+                for i, value in enumerate(values):
+                    space, db, address, count = items[i] if i < len(items) else ('', NONE, NONE, NONE)
+                    row(space=space, db=db, address=address, count=count, value=value)
+            else:
+                row(space='')
+
+def _unpack_values(data, quantity, bits):
+    """Register words, or coil bits when bits is set"""
+    if bits:
+        values = [(byte >> bit) & 1 for byte in data for bit in range(8)]
+        return values[:quantity] if quantity not in (None, NONE) else values
+    return list(struct.unpack('!%dH' % (len(data) // 2), data[:len(data) // 2 * 2]))
+
+def _s7_items(params):
+    """(space, db, byte address, count) for each S7ANY item of a read/write var job"""
+    items = []
+    offset = 2
+    for _ in range(params[1]):
+        spec, length = params[offset], params[offset + 1]
+        if spec == 0x12 and length >= 10 and params[offset + 2] == 0x10:
+            count, db, area = struct.unpack_from('!xHHB', params, offset + 3)
+            bit_address = int.from_bytes(params[offset + 9:offset + 12], 'big')
+            items.append((S7_AREAS.get(area, f'area_0x{area:02x}'), db if area == 0x84 else NONE,
+                          bit_address >> 3, count))
+        else:
+            items.append(('', NONE, NONE, NONE))
+        offset += 2 + length
+    return items
+
+def _s7_data(data):
+    """First (up to) four bytes of each data item as an unsigned integer"""
+    values = []
+    offset = 0
+    while offset + 4 <= len(data):
+        return_code, transport, length = struct.unpack_from('!BBH', data, offset)
+        size = (length + 7) // 8 if transport in S7_BIT_LENGTHS else length
+        item = data[offset + 4:offset + 4 + size]
+        values.append(int.from_bytes(item[:4], 'big') if return_code in (0x00, 0xFF) and item else NONE)
+        offset += 4 + size + (size % 2)
+    return values
+
+def _frame_columns(builder):
+    """Turn the builder's arrays and category lists into a DataFrame"""
+    columns = {name: np.frombuffer(values, dtype=values.typecode) if len(values) else
+               np.zeros(0, dtype=np.dtype(values.typecode))
+               for name, values in builder.numeric.items()}
+    columns['request'] = columns['request'].astype(bool)
+    columns['src'] = columns['src'].astype(np.uint32)
+    columns['dst'] = columns['dst'].astype(np.uint32)
+    for name, values in builder.categories.items():
+        columns[name] = pd.Categorical(values)
+    return pd.DataFrame(columns, columns=COLUMNS)
+
+def table_from_buffer(buf, start=0, end=None, section=None):
+    """ICS table for the packet blocks in buf[start:end]"""
+    builder = IcsTableBuilder()
+    for timestamp, _, linktype, frame in iter_packets(buf, start, end, section):
+        builder.add(timestamp, dissect(linktype, frame), frame)
+    return _frame_columns(builder)
+
+def _table_range(task):
+    """Process pool worker: map the capture and decode a single block range"""
+    path, start, end, section = task
+    buf = open_dump(path)
+    try:
+        return table_from_buffer(buf, start, end, section)
+    finally:
+        buf.close()
+
+def build_ics_table(path, workers=1, cache_dir=DEFAULT_CACHE_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Decode every Modbus/S7 operation in a capture into a DataFrame
+
+    The table is cached under cache_dir keyed by the capture fingerprint, so
+    later questions are answered from the columns instead of re-parsing.
+    With workers > 1 block ranges are decoded in parallel; a response whose
+    request fell in the previous range is kept without an address.
+    """
+    cached = os.path.join(cache_dir, fingerprint(path) + '.pkl') if cache_dir else None
+    if cached and os.path.exists(cached):
+        return pd.read_pickle(cached)
+
+    buf = open_dump(path)
+    if buf is None:
+        table = _frame_columns(IcsTableBuilder())
+    else:
+        try:
+            if workers <= 1 or len(buf) <= chunk_size:
+                table = table_from_buffer(buf)
+                ranges = None
+            else:
+                ranges = plan_ranges(buf, chunk_size)
+        finally:
+            buf.close()
+        if ranges:
+            tasks = [(path, start, end, section) for start, end, section in ranges]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parts = list(executor.map(_table_range, tasks))
+            table = pd.concat(parts, ignore_index=True)
+            for name in CATEGORY_COLUMNS:
+                table[name] = table[name].astype('category')
+
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        table.to_pickle(cached)
+    return table
+
+def host_address(ip):
+    """Dotted quad to the integer form used by the src/dst columns"""
+    return int.from_bytes(bytes(int(part) for part in ip.split('.')), 'big')
+
+def host_name(value):
+    """Integer src/dst column value back to a dotted quad"""
+    return '.'.join(str(b) for b in int(value).to_bytes(4, 'big'))
+
+def writes(table):
+    """Boolean mask of write operations (Modbus write functions, S7 write_var jobs)"""
+    return (((table['protocol'] == 'modbus') & table['function_code'].isin(MODBUS_WRITES)) |
+            ((table['protocol'] == 's7comm') & (table['function_code'] == S7_WRITE_VAR))) & table['request']
+
+def likely_hmi(table):
+    """The host issuing the most ICS requests, usually the HMI or engineering station"""
+    requests = table.loc[table['request'], 'src']
+    return int(requests.value_counts().idxmax()) if len(requests) else None
+
+def holding_register_writes(table, trusted_hosts=()):
+    """Writes to Modbus holding registers from any host not in trusted_hosts"""
+    trusted = [host_address(h) if isinstance(h, str) else h for h in trusted_hosts]
+    mask = writes(table) & (table['space'] == 'holding_register') & ~table['src'].isin(trusted)
+    return table[mask]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Shared IOC Extraction
+Typed indicators of compromise pulled from a single memory scan
+"""
+
+import os
+import re
+from collections import namedtuple
+
+from dfir.memscan import DEFAULT_LIMITS, scan_stream
+from dfir.artifact_cache import cached_scan
+
+IOC_TYPES = ['ip', 'domain', 'hash', 'path', 'registry']
+
+# An indicator, the offset of the string it came from, and that string
+IOC = namedtuple('IOC', ['type', 'value', 'offset', 'context'])
+
+# One scan result shared by every consumer
+Extraction = namedtuple('Extraction', ['source', 'size', 'analysis', 'iocs'])
+
+OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])'
+
+# IOC type -> (scan category it is found in, pattern for the indicator token)
+TOKEN_PATTERNS = {
+    'ip': ('ips', re.compile(rf'(?<![0-9.]){OCTET}(?:\.{OCTET}){{3}}(?![0-9.])')),
+    'domain': ('domains', re.compile(
+        r'(?i)(?<![a-z0-9-])(?:[a-z0-9-]{1,63}\.)+'
+        r'(?:com|net|org|info|biz|io|co|us|uk|de|ru|cn|top|xyz|onion|gov|edu|mil)(?![a-z0-9-])')),
+    'hash': ('hashes', re.compile(
+        r'(?<![0-9A-Fa-f])(?:[0-9A-Fa-f]{64}|[0-9A-Fa-f]{40}|[0-9A-Fa-f]{32})(?![0-9A-Fa-f])')),
+    'path': ('files', re.compile(r'(?:[A-Za-z]:\\|/Windows/|/System32/)[^\s"\'<>|*?]*')),
+    'registry': ('registry', re.compile(r'(?:HKEY_[A-Z_]+|SOFTWARE|SYSTEM)\\[^\s"\'<>|*?]*')),
+}
+
+def iocs_from_analysis(analysis):
+    """Derive de-duplicated, typed IOCs from a memscan analysis dict, in offset order"""
+    seen = set()
+    iocs = []
+    for ioc_type, (category, pattern) in TOKEN_PATTERNS.items():
+        for offset, text in analysis.get(category, []):
+            for match in pattern.finditer(text):
+                value = match.group().rstrip('.,;:')
+                key = (ioc_type, value.lower() if ioc_type in ('domain', 'hash') else value)
+                if key in seen:
+                    continue
+                seen.add(key)
+                iocs.append(IOC(ioc_type, value, offset, text))
+    iocs.sort(key=lambda ioc: ioc.offset)
+    return iocs
+
+def extract_iocs(memory_dump, limits=DEFAULT_LIMITS, workers=1, pagemap=None):
+    """Scan a memory dump once and return the analysis dict together with its IOCs
+
+    A pagemap from dfir.pagemap keeps the scan off zero and duplicate pages.
+    """
+    analysis = cached_scan(memory_dump, limits=limits, workers=workers, pagemap=pagemap)
+    return Extraction(memory_dump, os.path.getsize(memory_dump), analysis, iocs_from_analysis(analysis))
+
+def extract_iocs_from_stream(stream, source, size, limits=DEFAULT_LIMITS):
+    """Extract IOCs from a readable stream, e.g. a dump decompressing out of its archive"""
+    analysis = scan_stream(stream, limits=limits)
+    return Extraction(source, size, analysis, iocs_from_analysis(analysis))
+
+def iocs_of_type(iocs, ioc_type):
+    """Filter IOCs down to a single type"""
+    return [ioc for ioc in iocs if ioc.type == ioc_type]
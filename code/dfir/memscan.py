@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Single-pass Memory Artifact Scanner
+Memory-maps a dump once and extracts strings and forensic artifacts with offsets
+"""
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Printable ASCII runs, equivalent to the default behaviour of `strings`
+MIN_STRING_LENGTH = 4
+STRING_PATTERN = re.compile(rb'[\x20-\x7e\t]{%d,}' % MIN_STRING_LENGTH)
+NON_PRINTABLE = re.compile(rb'[^\x20-\x7e\t]')
+PRINTABLE_BYTES = bytes(range(0x20, 0x7f)) + b'\t'
+
+# Artifact categories: the expressions the old `strings | grep` pipelines used,
+# plus domains and MD5/SHA-1/SHA-256 hashes for IOC extraction
+ARTIFACT_PATTERNS = {
+    'processes': rb'(?i:\.exe)',
+    'ips': rb'(?:[0-9]{1,3}\.){3}[0-9]{1,3}',
+    'files': rb'C:\\|/Windows/|/System32/',
+    'registry': rb'HKEY_|SOFTWARE\\|SYSTEM\\',
+    'domains': rb'(?i:(?<![a-z0-9-])(?:[a-z0-9-]{1,63}\.)+(?:com|net|org|info|biz|io|co|us|uk|de|ru|cn|top|xyz|onion|gov|edu|mil)(?![a-z0-9-]))',
+    'hashes': rb'(?<![0-9A-Fa-f])(?:[0-9A-Fa-f]{64}|[0-9A-Fa-f]{40}|[0-9A-Fa-f]{32})(?![0-9A-Fa-f])',
+}
+CLASSIFIER = re.compile(b'|'.join(
+    b'(?P<%s>%s)' % (name.encode(), pattern) for name, pattern in ARTIFACT_PATTERNS.items()
+))
+
+CATEGORIES = ['strings'] + list(ARTIFACT_PATTERNS)
+
+# Per-category result limits matching the old `head -N` calls
+DEFAULT_LIMITS = {'strings': 100, 'processes': 20, 'ips': 10, 'files': 15, 'registry': 10,
+                  'domains': 10, 'hashes': 10}
+
+# Parallel scan layout: each worker owns the strings that start inside its chunk
+# and may read up to DEFAULT_OVERLAP bytes past the chunk end to finish them
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_OVERLAP = 64 * 1024
+
+# Read size for streamed (non-mmap) sources such as archive members
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+def string_pattern(min_length=MIN_STRING_LENGTH):
+    """Return the compiled printable-run pattern for a minimum length"""
+    if min_length == MIN_STRING_LENGTH:
+        return STRING_PATTERN
+    return re.compile(rb'[\x20-\x7e\t]{%d,}' % min_length)
+
+def classify(text):
+    """Return the artifact categories a string (bytes) belongs to"""
+    return {match.lastgroup for match in CLASSIFIER.finditer(text)}
+
+def open_dump(path):
+    """Memory-map a dump read-only, returns None for empty files"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def owned_start(buf, start, end):
+    """Return the first offset in [start, end) not inside a string begun before start"""
+    if start == 0 or NON_PRINTABLE.match(buf, start - 1, start):
+        return start
+    match = NON_PRINTABLE.search(buf, start, end)
+    return match.start() if match else end
+
+def scan_buffer(buf, start=0, end=None, limits=None, min_length=MIN_STRING_LENGTH, overlap=0):
+    """Scan buf[start:end] in one pass and return the analysis dict with offsets
+
+    Every category maps to a list of (offset, text) tuples in offset order.
+    limits maps a category to its maximum number of results; missing or None
+    means unlimited. Once every category is full the scan stops early.
+    Only strings starting inside [start, end) are reported; a string that
+    began before start belongs to the previous chunk and is skipped, and one
+    that runs past end is completed using up to overlap extra bytes.
+    """
+    if end is None:
+        end = len(buf)
+    limits = limits or {}
+    analysis = {category: [] for category in CATEGORIES}
+    remaining = {c: limits.get(c) for c in CATEGORIES}
+    bounded = all(n is not None for n in remaining.values())
+
+    pos = owned_start(buf, start, end)
+    endpos = min(end + overlap, len(buf))
+    for match in string_pattern(min_length).finditer(buf, pos, endpos):
+        if match.start() >= end:
+            break
+        text = match.group()
+        decoded = text.decode('ascii').strip()
+        if not decoded:
+            continue
+
+        for category in ['strings'] + sorted(classify(text)):
+            if remaining[category] == 0:
+                continue
+            analysis[category].append((match.start(), decoded))
+            if remaining[category] is not None:
+                remaining[category] -= 1
+
+        if bounded and not any(remaining.values()):
+            break
+
+    return analysis
+
+def range_start(buf, start, floor):
+    """Offset to scan a range from when the bytes in [floor, start) were skipped unread
+
+    A string running out of the skipped bytes into the range is reported
+    from where it starts, so the scan backs up to it; only printable bytes
+    are read on the way. One that began before floor belongs to the range
+    before the skipped run, which reads past its end to finish it.
+    """
+    position = start
+    while position > floor:
+        lookback = min(position - floor, DEFAULT_OVERLAP)
+        window = buf[position - lookback:position]
+        tail = len(window) - len(window.rstrip(PRINTABLE_BYTES))
+        if tail < lookback:
+            return position - tail
+        position -= lookback
+    if floor < start and (floor == 0 or NON_PRINTABLE.match(buf, floor - 1, floor)):
+        return floor
+    return start
+
+def scan_ranges(buf, ranges, limits=None, min_length=MIN_STRING_LENGTH, overlap=DEFAULT_OVERLAP):
+    """Scan only the given ranges of buf, e.g. the pages a page map leaves to scan
+
+    Ranges are (start, end) or (start, end, floor) as made by live_spans().
+    A range whose floor is below its start follows a skipped run, and a
+    string crossing into it is found by range_start(); otherwise the chunk
+    boundary rule of scan_buffer() applies. limits apply across all ranges
+    in offset order.
+    """
+    limits = dict(limits or {})
+    bounded = all(limits.get(c) is not None for c in CATEGORIES)
+    results = []
+    for span in ranges:
+        start, end = span[:2]
+        start = range_start(buf, start, span[2] if len(span) > 2 else start)
+        part = scan_buffer(buf, start, end, limits, min_length, overlap)
+        results.append(part)
+        for category, hits in part.items():
+            if limits.get(category) is not None:
+                limits[category] -= len(hits)
+        if bounded and not any(limits.values()):
+            break
+    return merge_results(results)
+
+def live_ranges(pagemap, start, end):
+    """The ranges of [start, end) a page map leaves to scan; the whole span without one"""
+    return pagemap.live_ranges(start, end) if pagemap is not None else [(start, end)]
+
+def live_spans(pagemap, size):
+    """(start, end, floor) ranges of a dump left to scan; floor is where the skipped run before a range begins"""
+    spans = []
+    previous = 0
+    for start, end in live_ranges(pagemap, 0, size):
+        spans.append((start, end, previous if start > previous else start))
+        previous = end
+    return spans
+
+def clip_spans(spans, start, end):
+    """The parts of spans inside [start, end); a part cut at start has nothing skipped before it"""
+    clipped = []
+    for first, last, floor in spans:
+        if last <= start or first >= end:
+            continue
+        if first < start:
+            first = floor = start
+        clipped.append((first, min(last, end), floor))
+    return clipped
+
+def chunk_ranges(size, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Split [0, size) into consecutive (start, end) chunks"""
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+def merge_results(results, limits=None):
+    """Merge per-chunk analysis dicts, given in chunk order, into one offset-ordered dict"""
+    limits = limits or {}
+    merged = {category: [] for category in CATEGORIES}
+    for result in results:
+        for category in CATEGORIES:
+            merged[category].extend(result[category])
+    for category in CATEGORIES:
+        if limits.get(category) is not None:
+            del merged[category][limits[category]:]
+    return merged
+
+def _scan_chunk(task):
+    """Process pool worker: map the dump and scan the live ranges of a single chunk"""
+    path, ranges, limits, min_length, overlap = task
+    buf = open_dump(path)
+    try:
+        return scan_ranges(buf, ranges, limits, min_length, overlap)
+    finally:
+        buf.close()
+
+def scan_memory(path, limits=None, min_length=MIN_STRING_LENGTH, workers=1,
+                chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP, pagemap=None):
+    """Scan a memory dump for strings, processes, IPs, paths, registry keys, domains and hashes
+
+    With workers > 1 the dump is split into chunks scanned by a process pool
+    and merged back in offset order. overlap bounds how far a worker reads
+    past its chunk to finish a boundary-crossing string, so it is also the
+    longest string guaranteed to be reported intact across a boundary.
+    With a pagemap, zero and duplicate pages are not read at all, apart from
+    backing up to the start of a string that runs out of them.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return {category: [] for category in CATEGORIES}
+
+    if workers <= 1 or size <= chunk_size:
+        buf = open_dump(path)
+        try:
+            if pagemap is None:
+                return scan_buffer(buf, limits=limits, min_length=min_length)
+            return scan_ranges(buf, live_spans(pagemap, size), limits, min_length, overlap)
+        finally:
+            buf.close()
+
+    # Skipped runs are cut once over the whole dump, so a chunk boundary
+    # never looks like the end of one
+    spans = live_spans(pagemap, size)
+    tasks = [(path, clip_spans(spans, start, end), limits, min_length, overlap)
+             for start, end in chunk_ranges(size, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge_results(executor.map(_scan_chunk, tasks), limits)
+
+def scan_stream(stream, limits=None, min_length=MIN_STRING_LENGTH,
+                block_size=DEFAULT_BLOCK_SIZE, overlap=DEFAULT_OVERLAP):
+    """Scan a readable stream block by block, e.g. a member decompressing out of an archive
+
+    Gives the same result as scan_memory() on the equivalent file. A string
+    still open at the end of a block is carried into the next one, up to
+    overlap bytes, mirroring the chunk boundary rule of the parallel scan.
+    """
+    limits = dict(limits or {})
+    bounded = all(limits.get(c) is not None for c in CATEGORIES)
+    results = []
+    carry = b''
+    start = 0
+    base = 0
+
+    while True:
+        block = stream.read(block_size)
+        buf = carry + block
+        if not buf:
+            break
+
+        cut = len(buf)
+        if block:
+            tail = len(buf) - len(buf.rstrip(PRINTABLE_BYTES))
+            if tail <= overlap:
+                cut -= tail
+
+        part = scan_buffer(buf, start, cut, limits, min_length)
+        for category, hits in part.items():
+            part[category] = [(base + offset, text) for offset, text in hits]
+            if limits.get(category) is not None:
+                limits[category] -= len(hits)
+        results.append(part)
+
+        if not block or (bounded and not any(limits.values())):
+            break
+        if cut == len(buf):
+            # Oversized string cut at the block end: keep its last byte so the
+            # next block skips the remainder instead of reporting it again
+            carry, start, base = buf[-1:], 1, base + len(buf) - 1
+        else:
+            carry, start, base = buf[cut:], 0, base + cut
+
+    return merge_results(results)
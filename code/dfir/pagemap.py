@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Page Map
+Zero and duplicate page bitmap of a memory dump, stored next to it so scanners can skip empty memory
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dfir.artifact_cache import fingerprint
+from dfir.memscan import open_dump, chunk_ranges
+
+PAGE_SIZE = 4096
+
+# The map is written next to the dump as <dump>.pagemap; read-only evidence
+# directories fall back to <cache dir>/<fingerprint>.pagemap
+SIDECAR_SUFFIX = ".pagemap"
+DEFAULT_CACHE_DIR = "datasets/cache/pagemaps"
+FORMAT_VERSION = 1
+
+# Skipped runs shorter than this stay in the scanned ranges, so scattered
+# pages do not split a scan into many tiny calls
+DEFAULT_MIN_SKIP = 64 * 1024
+
+# Chunks are whole pages, so no page straddles two workers
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+DIGEST_SIZE = 16
+
+class PageMap:
+    """Per-page flags of a dump: all-zero pages and repeats of an earlier page
+
+    A duplicate's first occurrence is not flagged, so skipping the flagged
+    pages still scans every distinct page once. A trailing partial page is
+    never flagged.
+    """
+
+    def __init__(self, size, zero, duplicate, page_size=PAGE_SIZE, min_skip=DEFAULT_MIN_SKIP):
+        self.size = size
+        self.zero = zero
+        self.duplicate = duplicate
+        self.page_size = page_size
+        self.min_skip = min_skip
+        self.skipped = zero | duplicate
+
+    def summary(self):
+        """(pages, zero pages, duplicate pages, bytes left out of scans)"""
+        scanned = sum(end - start for start, end in self.live_ranges())
+        return len(self.zero), int(self.zero.sum()), int(self.duplicate.sum()), self.size - scanned
+
+    def live_ranges(self, start=0, end=None):
+        """(start, end) byte ranges of [start, end) left to scan once long skipped runs are cut out
+
+        Ranges are in order and never overlap; scanners treat each as its own
+        chunk and may read past its end to finish a match, as across chunks.
+        """
+        end = self.size if end is None else min(end, self.size)
+        first = start // self.page_size
+        last = min(-(-end // self.page_size), len(self.skipped))
+        if first >= last:
+            return [(start, end)] if start < end else []
+        flags = np.concatenate(([False], self.skipped[first:last], [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(flags))
+        ranges = []
+        position = start
+        for run_start, run_end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            skip_start = max((first + run_start) * self.page_size, start)
+            skip_end = min((first + run_end) * self.page_size, end)
+            if skip_end - skip_start < self.min_skip:
+                continue
+            if skip_start > position:
+                ranges.append((position, skip_start))
+            position = skip_end
+        if position < end:
+            ranges.append((position, end))
+        return ranges
+
+def classify_buffer(buf, start=0, end=None, page_size=PAGE_SIZE):
+    """Zero flags for the whole pages in buf[start:end], plus the digests of the non-zero ones
+
+    Zero pages are found with one vectorized pass over the mapping and are
+    not hashed; every other page gets a 16-byte BLAKE2b digest, in order.
+    """
+    end = len(buf) if end is None else end
+    pages = (end - start) // page_size
+    words = np.frombuffer(buf, dtype='<u8', count=pages * page_size // 8, offset=start)
+    zero = ~words.reshape(pages, page_size // 8).any(axis=1)
+    del words
+    view = memoryview(buf)
+    try:
+        digests = b''.join(hashlib.blake2b(view[offset:offset + page_size], digest_size=DIGEST_SIZE).digest()
+                           for offset in (start + np.flatnonzero(~zero) * page_size).tolist())
+    finally:
+        view.release()
+    return zero, digests
+
+def _classify_chunk(task):
+    """Process pool worker: map the dump and classify a single chunk"""
+    path, start, end, page_size = task
+    buf = open_dump(path)
+    try:
+        return classify_buffer(buf, start, end, page_size)
+    finally:
+        buf.close()
+
+def classify_pages(path, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, page_size=PAGE_SIZE):
+    """Build the PageMap of a dump, hashing its non-zero pages across a process pool"""
+    size = os.path.getsize(path)
+    whole = size - size % page_size
+    chunk_size -= chunk_size % page_size
+    tasks = [(path, start, end, page_size) for start, end in chunk_ranges(whole, chunk_size)]
+    if workers <= 1 or len(tasks) <= 1:
+        parts = [_classify_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_classify_chunk, tasks))
+    zero = np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, dtype=bool)
+    digests = np.frombuffer(b''.join(part[1] for part in parts), dtype=f'V{DIGEST_SIZE}')
+
+    # The first page with each content is kept, later copies are flagged
+    duplicate = ~zero
+    live = np.flatnonzero(~zero)
+    if len(live):
+        _, first = np.unique(digests, return_index=True)
+        duplicate[live[first]] = False
+    return PageMap(size, zero, duplicate, page_size)
+
+def sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+def save(pagemap, path, key):
+    """Write a PageMap as packed bitmaps; returns False if path is not writable"""
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez_compressed(f, version=FORMAT_VERSION, fingerprint=key, size=pagemap.size,
+                                page_size=pagemap.page_size, pages=len(pagemap.zero),
+                                zero=np.packbits(pagemap.zero), duplicate=np.packbits(pagemap.duplicate))
+        os.replace(path + '.tmp', path)
+    except OSError:
+        return False
+    return True
+
+def load(path, key):
+    """Read a saved PageMap, or None if it is missing, unreadable or for other content"""
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != FORMAT_VERSION or str(data['fingerprint']) != key:
+                return None
+            pages = int(data['pages'])
+            zero = np.unpackbits(data['zero'], count=pages).astype(bool)
+            duplicate = np.unpackbits(data['duplicate'], count=pages).astype(bool)
+            return PageMap(int(data['size']), zero, duplicate, int(data['page_size']))
+    except (OSError, KeyError, ValueError):
+        return None
+
+def page_map(path, workers=1, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """The PageMap of a dump, classified once and then read back from next to the dump
+
+    The stored map is tied to the dump's fingerprint, so a changed dump is
+    reclassified. Returns None for empty or missing dumps.
+    """
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return None
+    key = fingerprint(path)
+    locations = [sidecar_path(path)]
+    if cache_dir:
+        locations.append(os.path.join(cache_dir, key + SIDECAR_SUFFIX))
+    if not refresh:
+        for location in locations:
+            pagemap = load(location, key)
+            if pagemap is not None:
+                return pagemap
+
+    pagemap = classify_pages(path, workers)
+    for location in locations:
+        if save(pagemap, location, key):
+            break
+    return pagemap
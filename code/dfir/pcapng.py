@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Streaming pcapng Reader
+Memory-mapped capture parsing with protocol hierarchy, flow and time-bucket statistics
+"""
+
+import os
+import socket
+import struct
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from dfir.memscan import open_dump
+
+# Block types (pcapng, IETF draft-ietf-opsawg-pcapng)
+SECTION_HEADER = 0x0A0D0D0A
+INTERFACE_DESCRIPTION = 0x00000001
+SIMPLE_PACKET = 0x00000003
+ENHANCED_PACKET = 0x00000006
+
+OPT_END = 0
+OPT_TSRESOL = 9
+
+# Link types
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPES = {0x0800: 'ip', 0x86DD: 'ipv6', 0x0806: 'arp', 0x88CC: 'lldp', 0x8892: 'pn_rt',
+              0x88B8: 'goose', 0x88BA: 'sv', 0x88E3: 'mrp', 0x8863: 'pppoed', 0x8864: 'pppoes'}
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+IP_PROTOCOLS = {1: 'icmp', 2: 'igmp', 6: 'tcp', 17: 'udp', 47: 'gre', 50: 'esp', 58: 'icmpv6', 132: 'sctp'}
+IPV6_EXTENSIONS = (0, 43, 60)
+IPV6_FRAGMENT = 44
+
+# Application protocols by well-known port, ICS protocols first
+APP_PORTS = {502: 'modbus', 102: 'tpkt', 20000: 'dnp3', 44818: 'enip', 2222: 'enip', 47808: 'bacnet',
+             2404: 'iec104', 34962: 'pn_io', 34964: 'pn_io', 1911: 'fox', 4840: 'opcua',
+             53: 'dns', 67: 'dhcp', 68: 'dhcp', 80: 'http', 123: 'ntp', 137: 'nbns', 138: 'nbdgm',
+             139: 'nbss', 161: 'snmp', 443: 'tls', 445: 'smb', 1900: 'ssdp', 3389: 'rdp',
+             5353: 'mdns', 5355: 'llmnr', 22: 'ssh', 21: 'ftp', 23: 'telnet', 25: 'smtp'}
+
+Section = namedtuple('Section', ['endian', 'interfaces'])
+Interface = namedtuple('Interface', ['linktype', 'snaplen', 'ts_scale'])
+Dissection = namedtuple('Dissection', ['protocols', 'src', 'dst', 'transport', 'sport', 'dport', 'payload'])
+
+DEFAULT_BUCKET_SECONDS = 1.0
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+def format_address(raw):
+    """Printable form of a packed IPv4 or IPv6 address"""
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+def _bound(pick, a, b):
+    """min/max that ignores a missing (None) side"""
+    return b if a is None else a if b is None else pick(a, b)
+
+def _read_interface(buf, body, end, endian):
+    """Decode an Interface Description Block body"""
+    linktype, _, snaplen = struct.unpack_from(endian + 'HHI', buf, body)
+    ts_scale = 1e-6
+    offset = body + 8
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', buf, offset)
+        if code == OPT_END:
+            break
+        if code == OPT_TSRESOL and length >= 1:
+            resolution = buf[offset + 4]
+            ts_scale = 2.0 ** -(resolution & 0x7F) if resolution & 0x80 else 10.0 ** -resolution
+        offset += 4 + (length + 3) // 4 * 4
+    return Interface(linktype, snaplen, ts_scale)
+
+def iter_blocks(buf, start=0, end=None, section=None):
+    """Yield (offset, block_type, body_start, body_end, section) for each block
+
+    start must be a block boundary; section carries the byte order and
+    interfaces in effect there when start is not a Section Header Block.
+    A truncated final block, as left by an interrupted capture, ends the walk.
+    """
+    end = len(buf) if end is None else end
+    offset = start
+    while offset + 12 <= end:
+        if struct.unpack_from('<I', buf, offset)[0] == SECTION_HEADER:
+            magic = bytes(buf[offset + 8:offset + 12])
+            if magic == b'\x4d\x3c\x2b\x1a':
+                section = Section('<', [])
+            elif magic == b'\x1a\x2b\x3c\x4d':
+                section = Section('>', [])
+            else:
+                raise ValueError(f"bad section header byte-order magic at offset {offset}")
+        elif section is None:
+            raise ValueError("not a pcapng capture (no section header)")
+
+        block_type, length = struct.unpack_from(section.endian + 'II', buf, offset)
+        if length < 12 or length % 4:
+            raise ValueError(f"corrupt pcapng block at offset {offset}")
+        if offset + length > len(buf):
+            break
+        if block_type == INTERFACE_DESCRIPTION:
+            section.interfaces.append(_read_interface(buf, offset + 8, offset + length - 4, section.endian))
+        yield offset, block_type, offset + 8, offset + length - 4, section
+        offset += length
+
+def iter_packets(buf, start=0, end=None, section=None):
+    """Yield (timestamp, wire_length, linktype, frame) for every packet block
+
+    timestamp is in seconds since the epoch, or None for Simple Packet Blocks.
+    """
+    for offset, block_type, body, body_end, section in iter_blocks(buf, start, end, section):
+        if block_type == ENHANCED_PACKET:
+            interface_id, ts_high, ts_low, captured, wire = struct.unpack_from(section.endian + 'IIIII', buf, body)
+            if interface_id >= len(section.interfaces):
+                raise ValueError(f"packet for undeclared interface {interface_id} at offset {offset}")
+            interface = section.interfaces[interface_id]
+            frame = buf[body + 20:min(body + 20 + captured, body_end)]
+            yield ((ts_high << 32) | ts_low) * interface.ts_scale, wire, interface.linktype, frame
+        elif block_type == SIMPLE_PACKET:
+            wire = struct.unpack_from(section.endian + 'I', buf, body)[0]
+            if not section.interfaces:
+                raise ValueError(f"packet before any interface description at offset {offset}")
+            interface = section.interfaces[0]
+            captured = min(wire, interface.snaplen or wire, body_end - body - 4)
+            yield None, wire, interface.linktype, buf[body + 4:body + 4 + captured]
+
+def _iso_tsap(payload):
+    """TPKT/COTP layers on port 102 and the S7 protocol they carry"""
+    layers = ['tpkt']
+    if len(payload) >= 7 and payload[0] == 3:
+        layers.append('cotp')
+        pdu = 5 + payload[4]
+        if payload[5] == 0xF0 and len(payload) > pdu:
+            if payload[pdu] == 0x32:
+                layers.append('s7comm')
+            elif payload[pdu] == 0x72:
+                layers.append('s7comm-plus')
+    return layers
+
+def dissect(linktype, frame):
+    """Decode the link, network and transport headers of one frame
+
+    Returns a Dissection whose protocols tuple is the frame's path in the
+    protocol hierarchy (e.g. ('eth', 'ip', 'tcp', 'modbus')); addresses are
+    packed bytes and payload is the offset of the transport payload.
+    """
+    protocols = []
+    src = dst = transport = sport = dport = payload = None
+    offset = 0
+    ethertype = None
+    if linktype == LINKTYPE_ETHERNET:
+        protocols.append('eth')
+        if len(frame) >= 14:
+            ethertype = struct.unpack_from('!H', frame, 12)[0]
+            offset = 14
+            while ethertype in VLAN_ETHERTYPES and len(frame) >= offset + 4:
+                protocols.append('vlan')
+                ethertype = struct.unpack_from('!H', frame, offset + 2)[0]
+                offset += 4
+            if ethertype <= 1500:
+                protocols.append('llc')
+                ethertype = None
+    elif linktype == LINKTYPE_LINUX_SLL and len(frame) >= 16:
+        protocols.append('sll')
+        ethertype, offset = struct.unpack_from('!H', frame, 14)[0], 16
+    elif linktype == LINKTYPE_LINUX_SLL2 and len(frame) >= 20:
+        protocols.append('sll')
+        ethertype, offset = struct.unpack_from('!H', frame, 0)[0], 20
+    elif linktype == LINKTYPE_NULL and len(frame) >= 4:
+        protocols.append('null')
+        # Address family in the capturing host's byte order
+        family = struct.unpack_from('<I', frame, 0)[0]
+        if family > 0xFFFF:
+            family = struct.unpack_from('>I', frame, 0)[0]
+        ethertype, offset = {2: 0x0800, 24: 0x86DD, 28: 0x86DD, 30: 0x86DD}.get(family), 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6) and frame:
+        ethertype = 0x0800 if frame[0] >> 4 == 4 else 0x86DD if frame[0] >> 4 == 6 else None
+    else:
+        protocols.append(f'linktype-{linktype}')
+
+    if ethertype is not None:
+        protocols.append(ETHERTYPES.get(ethertype, f'ethertype-0x{ethertype:04x}'))
+
+    end = len(frame)
+    ip_proto = None
+    if ethertype == 0x0800 and len(frame) >= offset + 20:
+        header = (frame[offset] & 0x0F) * 4
+        total = struct.unpack_from('!H', frame, offset + 2)[0]
+        if total:
+            # Zero with TCP segmentation offload: trust the captured length
+            end = min(end, offset + total)
+        fragment = struct.unpack_from('!H', frame, offset + 6)[0] & 0x1FFF
+        ip_proto = frame[offset + 9]
+        src, dst = frame[offset + 12:offset + 16], frame[offset + 16:offset + 20]
+        offset += header
+        if fragment:
+            protocols.append('data')
+            ip_proto = None
+    elif ethertype == 0x86DD and len(frame) >= offset + 40:
+        end = min(end, offset + 40 + struct.unpack_from('!H', frame, offset + 4)[0])
+        ip_proto = frame[offset + 6]
+        src, dst = frame[offset + 8:offset + 24], frame[offset + 24:offset + 40]
+        offset += 40
+        while ip_proto in IPV6_EXTENSIONS and len(frame) >= offset + 8:
+            ip_proto, offset = frame[offset], offset + (frame[offset + 1] + 1) * 8
+        if ip_proto == IPV6_FRAGMENT:
+            protocols.append('data')
+            ip_proto = None
+
+    if ip_proto is not None:
+        transport = IP_PROTOCOLS.get(ip_proto, f'ipproto-{ip_proto}')
+        protocols.append(transport)
+        if transport == 'tcp' and end >= offset + 20:
+            sport, dport = struct.unpack_from('!HH', frame, offset)
+            payload = offset + (frame[offset + 12] >> 4) * 4
+        elif transport == 'udp' and end >= offset + 8:
+            sport, dport = struct.unpack_from('!HH', frame, offset)
+            payload = offset + 8
+
+    if payload is not None and payload < end:
+        app = APP_PORTS.get(dport) or APP_PORTS.get(sport)
+        if app == 'tpkt':
+            protocols.extend(_iso_tsap(frame[payload:end]))
+        elif app:
+            protocols.append(app)
+        else:
+            protocols.append('data')
+    return Dissection(tuple(protocols), src, dst, transport, sport, dport, payload)
+
+class CaptureStats:
+    """Running capture statistics whose size depends on protocols, flows and duration, not packets"""
+
+    def __init__(self, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.packets = 0
+        self.bytes = 0
+        self.first = None
+        self.last = None
+        self.paths = {}
+        self.flows = {}
+        self.buckets = {}
+
+    def add(self, timestamp, length, dissection):
+        """Account one packet"""
+        self.packets += 1
+        self.bytes += length
+
+        counts = self.paths.get(dissection.protocols)
+        if counts is None:
+            counts = self.paths[dissection.protocols] = [0, 0]
+        counts[0] += 1
+        counts[1] += length
+
+        if dissection.src is not None:
+            key = (dissection.transport, dissection.src, dissection.sport, dissection.dst, dissection.dport)
+            flow = self.flows.get(key)
+            if flow is None:
+                flow = self.flows[key] = [0, 0, timestamp, timestamp]
+            flow[0] += 1
+            flow[1] += length
+            flow[2] = _bound(min, flow[2], timestamp)
+            flow[3] = _bound(max, flow[3], timestamp)
+
+        if timestamp is not None:
+            self.first = _bound(min, self.first, timestamp)
+            self.last = _bound(max, self.last, timestamp)
+            bucket = self.buckets.get(int(timestamp // self.bucket_seconds))
+            if bucket is None:
+                bucket = self.buckets[int(timestamp // self.bucket_seconds)] = [0, 0]
+            bucket[0] += 1
+            bucket[1] += length
+
+    def merge(self, other):
+        """Fold in statistics from another range of the same capture"""
+        self.packets += other.packets
+        self.bytes += other.bytes
+        self.first = _bound(min, self.first, other.first)
+        self.last = _bound(max, self.last, other.last)
+        for path, (frames, size) in other.paths.items():
+            counts = self.paths.setdefault(path, [0, 0])
+            counts[0] += frames
+            counts[1] += size
+        for key, (packets, size, first, last) in other.flows.items():
+            flow = self.flows.get(key)
+            if flow is None:
+                self.flows[key] = [packets, size, first, last]
+                continue
+            flow[0] += packets
+            flow[1] += size
+            flow[2] = _bound(min, flow[2], first)
+            flow[3] = _bound(max, flow[3], last)
+        for index, (packets, size) in other.buckets.items():
+            bucket = self.buckets.setdefault(index, [0, 0])
+            bucket[0] += packets
+            bucket[1] += size
+        return self
+
+    def protocol_hierarchy(self):
+        """(depth, protocol, frames, bytes) rows in tree order, like `tshark -z io,phs`"""
+        totals = {}
+        for path, (frames, size) in self.paths.items():
+            for depth in range(1, len(path) + 1):
+                counts = totals.setdefault(path[:depth], [0, 0])
+                counts[0] += frames
+                counts[1] += size
+        return [(len(prefix) - 1, prefix[-1], frames, size) for prefix, (frames, size) in sorted(totals.items())]
+
+    def top_flows(self, count=10):
+        """The count largest flows by bytes as dicts with printable addresses"""
+        flows = sorted(self.flows.items(), key=lambda item: item[1][1], reverse=True)[:count]
+        return [{"transport": transport, "src": format_address(src), "sport": sport,
+                 "dst": format_address(dst), "dport": dport, "packets": packets, "bytes": size,
+                 "first": first, "last": last}
+                for (transport, src, sport, dst, dport), (packets, size, first, last) in flows]
+
+    def timeline(self):
+        """(bucket start time, packets, bytes) for every non-empty time bucket"""
+        return [(index * self.bucket_seconds, packets, size)
+                for index, (packets, size) in sorted(self.buckets.items())]
+
+def read_buffer(buf, start=0, end=None, section=None, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+    """Accumulate statistics for the packet blocks in buf[start:end]"""
+    stats = CaptureStats(bucket_seconds)
+    for timestamp, length, linktype, frame in iter_packets(buf, start, end, section):
+        stats.add(timestamp, length, dissect(linktype, frame))
+    return stats
+
+def plan_ranges(buf, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Split a capture at block boundaries into (start, end, section) ranges of about chunk_size bytes
+
+    Each range carries a snapshot of the section state (byte order and
+    interfaces) in effect at its start, so it can be parsed on its own.
+    """
+    ranges = []
+    range_start, range_section = 0, None
+    for offset, block_type, _, _, section in iter_blocks(buf):
+        if offset - range_start >= chunk_size:
+            ranges.append((range_start, offset, range_section))
+            range_start = offset
+            # iter_blocks has already applied this block, and the new range
+            # parses it again: snapshot the interfaces declared before it
+            interfaces = section.interfaces[:-1] if block_type == INTERFACE_DESCRIPTION else section.interfaces
+            range_section = Section(section.endian, list(interfaces))
+    ranges.append((range_start, len(buf), range_section))
+    return ranges
+
+def _read_range(task):
+    """Process pool worker: map the capture and parse a single block range"""
+    path, start, end, section, bucket_seconds = task
+    buf = open_dump(path)
+    try:
+        return read_buffer(buf, start, end, section, bucket_seconds)
+    finally:
+        buf.close()
+
+def read_capture(path, workers=1, bucket_seconds=DEFAULT_BUCKET_SECONDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parse a pcapng capture into CaptureStats without loading it into memory
+
+    With workers > 1 large captures are cut at block boundaries and the
+    ranges are parsed by a process pool, then merged.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return CaptureStats(bucket_seconds)
+
+    buf = open_dump(path)
+    try:
+        if workers <= 1 or size <= chunk_size:
+            return read_buffer(buf, bucket_seconds=bucket_seconds)
+        ranges = plan_ranges(buf, chunk_size)
+    finally:
+        buf.close()
+
+    tasks = [(path, start, end, section, bucket_seconds) for start, end, section in ranges]
+    stats = CaptureStats(bucket_seconds)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for part in executor.map(_read_range, tasks):
+            stats.merge(part)
+    return stats
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+PLC Memory Differential Analysis
+Block hashing of PLC RAM snapshots and byte-level diffs of the blocks that changed
+"""
+
+import hashlib
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dfir.memscan import open_dump
+
+DEFAULT_BLOCK_SIZE = 4096
+DIGEST_SIZE = 16
+
+# Blocks hashed per worker task
+TASK_BLOCKS = 16384
+
+HashedDump = namedtuple('HashedDump', ['path', 'size', 'block_size', 'digests'])
+ByteRun = namedtuple('ByteRun', ['offset', 'before', 'after'])
+RegionDiff = namedtuple('RegionDiff', ['start', 'end', 'runs'])
+SnapshotDiff = namedtuple('SnapshotDiff', ['before', 'after', 'changed_blocks', 'regions'])
+
+def _hash_range(task):
+    """Digest blocks [first, last) of a dump; runs in a worker process"""
+    path, first, last, block_size = task
+    digests = np.zeros((last - first, DIGEST_SIZE), dtype=np.uint8)
+    buf = open_dump(path)
+    if buf is None:
+        return digests
+    try:
+        for i in range(first, last):
+            block = buf[i * block_size:(i + 1) * block_size]
+            digests[i - first] = np.frombuffer(hashlib.blake2b(block, digest_size=DIGEST_SIZE).digest(), np.uint8)
+    finally:
+        buf.close()
+    return digests
+
+def _block_count(size, block_size):
+    return (size + block_size - 1) // block_size
+
+def hash_dumps(paths, block_size=DEFAULT_BLOCK_SIZE, workers=1):
+    """Hash every fixed-size block of every dump exactly once
+
+    Blocks of all dumps are spread over one process pool, so many small
+    snapshots and a few large ones parallelize equally well. The final
+    short block of a dump is hashed as is.
+    """
+    sizes = [os.path.getsize(path) for path in paths]
+    tasks = [(path, first, min(first + TASK_BLOCKS, _block_count(size, block_size)), block_size)
+             for path, size in zip(paths, sizes)
+             for first in range(0, _block_count(size, block_size), TASK_BLOCKS)]
+    if workers <= 1 or len(tasks) <= 1:
+        parts = [_hash_range(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_hash_range, tasks))
+
+    hashed = []
+    for path, size in zip(paths, sizes):
+        own = [part for task, part in zip(tasks, parts) if task[0] == path]
+        digests = np.concatenate(own) if own else np.zeros((0, DIGEST_SIZE), dtype=np.uint8)
+        hashed.append(HashedDump(path, size, block_size, digests))
+    return hashed
+
+def changed_blocks(before, after):
+    """Indices of blocks whose digests differ, including blocks only one dump has"""
+    common = min(len(before.digests), len(after.digests))
+    differs = np.any(before.digests[:common] != after.digests[:common], axis=1)
+    extra = np.arange(common, max(len(before.digests), len(after.digests)))
+    return np.concatenate([np.flatnonzero(differs), extra])
+
+def coalesce(blocks, block_size):
+    """Merge consecutive block indices into (start, end) byte ranges"""
+    if len(blocks) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(blocks) != 1) + 1
+    return [(int(run[0]) * block_size, (int(run[-1]) + 1) * block_size) for run in np.split(blocks, breaks)]
+
+def byte_runs(before_buf, after_buf, start, end, max_runs=None):
+    """Runs of differing bytes in [start, end), comparing only this range of both dumps"""
+    a = np.frombuffer(before_buf[start:min(end, len(before_buf))] if before_buf else b'', dtype=np.uint8)
+    b = np.frombuffer(after_buf[start:min(end, len(after_buf))] if after_buf else b'', dtype=np.uint8)
+    common = min(len(a), len(b))
+    positions = np.flatnonzero(a[:common] != b[:common])
+    if max(len(a), len(b)) > common:
+        # One dump is longer: its tail is a change against nothing
+        positions = np.concatenate([positions, np.arange(common, max(len(a), len(b)))])
+
+    runs = []
+    if len(positions):
+        breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+        for run in np.split(positions, breaks)[:max_runs]:
+            first, last = int(run[0]), int(run[-1]) + 1
+            runs.append(ByteRun(start + first, a[first:last].tobytes(), b[first:last].tobytes()))
+    return runs
+
+def diff_snapshots(before, after, max_runs=16):
+    """Changed regions between two hashed dumps, with byte diffs for those regions only"""
+    blocks = changed_blocks(before, after)
+    regions = []
+    if len(blocks):
+        before_buf, after_buf = open_dump(before.path), open_dump(after.path)
+        try:
+            size = max(before.size, after.size)
+            for start, end in coalesce(blocks, before.block_size):
+                end = min(end, size)
+                regions.append(RegionDiff(start, end, byte_runs(before_buf, after_buf, start, end, max_runs)))
+        finally:
+            for buf in (before_buf, after_buf):
+                if buf is not None:
+                    buf.close()
+    return SnapshotDiff(before.path, after.path, len(blocks), regions)
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+def snapshot_series(paths):
+    """Group dumps of the same memory (e.g. External RAM, On-Chip RAM) into ordered series
+
+    Dumps belong to one series when their file names only differ in digits,
+    such as snapshot numbers or timestamps; each series is in natural order.
+    """
+    series = {}
+    for path in sorted(paths, key=lambda p: _natural_key(os.path.basename(p))):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        series.setdefault(re.sub(r'\d+', '#', stem), []).append(path)
+    return series
+
+def compare_snapshots(paths, block_size=DEFAULT_BLOCK_SIZE, workers=1, max_runs=16):
+    """Diff each snapshot against the next one of its series after a single hash pass
+
+    All dumps are hashed together once; returns {series: (hashed dumps,
+    [SnapshotDiff for consecutive pairs])}.
+    """
+    series = snapshot_series(paths)
+    ordered = [path for members in series.values() for path in members]
+    by_path = dict(zip(ordered, hash_dumps(ordered, block_size, workers)))
+    results = {}
+    for name, members in series.items():
+        hashed = [by_path[path] for path in members]
+        results[name] = (hashed, [diff_snapshots(before, after, max_runs)
+                                  for before, after in zip(hashed, hashed[1:])])
+    return results
+
+def change_frequency(hashed):
+    """Per-block count of snapshot-to-snapshot changes across a whole series"""
+    if len(hashed) < 2:
+        return np.zeros(len(hashed[0].digests) if hashed else 0, dtype=np.int64)
+    blocks = max(len(dump.digests) for dump in hashed)
+    counts = np.zeros(blocks, dtype=np.int64)
+    for before, after in zip(hashed, hashed[1:]):
+        np.add.at(counts, changed_blocks(before, after), 1)
+    return counts
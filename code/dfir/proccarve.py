@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Process Carving
+Vectorized pool-tag scan of raw memory for Windows EPROCESS structures
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dfir.memscan import open_dump, chunk_ranges, live_ranges
+
+# x64 pool headers are 16-byte aligned and carry the pool tag at +4. "Proc"
+# tags process allocations; Windows 7 sets the protected bit in the last byte.
+POOL_ALIGNMENT = 16
+POOL_TAG_OFFSET = 4
+PROCESS_TAGS = (b'Proc', b'Pro\xe3')
+
+# The EPROCESS body follows the 16-byte pool header, the optional object
+# header infos present for the allocation (up to 0xb0 bytes) and the 0x30-byte
+# OBJECT_HEADER, so it starts at one of these 16-byte steps after the tag's header
+BODY_OFFSETS = np.arange(0x40, 0x100, POOL_ALIGNMENT)
+
+# KPROCESS dispatcher header type of a process object
+PROCESS_OBJECT_TYPE = 3
+
+# EPROCESS field offsets (x64); size covers the last field read
+Profile = namedtuple('Profile', ['name', 'pid', 'links', 'create_time', 'ppid', 'image_name', 'size'])
+PROFILES = [
+    Profile('win10_19041_x64', 0x440, 0x448, 0x468, 0x540, 0x5a8, 0x5b7),
+    Profile('win7sp1_x64', 0x180, 0x188, 0x168, 0x290, 0x2e0, 0x2ef),
+]
+IMAGE_NAME_LENGTH = 15
+
+# Create times outside 2000-2100 mark a candidate as garbage
+FILETIME_EPOCH_OFFSET = 11644473600
+FILETIME_MIN = (946684800 + FILETIME_EPOCH_OFFSET) * 10 ** 7
+FILETIME_MAX = (4102444800 + FILETIME_EPOCH_OFFSET) * 10 ** 7
+
+MAX_PID = 1 << 24
+
+# Each worker owns the tags in its chunk and reads past it far enough to
+# validate a structure that starts near the end
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_OVERLAP = 4096
+
+CarvedProcess = namedtuple('CarvedProcess', ['offset', 'pid', 'ppid', 'name', 'create_time', 'profile'])
+
+def tag_offsets(buf, start=0, end=None):
+    """Offsets of process pool tags whose pool header lies in buf[start:end]
+
+    Only the tag word of each 16-byte slot is compared, over a zero-copy
+    view of the mapping, so the scan runs at memory bandwidth.
+    """
+    end = len(buf) if end is None else end
+    first = start + (-start % POOL_ALIGNMENT)
+    slots = (end - first) // POOL_ALIGNMENT
+    if slots <= 0:
+        return np.zeros(0, dtype=np.int64)
+    words = np.frombuffer(buf, dtype='<u4', count=slots * POOL_ALIGNMENT // 4, offset=first)
+    tags = words.reshape(slots, POOL_ALIGNMENT // 4)[:, POOL_TAG_OFFSET // 4]
+    hits = np.zeros(slots, dtype=bool)
+    for tag in PROCESS_TAGS:
+        hits |= tags == int.from_bytes(tag, 'little')
+    return first + np.flatnonzero(hits).astype(np.int64) * POOL_ALIGNMENT
+
+def _gather(data, bases, offset, length):
+    """(len(bases), length) bytes at bases + offset"""
+    return data[bases[:, None] + (offset + np.arange(length))]
+
+def _field(data, bases, offset, dtype):
+    dtype = np.dtype(dtype)
+    return _gather(data, bases, offset, dtype.itemsize).view(dtype).ravel()
+
+def _image_names(raw):
+    """Lengths of NUL-terminated printable names, 0 for invalid ones"""
+    nul = raw == 0
+    length = np.where(nul.any(axis=1), nul.argmax(axis=1), raw.shape[1])
+    inside = np.arange(raw.shape[1]) < length[:, None]
+    printable = (raw >= 0x20) & (raw < 0x7f)
+    return np.where((printable | ~inside).all(axis=1), length, 0)
+
+def validate(data, bases, profile):
+    """Mask of candidate EPROCESS bases that pass the profile's sanity checks, plus their fields"""
+    pid = _field(data, bases, profile.pid, '<u8')
+    ppid = _field(data, bases, profile.ppid, '<u8')
+    created = _field(data, bases, profile.create_time, '<u8')
+    flink = _field(data, bases, profile.links, '<u8')
+    blink = _field(data, bases, profile.links + 8, '<u8')
+    names = _gather(data, bases, profile.image_name, IMAGE_NAME_LENGTH)
+    lengths = _image_names(names)
+    valid = ((data[bases] == PROCESS_OBJECT_TYPE)
+             & (pid > 0) & (pid < MAX_PID) & (pid % 4 == 0)
+             & (ppid < MAX_PID) & (ppid % 4 == 0)
+             & (created >= FILETIME_MIN) & (created <= FILETIME_MAX)
+             & (flink >> np.uint64(48) == 0xffff) & (blink >> np.uint64(48) == 0xffff)
+             & (lengths > 0))
+    return valid, pid, ppid, created, names, lengths
+
+def carve_buffer(buf, start=0, end=None, overlap=DEFAULT_OVERLAP, profiles=PROFILES):
+    """Carve processes whose pool header lies in buf[start:end]; returns CarvedProcesses in offset order
+
+    Every tag hit is paired with each possible body offset and validated
+    against each profile in one vectorized pass; the first candidate that
+    passes wins, so each allocation yields at most one process.
+    """
+    end = len(buf) if end is None else end
+    limit = min(end + overlap, len(buf))
+    hits = tag_offsets(buf, start, end)
+    if not len(hits):
+        return []
+    data = np.frombuffer(buf, dtype=np.uint8, count=limit - start, offset=start)
+    headers = hits - start
+
+    carved = {}
+    candidates = (headers[:, None] + BODY_OFFSETS[None, :]).ravel()
+    owners = np.repeat(np.arange(len(headers)), len(BODY_OFFSETS))
+    for profile in profiles:
+        inside = candidates + profile.size < len(data)
+        bases, hit = candidates[inside], owners[inside]
+        if not len(bases):
+            continue
+        valid, pid, ppid, created, names, lengths = validate(data, bases, profile)
+        for i in np.flatnonzero(valid).tolist():
+            if hit[i] in carved:
+                continue
+            name = names[i, :lengths[i]].tobytes().decode('ascii')
+            carved[hit[i]] = CarvedProcess(start + int(bases[i]), int(pid[i]), int(ppid[i]), name,
+                                           int(created[i]) / 10 ** 7 - FILETIME_EPOCH_OFFSET, profile.name)
+    return sorted(carved.values())
+
+def _carve_chunk(task):
+    """Process pool worker: map the dump and carve the live ranges of a single chunk"""
+    path, ranges, overlap = task
+    buf = open_dump(path)
+    try:
+        return [process for start, end in ranges for process in carve_buffer(buf, start, end, overlap)]
+    finally:
+        buf.close()
+
+def carve_processes(path, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP, pagemap=None):
+    """Carve every EPROCESS in a raw memory image, including exited and unlinked ones
+
+    Returns CarvedProcesses (offset of the EPROCESS in the file, PID, PPID,
+    image name, create time as a Unix timestamp, matching profile) in offset
+    order. With a pagemap, pool tags are only looked for in the pages it
+    leaves to scan.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    if workers <= 1 or size <= chunk_size:
+        buf = open_dump(path)
+        try:
+            return [process for start, end in chunk_ranges(size, chunk_size)
+                    for first, last in live_ranges(pagemap, start, end)
+                    for process in carve_buffer(buf, first, last, overlap)]
+        finally:
+            buf.close()
+
+    tasks = [(path, live_ranges(pagemap, start, end), overlap) for start, end in chunk_ranges(size, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [process for processes in executor.map(_carve_chunk, tasks) for process in processes]
+
+def process_tree(processes):
+    """(depth, process) rows with children under their parents, ordered by create time
+
+    A process's parent is the latest carved process with its PPID created
+    before it, so reused PIDs attach to the right instance; processes
+    without one start a new root.
+    """
+    ordered = sorted(processes, key=lambda p: (p.create_time, p.offset))
+    by_pid = {}
+    for process in ordered:
+        by_pid.setdefault(process.pid, []).append(process)
+    children = {}
+    roots = []
+    for process in ordered:
+        earlier = [p for p in by_pid.get(process.ppid, []) if p.create_time < process.create_time]
+        if earlier:
+            children.setdefault(earlier[-1], []).append(process)
+        else:
+            roots.append(process)
+    rows = []
+    stack = [(0, process) for process in reversed(roots)]
+    while stack:
+        depth, process = stack.pop()
+        rows.append((depth, process))
+        stack.extend((depth + 1, child) for child in reversed(children.get(process, [])))
+    return rows
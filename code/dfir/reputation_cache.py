@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Two-tier Reputation Cache
+In-process LRU in front of a SQLite store, with per-IOC-type TTLs and negative caching
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = "datasets/cache/reputation.db"
+DEFAULT_MEMORY_SIZE = 4096
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Verdicts for hashes are stable, infrastructure (IPs, domains) changes hands
+DEFAULT_TTLS = {"ip": DAY, "domain": 12 * HOUR, "hash": 30 * DAY}
+DEFAULT_TTL = DAY
+
+# Verdicts with no engine coverage are retried sooner; failed lookups are
+# not cached at all
+NEGATIVE_TTL = HOUR
+
+# Provider of verdicts from the local stand-in server
+LOCAL_PROVIDER = "local"
+
+# Verdicts are stored per provider, so pointing the lookups at another
+# service never serves the previous one's results
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reputation (
+    provider TEXT NOT NULL,
+    ioc_type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    result TEXT NOT NULL,
+    negative INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (provider, ioc_type, value)
+);
+CREATE INDEX IF NOT EXISTS reputation_expiry ON reputation (expires);
+"""
+
+def cache_key(ioc_type, value):
+    """Domains and hashes are case-insensitive, other indicators are kept verbatim"""
+    return ioc_type, value.lower() if ioc_type in ("domain", "hash") else value
+
+def is_negative(result):
+    """A result carries no verdict when no engine reported on the indicator"""
+    return not result or result.get("total", 0) == 0
+
+def is_failure(result):
+    """The lookup itself failed (transport error, provider error), so there is no answer to keep"""
+    return not result or bool(result.get("failed"))
+
+def _create_schema(db):
+    """Create the table, dropping one from before verdicts were stored per provider"""
+    columns = [row[1] for row in db.execute("PRAGMA table_info(reputation)")]
+    if columns and "provider" not in columns:
+        with db:
+            db.execute("DROP TABLE reputation")
+    db.executescript(SCHEMA)
+
+class ReputationCache:
+    """LRU + SQLite cache of one provider's reputation results, safe to share between threads
+
+    provider names the service the results come from (e.g. its base URL);
+    entries of other providers in the same database are never returned.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None, negative_ttl=NEGATIVE_TTL,
+                 memory_size=DEFAULT_MEMORY_SIZE, provider=LOCAL_PROVIDER):
+        self.provider = provider
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        _create_schema(self.db)
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "stores": 0}
+
+    def close(self):
+        """Close the on-disk store"""
+        with self._lock:
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remember(self, key, expires, result):
+        self._memory[key] = (expires, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, ioc_type, value):
+        """Return a cached, unexpired result or None"""
+        key = cache_key(ioc_type, value)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            row = self.db.execute("SELECT result, expires FROM reputation "
+                                  "WHERE provider = ? AND ioc_type = ? AND value = ?",
+                                  (self.provider, *key)).fetchone()
+            if row is not None and row[1] > now:
+                result = json.loads(row[0])
+                self._remember(key, row[1], result)
+                self.counters["disk_hits"] += 1
+                return result
+            if row is not None:
+                self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, ioc_type, value, result):
+        """Store a result with the TTL of its IOC type, or the negative TTL; failed lookups are not stored"""
+        if is_failure(result):
+            return
+        key = cache_key(ioc_type, value)
+        negative = is_negative(result)
+        ttl = self.negative_ttl if negative else self.ttls.get(ioc_type, DEFAULT_TTL)
+        expires = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires, result)
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO reputation VALUES (?, ?, ?, ?, ?, ?)",
+                                (self.provider, *key, json.dumps(result), int(negative), expires))
+            self.counters["stores"] += 1
+
+    def invalidate(self, ioc_type=None, value=None):
+        """Drop one of this provider's entries, every entry of a type, or all of them"""
+        with self._lock:
+            with self.db:
+                if value is not None:
+                    key = cache_key(ioc_type, value)
+                    self._memory.pop(key, None)
+                    self.db.execute("DELETE FROM reputation WHERE provider = ? AND ioc_type = ? AND value = ?",
+                                    (self.provider, *key))
+                elif ioc_type is not None:
+                    for key in [k for k in self._memory if k[0] == ioc_type]:
+                        del self._memory[key]
+                    self.db.execute("DELETE FROM reputation WHERE provider = ? AND ioc_type = ?",
+                                    (self.provider, ioc_type))
+                else:
+                    self._memory.clear()
+                    self.db.execute("DELETE FROM reputation WHERE provider = ?", (self.provider,))
+
+    def purge_expired(self):
+        """Delete expired rows from disk; returns how many were removed"""
+        with self._lock:
+            with self.db:
+                return self.db.execute("DELETE FROM reputation WHERE expires <= ?", (time.time(),)).rowcount
+
+    def stats(self):
+        """Hit/miss counters plus the overall hit ratio"""
+        stats = dict(self.counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+def lookup_with_cache(indicators, lookup, cache):
+    """Resolve indicators from the cache, calling lookup once for the distinct misses
+
+    lookup receives a list of {"type", "value"} dicts and returns one result
+    per entry, e.g. dfir.enrichment.enrich_indicators bound to the service
+    URL the cache's provider names. Failed lookups are returned but not
+    cached, so the next call asks again.
+    """
+    results = [cache.get(indicator["type"], indicator["value"]) for indicator in indicators]
+    missing = {}
+    for indicator, result in zip(indicators, results):
+        if result is None:
+            missing.setdefault(cache_key(indicator["type"], indicator["value"]), indicator)
+
+    if missing:
+        fetched = dict(zip(missing, lookup(list(missing.values()))))
+        for key, result in fetched.items():
+            cache.put(missing[key]["type"], missing[key]["value"], result)
+        results = [result if result is not None else fetched[cache_key(indicator["type"], indicator["value"])]
+                   for indicator, result in zip(indicators, results)]
+    return results
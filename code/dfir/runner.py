@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Streaming Command Runner
+Line-by-line subprocess output with progress-based timeouts and early termination
+"""
+
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+from dfir.tracing import span
+
+# A command is only timed out after this long without producing a line,
+# so slow-but-progressing tools on large evidence run to completion
+DEFAULT_IDLE_TIMEOUT = 60
+
+# Grace period between SIGTERM and SIGKILL when stopping a command
+TERMINATE_GRACE = 2
+
+STDERR_LINES = 200
+
+# Lines read ahead of a slow consumer before the command is held back by the pipe
+LINE_BUFFER = 256
+
+OK = "ok"
+LIMIT = "limit"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+CommandResult = namedtuple('CommandResult', ['results', 'stderr', 'returncode', 'status', 'elapsed'])
+
+def feed_stream(stream, pipe):
+    """Copy a stream into a subprocess pipe, stopping quietly if the reader exits"""
+    try:
+        shutil.copyfileobj(stream, pipe, 1024 * 1024)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+def _stop(process):
+    """Terminate the command's whole process group, escalating to SIGKILL"""
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def iter_command(command, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=None, stdin=None, outcome=None):
+    """Yield a command's stdout lines as they are produced
+
+    command is an argument list, or a string run through the shell. The
+    command is stopped if it produces no line for idle_timeout seconds or
+    runs longer than timeout (None: no overall limit). At most LINE_BUFFER
+    lines are read ahead of the caller, so a slow parser throttles the
+    command through the pipe instead of buffering its output; time spent
+    waiting on the parser does not count as idle. Closing the generator
+    early stops the command. outcome, if given, is filled with status,
+    returncode and the last stderr lines once iteration ends.
+    """
+    outcome = outcome if outcome is not None else {}
+    process = subprocess.Popen(command, shell=isinstance(command, str), text=True, errors='replace',
+                               stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    stderr = deque(maxlen=STDERR_LINES)
+    threading.Thread(target=lambda: stderr.extend(process.stderr), daemon=True).start()
+    if stdin is not None:
+        threading.Thread(target=feed_stream, args=(stdin, process.stdin.buffer), daemon=True).start()
+
+    started = time.monotonic()
+    lines = queue.Queue(maxsize=LINE_BUFFER)
+    finished = threading.Event()
+    # When the reader last got output from the command; None while it waits
+    # on a full queue (a slow consumer is not an idle command) and after EOF
+    activity = {'output': started}
+    outcome['status'] = OK
+
+    def offer(item):
+        """Queue an item for the consumer unless iteration has ended"""
+        while not finished.is_set():
+            try:
+                lines.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_output():
+        try:
+            for line in process.stdout:
+                activity['output'] = None
+                if not offer(line):
+                    return
+                activity['output'] = time.monotonic()
+        finally:
+            activity['output'] = None
+            process.stdout.close()
+            offer(None)
+
+    def watchdog():
+        while not finished.wait(min(1.0, idle_timeout / 4)):
+            now = time.monotonic()
+            output = activity['output']
+            idle = output is not None and now - output > idle_timeout
+            if idle or (timeout is not None and now - started > timeout):
+                outcome['status'] = TIMEOUT
+                _stop(process)
+                return
+
+    threading.Thread(target=read_output, daemon=True).start()
+    threading.Thread(target=watchdog, daemon=True).start()
+    try:
+        for line in iter(lines.get, None):
+            yield line.rstrip('\n')
+    except GeneratorExit:
+        if outcome['status'] == OK:
+            outcome['status'] = LIMIT
+        raise
+    finally:
+        finished.set()
+        _stop(process)
+        process.wait()
+        outcome['returncode'] = process.returncode
+        outcome['stderr'] = ''.join(stderr)
+
+def run_streaming(command, parse=None, limit=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=None, stdin=None):
+    """Run a command, feeding each output line to an incremental parser
+
+    parse maps a line to a result or None to skip it (default: keep every
+    line). Once limit results are collected the command is stopped, which
+    replaces piping through `head -N`. Returns a CommandResult; status is
+    "ok", "limit" (stopped early), "timeout" or "error" (could not start).
+    """
+    outcome = {}
+    results = []
+    started = time.monotonic()
+    label = command if isinstance(command, str) else ' '.join(command)
+    with span(label[:80], "subprocess") as details:
+        try:
+            lines = iter_command(command, idle_timeout, timeout, stdin, outcome)
+            try:
+                for line in lines:
+                    result = parse(line) if parse else line
+                    if result is None:
+                        continue
+                    results.append(result)
+                    if limit is not None and len(results) >= limit:
+                        break
+            finally:
+                lines.close()
+        except OSError as e:
+            outcome = {'status': ERROR, 'returncode': 1, 'stderr': str(e)}
+        details.update(status=outcome['status'], returncode=outcome['returncode'], lines=len(results))
+    return CommandResult(results, outcome['stderr'], outcome['returncode'], outcome['status'],
+                         time.monotonic() - started)
+
+def run_command(command, timeout=None, limit=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Drop-in for the old buffered helpers: returns (stdout, stderr, returncode)
+
+    Output is still streamed, so timeouts track progress rather than total
+    run time, and limit stops the command after that many lines. A command
+    stopped at its limit reports returncode 0.
+    """
+    result = run_streaming(command, limit=limit, idle_timeout=idle_timeout, timeout=timeout)
+    stdout = ''.join(line + '\n' for line in result.results)
+    if result.status == LIMIT:
+        return stdout, result.stderr, 0
+    if result.status == TIMEOUT:
+        return stdout, result.stderr or "command timed out", result.returncode or 1
+    return stdout, result.stderr, result.returncode
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Phase Dependency Scheduler
+Runs case study phases as a DAG on bounded worker pools with timeouts and retries
+"""
+
+import contextlib
+import io
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dfir.tracing import span
+
+PhaseResult = namedtuple('PhaseResult', ['name', 'status', 'value', 'error', 'attempts', 'elapsed', 'output'])
+
+OK = "ok"
+FAILED = "failed"
+TIMEOUT = "timeout"
+SKIPPED = "skipped"
+
+DEFAULT_POOLS = {"default": 4}
+
+# Longest wait between checks while a timed attempt is still queued, so its
+# clock starts soon after a worker picks it up
+POLL_INTERVAL = 0.1
+
+class Phase:
+    """One unit of work in the case study graph
+
+    action is called with a dict mapping each dependency name to its return
+    value. timeout is in seconds per attempt, counted from when a worker
+    starts it. A failed attempt is retried up to retries more times before
+    dependents are skipped; a timed out one is not (see run_phases).
+    """
+
+    def __init__(self, name, action, depends=(), pool="default", timeout=None, retries=0):
+        self.name = name
+        self.action = action
+        self.depends = list(depends)
+        self.pool = pool
+        self.timeout = timeout
+        self.retries = retries
+
+class ThreadLocalStdout:
+    """sys.stdout stand-in that lets each thread print into its own buffer"""
+
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def swap(self, target):
+        """Redirect the calling thread's output, returning the previous target"""
+        previous = getattr(self._local, 'target', None)
+        self._local.target = target
+        return previous
+
+    def _target(self):
+        return getattr(self._local, 'target', None) or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.default, name)
+
+@contextlib.contextmanager
+def captured_stdout():
+    """Capture prints from the calling thread only, safe while other phases run"""
+    buffer = io.StringIO()
+    proxy = sys.stdout
+    if isinstance(proxy, ThreadLocalStdout):
+        previous = proxy.swap(buffer)
+        try:
+            yield buffer
+        finally:
+            proxy.swap(previous)
+    else:
+        with contextlib.redirect_stdout(buffer):
+            yield buffer
+
+def topological_order(phases):
+    """Validate the graph and return phase names in a dependency-respecting order"""
+    by_name = {phase.name: phase for phase in phases}
+    if len(by_name) != len(phases):
+        raise ValueError("duplicate phase names")
+    for phase in phases:
+        for dep in phase.depends:
+            if dep not in by_name:
+                raise ValueError(f"phase {phase.name} depends on unknown phase {dep}")
+
+    order = []
+    indegree = {phase.name: len(phase.depends) for phase in phases}
+    ready = [phase.name for phase in phases if not phase.depends]
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for phase in phases:
+            if name in phase.depends:
+                indegree[phase.name] -= 1
+                if indegree[phase.name] == 0:
+                    ready.append(phase.name)
+    if len(order) != len(phases):
+        raise ValueError("phase dependencies contain a cycle")
+    return order
+
+def _run_attempt(phase, inputs, attempt):
+    """Worker body: run one traced attempt with this thread's output captured
+
+    The start time is written into attempt so the caller times the attempt
+    from here rather than from submission.
+    """
+    attempt['started'] = time.monotonic()
+    with captured_stdout() as output, span(phase.name, 'phase', pool=phase.pool) as details:
+        try:
+            return True, phase.action(inputs), output.getvalue()
+        except Exception as e:
+            details['error'] = f"{type(e).__name__}: {e}"
+            return False, e, output.getvalue()
+
+def run_phases(phases, pools=None, on_complete=None, capture_output=True):
+    """Run phases as soon as their dependencies succeed; returns {name: PhaseResult}
+
+    pools maps a pool name to its worker count. on_complete is called from the
+    calling thread with each PhaseResult in declaration order, as soon as that
+    phase and every phase declared before it have finished, so reports print
+    in a stable order while the work itself overlaps.
+
+    Time spent queued behind other phases on a pool does not count against a
+    timeout. A timed out attempt is cancelled if it has not started; one that
+    is already running cannot be stopped, so it is abandoned (its worker is
+    released when it returns) and the phase finishes as TIMEOUT without a
+    retry, which could otherwise run alongside it and record findings twice.
+    """
+    topological_order(phases)
+    pools = dict(DEFAULT_POOLS, **(pools or {}))
+    executors = {name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+                 for name, size in pools.items()}
+    previous_stdout = sys.stdout
+    if capture_output:
+        sys.stdout = ThreadLocalStdout(previous_stdout)
+
+    results = {}
+    attempts = {phase.name: 0 for phase in phases}
+    started = {}
+    running = {}
+    emitted = 0
+
+    def finish(phase, status, value=None, error=None, output=""):
+        results[phase.name] = PhaseResult(phase.name, status, value, error, attempts[phase.name],
+                                          time.monotonic() - started.get(phase.name, time.monotonic()),
+                                          output)
+
+    def submit(phase):
+        attempts[phase.name] += 1
+        started.setdefault(phase.name, time.monotonic())
+        inputs = {dep: results[dep].value for dep in phase.depends}
+        attempt = {'started': None}
+        future = executors[phase.pool].submit(_run_attempt, phase, inputs, attempt)
+        running[future] = (phase, attempt)
+
+    def deadline(phase, attempt):
+        """When a timed attempt runs out, None if untimed or not started yet"""
+        if not phase.timeout or attempt['started'] is None:
+            return None
+        return attempt['started'] + phase.timeout
+
+    def retry_or_finish(phase, status, error, output):
+        if attempts[phase.name] <= phase.retries:
+            submit(phase)
+        else:
+            finish(phase, status, error=error, output=output)
+
+    try:
+        while len(results) < len(phases):
+            scheduled = {phase.name for phase, _ in running.values()}
+            for phase in phases:
+                if phase.name in results or phase.name in scheduled:
+                    continue
+                deps = [results.get(dep) for dep in phase.depends]
+                if any(dep is not None and dep.status != OK for dep in deps):
+                    finish(phase, SKIPPED, error="dependency did not complete")
+                elif all(dep is not None for dep in deps):
+                    submit(phase)
+
+            if running:
+                deadlines = [deadline(phase, attempt) for phase, attempt in running.values()]
+                limits = [d - time.monotonic() for d in deadlines if d is not None]
+                if any(phase.timeout and attempt['started'] is None for phase, attempt in running.values()):
+                    limits.append(POLL_INTERVAL)
+                wait_for = max(0, min(limits)) if limits else None
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase, _ = running.pop(future)
+                    ok, value, output = future.result()
+                    if ok:
+                        finish(phase, OK, value=value, output=output)
+                    else:
+                        retry_or_finish(phase, FAILED, value, output)
+                now = time.monotonic()
+                for future, (phase, attempt) in list(running.items()):
+                    limit = deadline(phase, attempt)
+                    if limit is not None and now >= limit:
+                        del running[future]
+                        error = f"timed out after {phase.timeout}s"
+                        if future.cancel():
+                            retry_or_finish(phase, TIMEOUT, error, "")
+                        else:
+                            finish(phase, TIMEOUT, error=error)
+
+            # The calling thread has no capture target, so reports go straight out
+            while on_complete and emitted < len(phases) and phases[emitted].name in results:
+                on_complete(results[phases[emitted].name])
+                emitted += 1
+    finally:
+        sys.stdout = previous_stdout
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Split ZIP Archive Reader
+Streams members of multi-volume ZIP archives (name.z01, name.z02, ..., name.zip)
+without external tools or a temporary extracted copy
+"""
+
+import io
+import os
+import struct
+import zlib
+from collections import namedtuple
+from zipfile import BadZipFile
+
+# Record layouts, see APPNOTE.TXT sections 4.3.7 - 4.3.16
+END_RECORD = struct.Struct('<4s4H2LH')
+END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+END_LOCATOR64 = struct.Struct('<4sLQL')
+CENTRAL_DIR = struct.Struct('<4s4B4HL2L5H2L')
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+
+END_SIGNATURE = b'PK\x05\x06'
+END_SIGNATURE64 = b'PK\x06\x06'
+LOCATOR_SIGNATURE64 = b'PK\x06\x07'
+CENTRAL_SIGNATURE = b'PK\x01\x02'
+LOCAL_SIGNATURE = b'PK\x03\x04'
+
+STORED = 0
+DEFLATED = 8
+
+READ_CHUNK = 256 * 1024
+STREAM_BUFFER = 1024 * 1024
+
+# Deflate streams can only be read forwards; a decompressor snapshot every
+# CHECKPOINT_INTERVAL output bytes keeps backward seeks cheap
+CHECKPOINT_INTERVAL = 64 * 1024 * 1024
+
+ZipMember = namedtuple('ZipMember', [
+    'filename', 'compress_type', 'flags', 'crc', 'compress_size', 'file_size', 'disk', 'header_offset'])
+
+def volume_paths(zip_path):
+    """Return the volumes of a split archive in disk order, ending with the .zip file"""
+    stem = os.path.splitext(zip_path)[0]
+    volumes = []
+    number = 1
+    while os.path.exists(f"{stem}.z{number:02d}"):
+        volumes.append(f"{stem}.z{number:02d}")
+        number += 1
+    volumes.append(zip_path)
+    return volumes
+
+class MultiVolumeFile(io.RawIOBase):
+    """Read-only view of several volume files as one contiguous byte stream"""
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = list(paths)
+        self.sizes = [os.path.getsize(path) for path in self.paths]
+        self.starts = []
+        total = 0
+        for size in self.sizes:
+            self.starts.append(total)
+            total += size
+        self.size = total
+        self._files = {}
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def _volume(self, index):
+        if index not in self._files:
+            self._files[index] = open(self.paths[index], 'rb')
+        return self._files[index]
+
+    def readinto(self, b):
+        if self._pos >= self.size:
+            return 0
+        index = max(i for i, start in enumerate(self.starts) if start <= self._pos)
+        f = self._volume(index)
+        f.seek(self._pos - self.starts[index])
+        count = f.readinto(memoryview(b)[:self.starts[index] + self.sizes[index] - self._pos])
+        self._pos += count
+        return count
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        super().close()
+
+class MemberStream(io.RawIOBase):
+    """Seekable, decompress-on-read stream over one archive member"""
+
+    def __init__(self, volumes, member, data_offset, owns_volumes=False):
+        super().__init__()
+        if member.flags & 0x1:
+            raise BadZipFile(f"{member.filename}: encrypted members are not supported")
+        if member.compress_type not in (STORED, DEFLATED):
+            raise BadZipFile(f"{member.filename}: compression method {member.compress_type} is not supported")
+        self.member = member
+        self._volumes = volumes
+        self._data_offset = data_offset
+        self._owns_volumes = owns_volumes
+        self._checkpoints = []
+        self._restart()
+
+    def _restart(self):
+        self._pos = 0
+        self._comp_pos = 0
+        self._input = b''
+        self._output = b''
+        self._crc = 0
+        self._crc_valid = True
+        if self.member.compress_type == DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def _read_compressed(self, size):
+        size = min(size, self.member.compress_size - self._comp_pos)
+        if size <= 0:
+            return b''
+        self._volumes.seek(self._data_offset + self._comp_pos)
+        data = self._volumes.read(size)
+        if not data:
+            raise BadZipFile(f"{self.member.filename}: archive is truncated")
+        self._comp_pos += len(data)
+        return data
+
+    def _inflate(self, size):
+        """Produce up to size bytes of decompressed output, b'' at end of member"""
+        if self.member.compress_type == STORED:
+            return self._read_compressed(size)
+        while True:
+            if not self._input:
+                self._input = self._read_compressed(READ_CHUNK)
+                if not self._input:
+                    return self._decompressor.flush()
+            data = self._decompressor.decompress(self._input, size)
+            self._input = self._decompressor.unconsumed_tail
+            if data:
+                return data
+
+    def _checkpoint(self):
+        """Snapshot the decompressor; only called when no output is pending"""
+        if self.member.compress_type != DEFLATED:
+            return
+        last = self._checkpoints[-1][0] if self._checkpoints else 0
+        if self._pos - last >= CHECKPOINT_INTERVAL:
+            self._checkpoints.append((self._pos, self._comp_pos, self._input, self._decompressor.copy()))
+
+    def readinto(self, b):
+        if self._pos >= self.member.file_size:
+            self._verify()
+            return 0
+        if not self._output:
+            self._checkpoint()
+            self._output = self._inflate(max(len(b), READ_CHUNK))
+            if not self._output:
+                raise BadZipFile(f"{self.member.filename}: member data ends early")
+        count = min(len(b), len(self._output))
+        chunk = self._output[:count]
+        b[:count] = chunk
+        self._output = self._output[count:]
+        self._pos += count
+        if self._crc_valid:
+            self._crc = zlib.crc32(chunk, self._crc)
+        return count
+
+    def close(self):
+        if self._owns_volumes:
+            self._volumes.close()
+        super().close()
+
+    def _verify(self):
+        if self._crc_valid and self._crc != self.member.crc:
+            raise BadZipFile(f"{self.member.filename}: bad CRC-32")
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.member.file_size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        offset = min(offset, self.member.file_size)
+        if offset == self._pos:
+            return self._pos
+
+        if self.member.compress_type == STORED:
+            self._pos = self._comp_pos = offset
+            self._crc_valid = offset == 0
+            self._crc = 0
+            return self._pos
+
+        if offset < self._pos:
+            self._restart()
+            for out_pos, comp_pos, pending, decompressor in reversed(self._checkpoints):
+                if out_pos <= offset:
+                    self._pos, self._comp_pos, self._input = out_pos, comp_pos, pending
+                    self._decompressor = decompressor.copy()
+                    break
+        if offset != 0:
+            self._crc_valid = False
+        while self._pos < offset:
+            if not self._output:
+                self._checkpoint()
+                self._output = self._inflate(READ_CHUNK)
+                if not self._output:
+                    raise BadZipFile(f"{self.member.filename}: member data ends early")
+            skip = min(offset - self._pos, len(self._output))
+            self._output = self._output[skip:]
+            self._pos += skip
+        return self._pos
+
+class SplitZipFile:
+    """Read the central directory of a single or split ZIP archive"""
+
+    def __init__(self, zip_path):
+        self.path = zip_path
+        self.volumes = MultiVolumeFile(volume_paths(zip_path))
+        self.members = self._read_central_directory()
+
+    def close(self):
+        self.volumes.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _end_record(self):
+        last = len(self.volumes.paths) - 1
+        tail_start = max(self.volumes.size - (END_RECORD.size + 65535), self.volumes.starts[last])
+        self.volumes.seek(tail_start)
+        tail = self.volumes.read(self.volumes.size - tail_start)
+        index = tail.rfind(END_SIGNATURE)
+        if index < 0:
+            raise BadZipFile(f"{self.path}: end of central directory not found")
+        record = END_RECORD.unpack_from(tail, index)
+        _, disk, cd_disk, _, entries, cd_size, cd_offset, _ = record
+
+        locator_at = index - END_LOCATOR64.size
+        if locator_at >= 0 and tail[locator_at:locator_at + 4] == LOCATOR_SIGNATURE64:
+            _, disk64, offset64, _ = END_LOCATOR64.unpack_from(tail, locator_at)
+            self.volumes.seek(self.volumes.starts[disk64] + offset64)
+            record64 = END_RECORD64.unpack(self.volumes.read(END_RECORD64.size))
+            if record64[0] != END_SIGNATURE64:
+                raise BadZipFile(f"{self.path}: corrupt zip64 end of central directory")
+            _, _, _, _, disk, cd_disk, _, entries, cd_size, cd_offset = record64
+
+        if disk + 1 != len(self.volumes.paths):
+            raise BadZipFile(f"{self.path}: expected {disk + 1} volumes, found {len(self.volumes.paths)}")
+        return cd_disk, entries, cd_size, cd_offset
+
+    def _read_central_directory(self):
+        cd_disk, entries, cd_size, cd_offset = self._end_record()
+        self.volumes.seek(self.volumes.starts[cd_disk] + cd_offset)
+        directory = self.volumes.read(cd_size)
+        while len(directory) < cd_size:
+            more = self.volumes.read(cd_size - len(directory))
+            if not more:
+                raise BadZipFile(f"{self.path}: central directory is truncated")
+            directory += more
+
+        members = []
+        pos = 0
+        for _ in range(entries):
+            fields = CENTRAL_DIR.unpack_from(directory, pos)
+            if fields[0] != CENTRAL_SIGNATURE:
+                raise BadZipFile(f"{self.path}: corrupt central directory")
+            (_, _, _, _, _, flags, compress, _, _, crc, csize, usize,
+             name_len, extra_len, comment_len, disk, _, _, offset) = fields
+            pos += CENTRAL_DIR.size
+            name = directory[pos:pos + name_len]
+            extra = directory[pos + name_len:pos + name_len + extra_len]
+            pos += name_len + extra_len + comment_len
+            usize, csize, offset, disk = self._zip64_fields(extra, usize, csize, offset, disk)
+            encoding = 'utf-8' if flags & 0x800 else 'cp437'
+            members.append(ZipMember(name.decode(encoding), compress, flags, crc, csize, usize, disk, offset))
+        return members
+
+    @staticmethod
+    def _zip64_fields(extra, usize, csize, offset, disk):
+        """Replace saturated 32-bit fields with their zip64 extra-field values"""
+        pos = 0
+        while pos + 4 <= len(extra):
+            tag, size = struct.unpack_from('<2H', extra, pos)
+            if tag == 0x0001:
+                values = extra[pos + 4:pos + 4 + size]
+                fields = []
+                for current, width, saturated in ((usize, 8, 0xFFFFFFFF), (csize, 8, 0xFFFFFFFF),
+                                                  (offset, 8, 0xFFFFFFFF), (disk, 4, 0xFFFF)):
+                    if current == saturated and len(values) >= width:
+                        current = int.from_bytes(values[:width], 'little')
+                        values = values[width:]
+                    fields.append(current)
+                return tuple(fields)
+            pos += 4 + size
+        return usize, csize, offset, disk
+
+    def find(self, suffix):
+        """Return the first member whose name ends with suffix (case-insensitive)"""
+        for member in self.members:
+            if member.filename.lower().endswith(suffix.lower()):
+                return member
+        raise KeyError(f"no member ending with {suffix} in {self.path}")
+
+    def open(self, member, owns_archive=False):
+        """Open a member as a buffered, seekable stream that decompresses on read
+
+        With owns_archive the volumes are closed together with the stream.
+        """
+        self.volumes.seek(self.volumes.starts[member.disk] + member.header_offset)
+        header = LOCAL_HEADER.unpack(self.volumes.read(LOCAL_HEADER.size))
+        if header[0] != LOCAL_SIGNATURE:
+            raise BadZipFile(f"{member.filename}: bad local file header")
+        data_offset = self.volumes.tell() + header[10] + header[11]
+        raw = MemberStream(self.volumes, member, data_offset, owns_archive)
+        return io.BufferedReader(raw, STREAM_BUFFER)
+
+class ArchivedFile:
+    """Evidence file that lives inside a (possibly split) ZIP archive"""
+
+    def __init__(self, zip_path, suffix):
+        self.zip_path = zip_path
+        with SplitZipFile(zip_path) as archive:
+            self.member = archive.find(suffix)
+            self.volume_count = len(archive.volumes.paths)
+        self.size = self.member.file_size
+
+    def __str__(self):
+        return f"{self.zip_path}::{self.member.filename}"
+
+    def open(self):
+        """Open the member as a stream; closing the stream releases the archive"""
+        return SplitZipFile(self.zip_path).open(self.member, owns_archive=True)
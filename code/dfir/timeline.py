@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Cross-source Timeline
+k-way merge of sorted event streams into a columnar index with window queries
+"""
+
+import heapq
+import os
+import re
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from dfir.pcapng import format_address
+from dfir.video import activity_windows
+
+Event = namedtuple('Event', ['start', 'end', 'source', 'kind', 'detail'])
+
+# Acquisition time embedded in evidence file names, e.g. HOST-20230622-143255.raw
+NAME_TIMESTAMP = re.compile(r'(\d{8})-(\d{6})')
+
+# Events longer than this (e.g. network flows) are kept in a separate table,
+# so window queries over the bulk of short events stay tight
+LONG_EVENT_SECONDS = 60.0
+
+def event(start, source, kind, detail=None, end=None):
+    """Build an Event; point events end where they start"""
+    return Event(float(start), float(start if end is None else end), source, kind, detail)
+
+def merge_streams(*streams):
+    """Lazily k-way merge event streams that are each sorted by start time"""
+    return heapq.merge(*streams, key=lambda e: e.start)
+
+class _Table:
+    """Append-only columns for one duration class of events"""
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.sources = array('H')
+        self.kinds = array('H')
+        self.details = []
+        self._frozen = None
+
+    def append(self, start, end, source, kind, detail):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.sources.append(source)
+        self.kinds.append(kind)
+        self.details.append(detail)
+        self._frozen = None
+
+    def arrays(self):
+        """numpy copies of the columns plus sorted end times, rebuilt only after appends"""
+        if self._frozen is None:
+            starts = np.frombuffer(self.starts, dtype=np.float64).copy() if self.starts else np.zeros(0)
+            ends = np.frombuffer(self.ends, dtype=np.float64).copy() if self.ends else np.zeros(0)
+            sources = np.array(self.sources, dtype=np.uint16)
+            kinds = np.array(self.kinds, dtype=np.uint16)
+            span = float((ends - starts).max()) if len(starts) else 0.0
+            self._frozen = (starts, ends, sources, kinds, span, np.sort(ends))
+        return self._frozen
+
+class TimelineIndex:
+    """Sorted, columnar event store answering "what happened around t" queries
+
+    Events must be added in start order, which merge_streams() guarantees.
+    Start and end times live in flat float arrays, so a window query is a
+    binary search plus a vectorized end-time filter; only the matching rows
+    are turned back into Event tuples.
+    """
+
+    def __init__(self):
+        self.short = _Table()
+        self.long = _Table()
+        self.source_names = []
+        self.kind_names = []
+        self._codes = {}
+        self._last_start = float('-inf')
+
+    def _code(self, names, name):
+        key = (id(names), name)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(names)
+            names.append(name)
+        return code
+
+    def add(self, item):
+        """Append one Event; raises ValueError if it starts before the previous one"""
+        self.extend((item,))
+
+    def extend(self, events):
+        """Append a start-ordered iterable of events"""
+        codes, sources, kinds = self._codes, self.source_names, self.kind_names
+        last = self._last_start
+        try:
+            for start, end, source, kind, detail in events:
+                if start < last:
+                    raise ValueError(f"event at {start} added after {last}; merge sorted streams first")
+                last = start
+                source_code = codes.get((id(sources), source))
+                if source_code is None:
+                    source_code = self._code(sources, source)
+                kind_code = codes.get((id(kinds), kind))
+                if kind_code is None:
+                    kind_code = self._code(kinds, kind)
+                table = self.long if end - start > LONG_EVENT_SECONDS else self.short
+                table.append(start, end, source_code, kind_code, detail)
+        finally:
+            self._last_start = last
+        return self
+
+    @classmethod
+    def from_streams(cls, *streams):
+        """Build an index from several individually sorted event streams"""
+        return cls().extend(merge_streams(*streams))
+
+    def __len__(self):
+        return len(self.short.starts) + len(self.long.starts)
+
+    def _codes_of(self, sources):
+        return None if sources is None else [self.source_names.index(s) for s in sources if s in self.source_names]
+
+    def _rows(self, table, start, end, codes):
+        starts, ends, source_codes, _, span, _ = table.arrays()
+        lo = np.searchsorted(starts, start - span, side='left')
+        hi = np.searchsorted(starts, end, side='right')
+        rows = np.arange(lo, hi)[ends[lo:hi] >= start]
+        if codes is not None:
+            rows = rows[np.isin(source_codes[rows], codes)]
+        return rows
+
+    def _events(self, table, rows):
+        starts, ends, sources, kinds, _, _ = table.arrays()
+        details = table.details
+        return [Event(start, end, self.source_names[source], self.kind_names[kind], details[row])
+                for row, start, end, source, kind in zip(rows.tolist(), starts[rows].tolist(), ends[rows].tolist(),
+                                                         sources[rows].tolist(), kinds[rows].tolist())]
+
+    def _window(self, start, end, codes):
+        found = self._events(self.short, self._rows(self.short, start, end, codes))
+        if self.long.starts:
+            found += self._events(self.long, self._rows(self.long, start, end, codes))
+            found.sort(key=lambda e: e.start)
+        return found
+
+    def window(self, start, end, sources=None):
+        """Events overlapping [start, end], in start order, optionally from some sources only"""
+        return self._window(start, end, self._codes_of(sources))
+
+    def around(self, times, seconds, sources=None):
+        """For each anchor time, the events within +/- seconds of it"""
+        codes = self._codes_of(sources)
+        return [self._window(t - seconds, t + seconds, codes) for t in np.asarray(times, dtype=np.float64).tolist()]
+
+    def count_around(self, times, seconds, sources=None):
+        """Number of events within +/- seconds of each anchor, fully vectorized
+
+        An event overlaps the window unless it starts after it or ends before
+        it, and every event that ends before the window also starts before
+        it, so the count is two binary searches per anchor.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        counts = np.zeros(len(times), dtype=np.int64)
+        for table in (self.short, self.long):
+            starts, ends, source_codes, _, _, sorted_ends = table.arrays()
+            if sources is not None:
+                keep = np.isin(source_codes, self._codes_of(sources))
+                starts, sorted_ends = starts[keep], np.sort(ends[keep])
+            counts += np.searchsorted(starts, times + seconds, side='right')
+            counts -= np.searchsorted(sorted_ends, times - seconds, side='left')
+        return counts
+
+    def kinds(self):
+        """Event count per (source, kind)"""
+        totals = {}
+        for table in (self.short, self.long):
+            _, _, sources, kinds, _, _ = table.arrays()
+            if len(sources):
+                pairs, counts = np.unique(sources.astype(np.int64) << 16 | kinds, return_counts=True)
+                for pair, count in zip(pairs.tolist(), counts.tolist()):
+                    key = (self.source_names[pair >> 16], self.kind_names[pair & 0xFFFF])
+                    totals[key] = totals.get(key, 0) + count
+        return totals
+
+def evidence_time(path):
+    """Acquisition time of an evidence file: from its name if it has one (UTC), else its mtime"""
+    match = NAME_TIMESTAMP.search(os.path.basename(str(path)))
+    if match:
+        stamp = datetime.strptime(''.join(match.groups()), '%Y%m%d%H%M%S')
+        return stamp.replace(tzinfo=timezone.utc).timestamp()
+    return os.path.getmtime(path) if os.path.exists(str(path)) else None
+
+def memory_events(extraction):
+    """The memory acquisition as a single event carrying the IOC summary"""
+    when = evidence_time(extraction.source) if extraction is not None else None
+    if when is not None:
+        yield event(when, 'memory', 'acquired', f"{os.path.basename(str(extraction.source))}: "
+                                                f"{len(extraction.iocs)} indicators")
+
+def process_events(processes):
+    """One event per carved process at its create time"""
+    for process in sorted(processes or [], key=lambda p: (p.create_time, p.offset)):
+        yield event(process.create_time, 'memory', 'process_start',
+                    f"{process.name} (pid {process.pid}, ppid {process.ppid})")
+
+def flow_events(stats):
+    """One interval event per network flow, from first to last packet"""
+    flows = sorted((first, last, key, packets) for key, (packets, size, first, last) in stats.flows.items()
+                   if first is not None)
+    for first, last, (transport, src, sport, dst, dport), packets in flows:
+        yield event(first, 'network', 'flow', f"{transport} {format_address(src)}:{sport} -> "
+                                              f"{format_address(dst)}:{dport} ({packets} packets)", end=last)
+
+def ics_events(table):
+    """One event per decoded Modbus/S7 operation; the detail is its row in the ICS table
+
+    Row numbers keep the index compact for captures with millions of
+    operations; look rows up with table.iloc when reporting.
+    """
+    timestamps = table['timestamp'].to_numpy()
+    order = np.argsort(timestamps, kind='stable')
+    kinds = (table['protocol'].astype(str) + ':' + table['function'].astype(str)).to_numpy()
+    for row, when, kind in zip(order.tolist(), timestamps[order].tolist(), kinds[order].tolist()):
+        yield Event(when, when, 'ics', kind, row)
+
+def plc_events(comparison):
+    """One event per changed PLC snapshot pair, at the time the later snapshot was taken"""
+    found = []
+    for series, (hashed, diffs) in comparison.items():
+        for diff in diffs:
+            when = evidence_time(diff.after)
+            if when is not None and diff.changed_blocks:
+                found.append(event(when, 'plc', 'memory_change',
+                                   f"{os.path.basename(diff.before)} -> {os.path.basename(diff.after)}: "
+                                   f"{diff.changed_blocks} block(s) changed"))
+    return iter(sorted(found))
+
+def frame_events(times, source='cctv', kind='frame', details=None):
+    """Events at the given times (e.g. video frame timestamps), sorted on the way in"""
+    times = np.asarray(times, dtype=np.float64)
+    order = np.argsort(times, kind='stable')
+    for row, when in zip(order.tolist(), times[order].tolist()):
+        yield Event(when, when, source, kind, details[row] if details is not None else row)
+
+def video_events(index):
+    """The recording span and its motion activity windows, placed by the MP4 creation time"""
+    frames = index.frames if index is not None else None
+    if frames is None or not frames.creation_time or not len(frames.times):
+        return
+    start = float(frames.creation_time)
+    yield event(start, 'cctv', 'recording', os.path.basename(index.source), end=start + float(frames.times.max()))
+    if index.motion is not None:
+        for first, last, peak in activity_windows(index.motion):
+            yield event(start + first, 'cctv', 'motion', f"peak energy {peak:.1f}", end=start + last)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Phase Tracing
+Low-overhead spans with wall/CPU time, peak RSS and bytes read, exported as JSON and Chrome trace events
+"""
+
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_TRACE_DIR = "datasets/cache/traces"
+
+Span = namedtuple('Span', ['name', 'category', 'start', 'end', 'thread', 'thread_name', 'cpu', 'child_cpu',
+                           'peak_rss', 'read_bytes', 'read_chars', 'args'])
+
+# ru_maxrss is in KiB on Linux and bytes on macOS
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+def _io_counters(process_wide=False):
+    """(bytes fetched from storage, bytes returned by read calls) for the calling thread or the process
+
+    Counters come from /proc/thread-self/io or /proc/self/io on Linux; the
+    process counters include child processes once they have exited. Elsewhere
+    block input counts from getrusage stand in for the process's storage
+    reads, and per-thread counters read as zero.
+    """
+    try:
+        with open('/proc/self/io' if process_wide else '/proc/thread-self/io', 'rb') as f:
+            fields = dict(line.split(b':', 1) for line in f.read().splitlines())
+        return int(fields[b'read_bytes']), int(fields[b'rchar'])
+    except (OSError, KeyError, ValueError):
+        if not process_wide:
+            return 0, 0
+        blocks = sum(resource.getrusage(who).ru_inblock for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+        return blocks * 512, 0
+
+def _child_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class Tracer:
+    """Collects finished spans from any thread"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.epoch = time.time()
+        self.spans = []
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, category='phase', process_wide=False, **args):
+        """Time the enclosed block; yields a dict whose entries are added to the span's args
+
+        CPU time and bytes read are the calling thread's own, so spans on
+        concurrent threads do not count each other's work; tool subprocesses
+        and scan process pools are not included, and child_cpu is None.
+        Those can only be measured for the whole process, so a process_wide
+        span (one around the entire run) records all threads' CPU, the CPU of
+        child processes reaped meanwhile in child_cpu, and the process's
+        reads including exited children. Peak RSS is the process high-water
+        mark when the span ends.
+        """
+        if not self.enabled:
+            yield args
+            return
+        clock = time.process_time if process_wide else time.thread_time
+        start = time.perf_counter()
+        cpu = clock()
+        child_cpu = _child_cpu() if process_wide else None
+        read_bytes, read_chars = _io_counters(process_wide)
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end_read, end_chars = _io_counters(process_wide)
+            span = Span(name, category, start - self.origin, time.perf_counter() - self.origin,
+                        threading.get_ident(), threading.current_thread().name,
+                        clock() - cpu, _child_cpu() - child_cpu if process_wide else None,
+                        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT,
+                        end_read - read_bytes, end_chars - read_chars, args)
+            with self._lock:
+                self.spans.append(span)
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+        self.origin = time.perf_counter()
+        self.epoch = time.time()
+
+    def summary(self):
+        """Per-span records plus totals per category, in start order"""
+        spans = sorted(self.spans, key=lambda s: s.start)
+        totals = {}
+        for span in spans:
+            total = totals.setdefault(span.category, {'spans': 0, 'wall': 0.0, 'cpu': 0.0, 'read_bytes': 0})
+            total['spans'] += 1
+            total['wall'] += span.end - span.start
+            total['cpu'] += span.cpu + (span.child_cpu or 0.0)
+            total['read_bytes'] += span.read_bytes
+        return {
+            'started': self.epoch,
+            'peak_rss': max((span.peak_rss for span in spans), default=0),
+            'totals': totals,
+            'spans': [{'name': span.name, 'category': span.category, 'start': span.start,
+                       'wall': span.end - span.start, 'cpu': span.cpu, 'child_cpu': span.child_cpu,
+                       'peak_rss': span.peak_rss, 'read_bytes': span.read_bytes,
+                       'read_chars': span.read_chars, 'thread': span.thread_name, 'args': span.args}
+                      for span in spans],
+        }
+
+    def trace_events(self):
+        """Spans as Chrome trace-event "complete" events plus an RSS counter track"""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            threads[span.thread] = span.thread_name
+            args = dict(span.args, cpu_ms=round((span.cpu + (span.child_cpu or 0.0)) * 1000, 3),
+                        peak_rss_mb=round(span.peak_rss / (1024 * 1024), 1), read_bytes=span.read_bytes)
+            events.append({'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid, 'tid': span.thread,
+                           'ts': round(span.start * 1e6, 1), 'dur': round((span.end - span.start) * 1e6, 1),
+                           'args': args})
+            events.append({'name': 'peak RSS (MB)', 'ph': 'C', 'pid': pid, 'ts': round(span.end * 1e6, 1),
+                           'args': {'rss': round(span.peak_rss / (1024 * 1024), 1)}})
+        for tid, thread_name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}})
+        return events
+
+    def write(self, trace_dir=DEFAULT_TRACE_DIR, prefix='trace'):
+        """Write <prefix>-<time>.summary.json and a .trace.json for chrome://tracing or Perfetto"""
+        os.makedirs(trace_dir, exist_ok=True)
+        stem = os.path.join(trace_dir, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.epoch))}")
+        with open(stem + '.summary.json', 'w') as f:
+            json.dump(self.summary(), f, indent=1, default=str)
+        with open(stem + '.trace.json', 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f, default=str)
+        return stem + '.summary.json', stem + '.trace.json'
+
+_tracer = Tracer()
+
+def tracer():
+    """The process-wide tracer"""
+    return _tracer
+
+def span(name, category='phase', process_wide=False, **args):
+    """Span on the process-wide tracer"""
+    return _tracer.span(name, category, process_wide, **args)
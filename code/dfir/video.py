@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+CCTV Frame Index
+Persisted MP4 frame/keyframe timestamps and a motion-energy series for jumping to activity
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import struct
+import subprocess
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from dfir.artifact_cache import fingerprint
+from dfir.runner import feed_stream, OK, ERROR
+from dfir.tracing import span
+
+DEFAULT_CACHE_DIR = "datasets/cache/cctv"
+
+# Decoded frames are downsampled to a thumbnail before differencing
+MOTION_WIDTH = 64
+MOTION_HEIGHT = 36
+MOTION_BATCH = 256
+
+# Seconds between 1904-01-01 (MP4 epoch) and 1970-01-01
+MP4_EPOCH_OFFSET = 2082844800
+
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+FrameIndex = namedtuple('FrameIndex', ['codec', 'width', 'height', 'timescale', 'creation_time',
+                                       'times', 'keyframes', 'offsets', 'sizes'])
+MotionSeries = namedtuple('MotionSeries', ['times', 'energy', 'step'])
+# motion_failed is the ffmpeg version that could not decode the video, so it is not retried
+VideoIndex = namedtuple('VideoIndex', ['source', 'frames', 'motion', 'motion_failed'], defaults=[None])
+
+def iter_boxes(f, start, end):
+    """Yield (type, payload start, payload end) for the boxes in f[start:end]"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header[:8])
+        payload = offset + 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack('>Q', header[8:16])[0]
+            payload = offset + 16
+        elif size == 0:
+            size = end - offset
+        if size < payload - offset:
+            return
+        yield kind, payload, min(offset + size, end)
+        offset += size
+
+def _full_box(f, start, end):
+    """Payload of a full box: (version, body bytes after version and flags)"""
+    f.seek(start)
+    data = f.read(end - start)
+    return data[0], data[4:]
+
+def _table(body, fields, dtype='>u4', skip=4):
+    """Entry table of a sample-table box: count at body[skip-4:skip], then fixed-size rows"""
+    count = struct.unpack('>I', body[skip - 4:skip])[0]
+    values = np.frombuffer(body, dtype=dtype, count=count * fields, offset=skip)
+    return values.reshape(count, fields).astype(np.int64)
+
+def _read_track(f, start, end):
+    """Sample tables and header fields of one trak box"""
+    track = {}
+    pending = [(start, end)]
+    while pending:
+        box_start, box_end = pending.pop()
+        for kind, payload, box_stop in iter_boxes(f, box_start, box_end):
+            if kind in CONTAINER_BOXES:
+                pending.append((payload, box_stop))
+            elif kind == b'stsd':
+                f.seek(payload + 8)
+                entry = f.read(36)
+                track['codec'] = entry[4:8].decode('latin-1')
+                track['width'], track['height'] = struct.unpack('>HH', entry[32:36])
+            elif kind in (b'hdlr', b'mdhd', b'stts', b'ctts', b'stss', b'stsz', b'stsc', b'stco', b'co64'):
+                track[kind.decode()] = _full_box(f, payload, box_stop)
+    return track
+
+def _sample_times(track):
+    """Presentation time in timescale units of every sample, in decode order"""
+    _, stts = track['stts']
+    runs = _table(stts, 2)
+    deltas = np.repeat(runs[:, 1], runs[:, 0])
+    times = np.concatenate([[0], np.cumsum(deltas)[:-1]]) if len(deltas) else deltas
+    if 'ctts' in track:
+        # Composition offsets reorder B-frames; read as signed, as version 1 requires
+        runs = _table(track['ctts'][1], 2, '>i4')
+        times = times + np.repeat(runs[:, 1], runs[:, 0])[:len(times)]
+    return times
+
+def _sample_sizes(track):
+    _, body = track['stsz']
+    size, entries = struct.unpack('>II', body[:8])
+    if size:
+        return np.full(entries, size, dtype=np.int64)
+    return np.frombuffer(body, dtype='>u4', count=entries, offset=8).astype(np.int64)
+
+def _sample_offsets(track, sizes):
+    """File offset of every sample from the chunk offset and sample-to-chunk tables"""
+    if 'co64' in track:
+        chunks = _table(track['co64'][1], 1, '>u8')[:, 0]
+    else:
+        chunks = _table(track['stco'][1], 1)[:, 0]
+    runs = _table(track['stsc'][1], 3)
+    run_of_chunk = np.searchsorted(runs[:, 0] - 1, np.arange(len(chunks)), side='right') - 1
+    per_chunk = runs[run_of_chunk, 1]
+    chunk_of_sample = np.repeat(np.arange(len(chunks)), per_chunk)[:len(sizes)]
+    before = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    chunk_first = np.concatenate([[0], np.cumsum(per_chunk)[:-1]])
+    first_of_sample = chunk_first[chunk_of_sample]
+    return chunks[chunk_of_sample] + before[:len(chunk_of_sample)] - before[first_of_sample]
+
+def read_frame_index(f):
+    """Frame timestamps, keyframes and byte offsets of the first video track of an MP4 stream
+
+    Only the box headers and the moov sample tables are read; no frame is
+    decoded. Returns None if the stream has no video track and raises
+    ValueError if its sample tables are malformed.
+    """
+    try:
+        return _read_frame_index(f)
+    except (struct.error, IndexError, KeyError) as e:
+        raise ValueError(f"malformed MP4 sample tables: {e}") from e
+
+def keyframe_before(frames, seconds):
+    """The last keyframe at or before a presentation time, where decoding can start"""
+    times = frames.times[frames.keyframes]
+    earlier = frames.keyframes[times <= seconds]
+    return int(earlier[np.argmax(times[times <= seconds])]) if len(earlier) else int(frames.keyframes[0])
+
+def _read_frame_index(f):
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    creation_time = None
+    for kind, payload, end in iter_boxes(f, 0, size):
+        if kind != b'moov':
+            continue
+        for child, child_start, child_end in iter_boxes(f, payload, end):
+            if child == b'mvhd':
+                version, body = _full_box(f, child_start, child_end)
+                created = struct.unpack('>Q' if version else '>I', body[:8 if version else 4])[0]
+                creation_time = created - MP4_EPOCH_OFFSET if created else None
+            elif child == b'trak':
+                track = _read_track(f, child_start, child_end)
+                if track.get('hdlr', (0, b''))[1][4:8] != b'vide':
+                    continue
+                version, mdhd = track['mdhd']
+                timescale = struct.unpack('>I', mdhd[16:20] if version else mdhd[8:12])[0]
+                sizes = _sample_sizes(track)
+                times = _sample_times(track)[:len(sizes)] / timescale
+                if 'stss' in track:
+                    keyframes = _table(track['stss'][1], 1)[:, 0] - 1
+                else:
+                    keyframes = np.arange(len(sizes))
+                return FrameIndex(track.get('codec'), track.get('width'), track.get('height'), timescale,
+                                  creation_time, times, keyframes, _sample_offsets(track, sizes), sizes)
+    return None
+
+def energy_from_raw(stream, width=MOTION_WIDTH, height=MOTION_HEIGHT, batch=MOTION_BATCH):
+    """Mean absolute pixel change between consecutive gray frames read from a raw stream
+
+    Frames are read in batches and differenced as one array; the last frame
+    of each batch is carried into the next. The first frame has energy 0.
+    """
+    frame_size = width * height
+    energy = []
+    previous = None
+    while True:
+        data = stream.read(frame_size * batch)
+        usable = len(data) - len(data) % frame_size
+        if not usable:
+            break
+        frames = np.frombuffer(data, dtype=np.uint8, count=usable).reshape(-1, height, width).astype(np.int16)
+        if previous is not None:
+            frames = np.concatenate([previous, frames])
+        else:
+            energy.append(np.zeros(1, dtype=np.float32))
+        energy.append(np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2), dtype=np.float32))
+        previous = frames[-1:]
+    return np.concatenate(energy) if energy else np.zeros(0, dtype=np.float32)
+
+def ffmpeg_version():
+    """First line of `ffmpeg -version`, or None when ffmpeg is not installed"""
+    if shutil.which("ffmpeg") is None:
+        return None
+    try:
+        output = subprocess.run(["ffmpeg", "-version"], capture_output=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.decode('utf-8', 'replace').partition('\n')[0].strip() or "unknown"
+
+def motion_energy(source, times, step=1, width=MOTION_WIDTH, height=MOTION_HEIGHT):
+    """Motion energy of every step-th frame, decoded to thumbnails by ffmpeg
+
+    source is a path or an object with open() returning a stream (e.g. an
+    ArchivedFile), which is piped to ffmpeg. times are the frame index's
+    presentation times. Returns None when ffmpeg is not installed or exits
+    with an error (e.g. too old for -fps_mode, or a piped MP4 with its moov
+    atom at the end), so a truncated series is never cached as complete.
+    """
+    if shutil.which("ffmpeg") is None:
+        return None
+    filters = f"select=not(mod(n\\,{step})),scale={width}:{height},format=gray" if step > 1 else \
+              f"scale={width}:{height},format=gray"
+    command = ["ffmpeg", "-v", "quiet", "-i", "pipe:0" if hasattr(source, "open") else str(source),
+               "-an", "-vf", filters, "-fps_mode", "passthrough", "-f", "rawvideo", "pipe:1"]
+    stream = source.open() if hasattr(source, "open") else None
+    with span(' '.join(command)[:80], "subprocess") as details:
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE if stream else subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            if stream:
+                threading.Thread(target=feed_stream, args=(stream, process.stdin), daemon=True).start()
+            energy = energy_from_raw(process.stdout, width, height)
+            process.wait()
+        finally:
+            if stream:
+                stream.close()
+        details.update(status=OK if process.returncode == 0 else ERROR, returncode=process.returncode,
+                       frames=len(energy))
+    if process.returncode != 0:
+        return None
+    frame_times = np.sort(times)[::step]
+    count = min(len(energy), len(frame_times))
+    return MotionSeries(frame_times[:count], energy[:count], step)
+
+def activity_windows(motion, threshold=None, min_gap=2.0):
+    """(start, end, peak energy) spans where motion energy exceeds threshold
+
+    The default threshold is the median plus four median absolute
+    deviations; active frames closer than min_gap seconds form one window.
+    """
+    if motion is None or not len(motion.energy):
+        return []
+    energy = motion.energy
+    if threshold is None:
+        median = float(np.median(energy))
+        threshold = median + 4 * max(float(np.median(np.abs(energy - median))), 0.5)
+    active = np.flatnonzero(energy > threshold)
+    if not len(active):
+        return []
+    breaks = np.flatnonzero(np.diff(motion.times[active]) > min_gap) + 1
+    return [(float(motion.times[run[0]]), float(motion.times[run[-1]]), float(energy[run].max()))
+            for run in np.split(active, breaks)]
+
+def _source_key(source):
+    """Cache key for a video path or an archived video (archive fingerprint plus member name)"""
+    if hasattr(source, "zip_path"):
+        member = hashlib.blake2b(source.member.filename.encode(), digest_size=8).hexdigest()
+        return f"{fingerprint(source.zip_path)}-{member}"
+    return fingerprint(source)
+
+def build_video_index(source, cache_dir=DEFAULT_CACHE_DIR, step=1, refresh=False):
+    """Frame index and motion series for a video, computed once and pickled under cache_dir
+
+    A cached index without motion data is completed once ffmpeg is available.
+    If ffmpeg failed on the video, decoding is retried only when the ffmpeg
+    version changes or refresh is set.
+    """
+    cached = os.path.join(cache_dir, f"{_source_key(source)}-{step}.pkl") if cache_dir else None
+    index = None
+    version = None
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            index = pickle.load(f)
+        if index.motion is not None:
+            return index
+        version = ffmpeg_version()
+        if version is None or (index.motion_failed == version and not refresh):
+            return index
+
+    if index is None:
+        if hasattr(source, "open"):
+            with source.open() as stream:
+                frames = read_frame_index(stream)
+        else:
+            with open(source, 'rb') as stream:
+                frames = read_frame_index(stream)
+    else:
+        frames = index.frames
+    motion = motion_energy(source, frames.times, step) if frames is not None else None
+    failed = None
+    if motion is None and frames is not None:
+        failed = version or ffmpeg_version()
+    index = VideoIndex(str(source), frames, motion, failed)
+
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cached + '.tmp', 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cached + '.tmp', cached)
+    return index
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Volatility 3 Plugin Runner
+In-process plugins sharing one memory context, run concurrently with results cached per dump and plugin version
+"""
+
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dfir.artifact_cache import fingerprint
+from dfir.tracing import span
+
+try:
+    import volatility3.plugins
+    import volatility3.symbols
+    from volatility3 import framework
+    from volatility3.framework import automagic, constants, contexts, exceptions, interfaces, plugins, renderers
+    from volatility3.framework.configuration import requirements
+    from volatility3.framework.renderers import format_hints
+except ImportError:
+    framework = None
+
+DEFAULT_CACHE_DIR = "datasets/cache/volatility"
+
+# Volatility's own cache directory: the symbol identifier database, the ISF
+# validation cache and ISF files converted from downloaded PDBs
+DEFAULT_SYMBOL_CACHE = "datasets/cache/volatility3"
+
+# ISF directories searched before the cached and bundled symbol tables
+DEFAULT_SYMBOL_DIRS = ["datasets/symbols"]
+
+DEFAULT_PLUGINS = [
+    "windows.pslist.PsList",
+    "windows.netscan.NetScan",
+    "windows.cmdline.CmdLine",
+    "windows.dlllist.DllList",
+    "windows.registry.hivelist.HiveList",
+]
+
+DEFAULT_WORKERS = 4
+
+# Every plugin is configured under plugins.<ClassName>
+BASE_CONFIG_PATH = "plugins"
+
+# One plugin's output. Rows hold plain values (None where Volatility had no
+# value, bytes as hex) so cached results load without Volatility installed.
+PluginResult = namedtuple('PluginResult', ['plugin', 'version', 'columns', 'rows', 'cached', 'error', 'elapsed'])
+
+# Plugin classes by name, loaded once per process
+_plugin_classes = None
+_setup_lock = threading.Lock()
+
+def available():
+    """True when volatility3 is installed"""
+    return framework is not None
+
+def short_name(plugin):
+    """"windows.pslist.PsList" -> "pslist\""""
+    return plugin.rsplit('.', 1)[-1].lower()
+
+def _load_plugins(symbol_dirs, symbol_cache):
+    """Point Volatility at the symbol directories and cache, then import its plugins (once per process)"""
+    global _plugin_classes
+    with _setup_lock:
+        if _plugin_classes is not None:
+            return _plugin_classes
+        framework.require_interface_version(2, 0, 0)
+        cached_symbols = []
+        if symbol_cache:
+            os.makedirs(symbol_cache, exist_ok=True)
+            constants.CACHE_PATH = os.path.abspath(symbol_cache)
+            cached_symbols = [os.path.join(constants.CACHE_PATH, "symbols")]
+        # ISFs converted from downloaded PDBs are written to the first writable
+        # directory, so listing the cache early keeps them across runs
+        volatility3.symbols.__path__ = ([os.path.abspath(d) for d in symbol_dirs if os.path.isdir(d)]
+                                        + cached_symbols + constants.SYMBOL_BASEPATHS)
+        framework.import_files(volatility3.plugins, True)
+        _plugin_classes = framework.list_plugins()
+        return _plugin_classes
+
+def plugin_version(plugin_class):
+    """Version string of a plugin and the framework that ran it, e.g. "3.0.1-2.28.2\""""
+    return '.'.join(str(part) for part in plugin_class.version) + '-' + constants.PACKAGE_VERSION
+
+def _quiet(progress, description=None):
+    """Progress callback for scanners; output is printed by the caller instead"""
+
+def _plain(value):
+    """A rendered cell as a plain Python value"""
+    if isinstance(value, interfaces.renderers.BaseAbsentValue):
+        return None
+    if isinstance(value, format_hints.MultiTypeData):
+        if value.show_hex:
+            return bytes(value).hex()
+        return str(value, encoding=value.encoding, errors='replace').split('\x00')[0]
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    if isinstance(value, renderers.Disassembly):
+        return bytes(value.data).hex()
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+    return value
+
+def _describe(error):
+    """Readable error, naming the requirements automagic could not satisfy"""
+    unsatisfied = getattr(error, 'unsatisfied', None)
+    if unsatisfied:
+        return "unsatisfied requirements: " + ", ".join(path.split('.')[-1] for path in unsatisfied)
+    return f"{type(error).__name__}: {error}"
+
+def _collect(node, rows):
+    rows.append(tuple(_plain(value) for value in node.values))
+    return rows
+
+def invalidate(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Drop every cached plugin result for a dump fingerprint"""
+    shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+
+class VolatilityRunner:
+    """Runs Volatility 3 plugins against one memory dump in this process
+
+    The context (physical and kernel layers, loaded symbol tables) is built
+    on first use and shared: after one plugin has resolved the kernel, later
+    plugins are handed its resolved requirements instead of re-running layer
+    stacking and symbol discovery. Results are pickled under
+    cache_dir/<dump fingerprint>/ per plugin and version, so an unchanged
+    dump never builds a context at all.
+    """
+
+    def __init__(self, dump, cache_dir=DEFAULT_CACHE_DIR, symbol_dirs=DEFAULT_SYMBOL_DIRS,
+                 symbol_cache=DEFAULT_SYMBOL_CACHE):
+        if not available():
+            raise RuntimeError("volatility3 is required to run Volatility plugins")
+        self.dump = dump
+        self.key = fingerprint(dump)
+        self.cache_dir = cache_dir
+        self.plugins = _load_plugins(symbol_dirs, symbol_cache)
+        self._context = None
+        self._resolved = None
+        self._unresolved = {}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, plugin, version):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, self.key, f"{plugin}-{version}.pkl")
+
+    def cached(self, plugin):
+        """The cached PluginResult for a plugin, or None"""
+        plugin_class = self.plugins.get(plugin)
+        path = plugin_class and self._cache_path(plugin, plugin_version(plugin_class))
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)._replace(cached=True)
+
+    def _save(self, result):
+        path = self._cache_path(result.plugin, result.version)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _shared_requirements(plugin_class):
+        """The kernel, layer and symbol table requirements, whose resolution can be reused"""
+        shared = (requirements.ModuleRequirement, requirements.TranslationLayerRequirement,
+                  requirements.SymbolTableRequirement)
+        return [r for r in plugin_class.get_requirements() if isinstance(r, shared)]
+
+    def _share_resolved(self, plugin_class, config_path):
+        """Copy the settings resolved for an earlier plugin into this plugin's configuration"""
+        config = self._context.config
+        for requirement in self._shared_requirements(plugin_class):
+            source = interfaces.configuration.path_join(self._resolved, requirement.name)
+            if source not in config:
+                continue
+            target = interfaces.configuration.path_join(config_path, requirement.name)
+            config[target] = config[source]
+            config.splice(target, config.branch(source))
+
+    def _construct(self, plugin, plugin_class):
+        """Configure and construct a plugin; automagic and config edits run one at a time
+
+        When no kernel could be found for a plugin family ("windows",
+        "linux", ...), later plugins of that family fail straight away
+        instead of repeating the layer scan over the whole dump.
+        """
+        family = plugin.split('.')[0]
+        shared = self._shared_requirements(plugin_class)
+        with self._lock:
+            if shared and self._resolved is None and family in self._unresolved:
+                raise self._unresolved[family]
+            if self._context is None:
+                self._context = contexts.Context()
+                self._context.config['automagic.LayerStacker.single_location'] = \
+                    requirements.URIRequirement.location_from_file(os.path.abspath(self.dump))
+            config_path = interfaces.configuration.path_join(BASE_CONFIG_PATH, plugin_class.__name__)
+            if self._resolved is not None:
+                self._share_resolved(plugin_class, config_path)
+            # Automagics are created per call: the symbol cache's SQLite
+            # connection may only be used by the thread that opened it
+            chosen = automagic.choose_automagic(automagic.available(self._context), plugin_class)
+            try:
+                constructed = plugins.construct_plugin(self._context, chosen, plugin_class, BASE_CONFIG_PATH,
+                                                       _quiet, None)
+            except exceptions.UnsatisfiedException as e:
+                if shared and self._resolved is None:
+                    self._unresolved[family] = e
+                raise
+            if shared and self._resolved is None:
+                self._resolved = config_path
+            return constructed
+
+    def run(self, plugin, refresh=False):
+        """Run one plugin by its full name (e.g. "windows.pslist.PsList") and return a PluginResult
+
+        Failures (an unsupported image, missing symbols, a smeared structure)
+        are returned in error rather than raised, and are not cached.
+        """
+        plugin_class = self.plugins.get(plugin)
+        if plugin_class is None:
+            return PluginResult(plugin, None, [], [], False, "unknown plugin", 0.0)
+        if not refresh:
+            result = self.cached(plugin)
+            if result is not None:
+                return result
+
+        version = plugin_version(plugin_class)
+        started = time.monotonic()
+        with span(short_name(plugin), "volatility", version=version) as details:
+            try:
+                grid = self._construct(plugin, plugin_class).run()
+                rows = []
+                grid.populate(_collect, rows)
+            except Exception as e:  # one plugin's failure must not stop the others
+                details.update(error=_describe(e))
+                return PluginResult(plugin, version, [], [], False, _describe(e), time.monotonic() - started)
+            details.update(rows=len(rows))
+        result = PluginResult(plugin, version, [column.name for column in grid.columns], rows, False, None,
+                              time.monotonic() - started)
+        self._save(result)
+        return result
+
+    def run_all(self, names=DEFAULT_PLUGINS, workers=DEFAULT_WORKERS, refresh=False):
+        """Run plugins concurrently and return their PluginResults in the order given
+
+        Cached results are returned without building the context. The first
+        plugin to run resolves the kernel on its own; the rest then run on a
+        thread pool over the shared context, whose layer reads are locked.
+        """
+        results = {name: None if refresh else self.cached(name) for name in names}
+        pending = [name for name in names if results[name] is None]
+        while pending and self._resolved is None:
+            name = pending.pop(0)
+            results[name] = self.run(name, refresh)
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                for name, result in zip(pending, executor.map(lambda n: self.run(n, refresh), pending)):
+                    results[name] = result
+        return [results[name] for name in names]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+YARA Memory Scan
+Rule sets compiled once per content hash and matched against memory-mapped chunks of a dump in parallel
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from dfir.memscan import open_dump, chunk_ranges, live_ranges
+
+try:
+    import yara
+except ImportError:
+    yara = None
+
+DEFAULT_CACHE_DIR = "datasets/cache/yara"
+RULE_SUFFIXES = ('.yar', '.yara')
+
+# Each worker scans its chunk plus DEFAULT_OVERLAP bytes of the next one and
+# keeps only string matches that start inside its own chunk, so matches up
+# to DEFAULT_OVERLAP bytes long are found exactly once across a boundary
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_OVERLAP = 64 * 1024
+
+# Per-chunk scan timeout in seconds and bytes of matched data kept per hit
+DEFAULT_TIMEOUT = 600
+MAX_MATCH_DATA = 64
+
+# Compiled rules: content digest, {namespace: rule file}, saved compiled file (or None), yara.Rules
+RuleSet = namedtuple('RuleSet', ['digest', 'sources', 'compiled', 'rules'])
+
+# One string instance of a matching rule; data is truncated to MAX_MATCH_DATA bytes
+YaraMatch = namedtuple('YaraMatch', ['offset', 'rule', 'namespace', 'string', 'length', 'data', 'tags', 'meta'])
+
+_compiled = {}
+
+# The worker's rules, loaded once per process by the pool initializer
+_worker_rules = None
+
+def available():
+    """True when yara-python is installed"""
+    return yara is not None
+
+def rule_files(path):
+    """A rule file, or every .yar/.yara file under a directory in sorted order"""
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(RULE_SUFFIXES))
+    return files
+
+def rules_digest(files):
+    """Content hash of a rule set: every file's name and bytes, in order
+
+    Files pulled in with `include` are not part of the hash; list them
+    directly if they change independently.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for path in files:
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _namespaces(files):
+    """{namespace: path}, one namespace per rule file named after it"""
+    sources = {}
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem, 1
+        while name in sources:
+            n += 1
+            name = f"{stem}_{n}"
+        sources[name] = path
+    return sources
+
+def compile_rules(path, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the compiled RuleSet for a rule file or directory, compiling once per content
+
+    Compiled rules are kept in memory for the process and saved under
+    cache_dir as <digest>.yarc, so later runs and pool workers load them
+    instead of recompiling. Raises yara.SyntaxError on invalid rules.
+    """
+    if yara is None:
+        raise RuntimeError("yara-python is required for YARA scanning")
+    files = rule_files(path)
+    if not files:
+        raise ValueError(f"no YARA rules found in {path}")
+    key = rules_digest(files)
+    if key in _compiled:
+        return _compiled[key]
+
+    sources = _namespaces(files)
+    compiled = os.path.join(cache_dir, key + '.yarc') if cache_dir else None
+    if compiled and os.path.exists(compiled):
+        rules = yara.load(compiled)
+    else:
+        rules = yara.compile(filepaths=sources)
+        if compiled:
+            os.makedirs(cache_dir, exist_ok=True)
+            rules.save(compiled + '.tmp')
+            os.replace(compiled + '.tmp', compiled)
+    _compiled[key] = RuleSet(key, sources, compiled, rules)
+    return _compiled[key]
+
+def _load_rules(sources, compiled):
+    return yara.load(compiled) if compiled else yara.compile(filepaths=sources)
+
+def _instances(string):
+    """(offset, length, data) for a string match from yara-python >= 4.3 or the older tuple form"""
+    if isinstance(string, tuple):
+        offset, identifier, data = string
+        return identifier, [(offset, len(data), data)]
+    return string.identifier, [(i.offset, i.matched_length, i.matched_data) for i in string.instances]
+
+def scan_buffer(buf, rules, start=0, end=None, overlap=DEFAULT_OVERLAP, timeout=DEFAULT_TIMEOUT, first=None):
+    """Match rules against buf[start:end], reading up to overlap bytes past end
+
+    Returns YaraMatch tuples with absolute offsets for the string instances
+    that start inside [start, end). Rules are evaluated on the chunk, so
+    conditions on absolute offsets or filesize see the chunk, not the dump;
+    a rule without strings is reported at offset start by the first chunk
+    (first defaults to start == 0).
+    """
+    end = len(buf) if end is None else end
+    first = start == 0 if first is None else first
+    view = memoryview(buf)[start:min(end + overlap, len(buf))]
+    try:
+        found = rules.match(data=view, timeout=timeout)
+    finally:
+        view.release()
+    matches = []
+    for match in found:
+        for string in match.strings:
+            identifier, instances = _instances(string)
+            for offset, length, data in instances:
+                if offset + start < end:
+                    matches.append(YaraMatch(start + offset, match.rule, match.namespace, identifier, length,
+                                             bytes(data[:MAX_MATCH_DATA]), list(match.tags), dict(match.meta)))
+        if not match.strings and first:
+            matches.append(YaraMatch(start, match.rule, match.namespace, None, 0, b'', list(match.tags),
+                                     dict(match.meta)))
+    matches.sort(key=lambda m: (m.offset, m.rule, m.string or ''))
+    return matches
+
+def _init_worker(sources, compiled):
+    global _worker_rules
+    _worker_rules = _load_rules(sources, compiled)
+
+def scan_ranges(buf, rules, ranges, overlap=DEFAULT_OVERLAP, timeout=DEFAULT_TIMEOUT, first=False):
+    """Match rules against each (start, end) range of buf in turn"""
+    return [m for n, (start, end) in enumerate(ranges)
+            for m in scan_buffer(buf, rules, start, end, overlap, timeout, first and n == 0)]
+
+def _scan_chunk(task):
+    """Process pool worker: map the dump and match the live ranges of one chunk"""
+    path, ranges, overlap, timeout, first = task
+    buf = open_dump(path)
+    try:
+        return scan_ranges(buf, _worker_rules, ranges, overlap, timeout, first)
+    finally:
+        buf.close()
+
+def scan_memory(path, ruleset, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP,
+                timeout=DEFAULT_TIMEOUT, pagemap=None):
+    """Match a compiled RuleSet against a memory dump; returns YaraMatches in offset order
+
+    Each chunk is matched as a zero-copy view of the shared mapping; pool
+    workers load the compiled rules from the cache once each. With a
+    pagemap, only the ranges it leaves to scan are matched.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunks = [live_ranges(pagemap, start, end) for start, end in chunk_ranges(size, chunk_size)]
+
+    if workers <= 1 or size <= chunk_size:
+        buf = open_dump(path)
+        try:
+            ranges = [r for chunk in chunks for r in chunk]
+            return scan_ranges(buf, ruleset.rules, ranges, overlap, timeout, first=True)
+        finally:
+            buf.close()
+
+    first = next((n for n, ranges in enumerate(chunks) if ranges), None)
+    tasks = [(path, ranges, overlap, timeout, n == first) for n, ranges in enumerate(chunks)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(ruleset.sources, ruleset.compiled)) as executor:
+        return [m for matches in executor.map(_scan_chunk, tasks) for m in matches]
+
+def rule_summary(matches):
+    """{(namespace, rule): (first offset, string hits, meta)} in order of first match"""
+    summary = {}
+    for match in matches:
+        key = (match.namespace, match.rule)
+        first, hits, meta = summary.get(key, (match.offset, 0, match.meta))
+        summary[key] = (first, hits + 1, meta)
+    return summary
@@ -4,13 +4,46 @@ Complete DFIR Case Study - The Troubled Elevator Incident
 DFRWS 2023 Challenge - Real Industrial Control Systems Forensics
 """
 
-import subprocess
 import os
+import sys
 import time
 import json
 from datetime import datetime
 import zipfile
 
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+sys.path.insert(0, os.path.join(CODE_DIR, "misp"))
+sys.path.insert(0, os.path.join(CODE_DIR, "volatility"))
+from dfir.ioc import extract_iocs, extract_iocs_from_stream
+from dfir.pagemap import page_map
+from dfir.splitzip import ArchivedFile, volume_paths
+from dfir.scheduler import Phase, run_phases, captured_stdout
+from dfir.pcapng import read_capture
+from dfir import icsflows
+from dfir import plcdiff
+from dfir import timeline
+from dfir import video
+from dfir import custody
+from dfir import tracing
+from dfir import findings
+import misp_demo
+import volatility_demo
+
+DFRWS_MEMORY_DUMP = "dfrws2023-challenge/Desktop Memory Dump/DESKTOP-JKS05LO-20230622-143255.raw"
+NETWORK_TRACE = "dfrws2023-challenge/Network Trace/142728_162728.pcapng"
+PLC_DUMPS = "dfrws2023-challenge/PLC Memory Dumps/"
+CASE_ID = "dfrws2023-troubled-elevator"
+
+# Worker pools for the phase scheduler: scans are CPU-bound (and fan out to
+# their own process pools), in-process parsers of the smaller evidence run
+# beside them, tool invocations and lookups are I/O-bound
+PHASE_POOLS = {"cpu": 1, "parse": 2, "io": 4}
+PHASE_TIMEOUT = 600
+
+# Seconds either side of each ICS write searched for corroborating events
+CORRELATION_WINDOW = 5
+
 # ANSI color codes for terminal output
 class Colors:
     RED = '\033[91m'
@@ -51,16 +84,28 @@ def print_info(text):
     """Print info message"""
     print(f"{Colors.BLUE}[INFO] {text}{Colors.END}")
 
-def run_command(command):
-    """Run command and return output"""
+def run_in_process(analysis, *args, **kwargs):
+    """Run a demo analysis in-process; returns its captured output, error, exit status and result"""
+    with captured_stdout() as output:
+        try:
+            result = analysis(*args, **kwargs)
+            return output.getvalue(), "", 0, result
+        except Exception as e:
+            return output.getvalue(), str(e), 1, None
+
+def open_archived_evidence(zip_file, suffix, label):
+    """Open evidence inside a single or split ZIP archive for streaming, or None"""
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=60)
-        return result.stdout, result.stderr, result.returncode
-    except Exception as e:
-        return "", str(e), 1
+        source = ArchivedFile(zip_file, suffix)
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        print_error(f"Failed to open {label} archive: {e}")
+        return None
+    print_success(f"{label} streamed from {source.volume_count}-volume archive "
+                  f"({source.size / (1024*1024):.1f} MB, no extraction needed)")
+    return source
 
 def extract_memory_dump():
-    """Extract the memory dump from zip files"""
+    """Locate the memory dump, streaming it from its zip files if not extracted"""
     memory_dir = "dfrws2023-challenge/Desktop Memory Dump"
     zip_file = f"{memory_dir}/DESKTOP-JKS05LO-20230622-143255.zip"
     
@@ -68,41 +113,17 @@ def extract_memory_dump():
     raw_file = f"{memory_dir}/DESKTOP-JKS05LO-20230622-143255.raw"
     if os.path.exists(raw_file):
         print_success("Memory dump already extracted")
-        return True
+        return raw_file
     
     if os.path.exists(zip_file):
-        print_info("Extracting memory dump from compressed files...")
-        try:
-            # Try to extract with 7zip or other tools that handle multi-part archives
-            extract_cmd = f"7z x '{zip_file}' -o'{memory_dir}' -y"
-            stdout, stderr, returncode = run_command(extract_cmd)
-            
-            if returncode == 0:
-                print_success("Memory dump extracted successfully")
-                return True
-            else:
-                print_warning("7zip not available, trying alternative extraction...")
-                # Try with unzip
-                extract_cmd = f"unzip '{zip_file}' -d '{memory_dir}'"
-                stdout, stderr, returncode = run_command(extract_cmd)
-                
-                if returncode == 0:
-                    print_success("Memory dump extracted successfully")
-                    return True
-                else:
-                    print_warning("Standard extraction failed - multi-part archive")
-                    print_info("Memory dump requires special handling for multi-part archives")
-                    return False
-                    
-        except Exception as e:
-            print_error(f"Failed to extract memory dump: {e}")
-            return False
+        print_info("Opening memory dump inside compressed files...")
+        return open_archived_evidence(zip_file, ".raw", "Memory dump")
     else:
         print_warning("Memory dump zip file not found")
-        return False
+        return None
 
 def extract_cctv_footage():
-    """Extract the CCTV footage from zip files"""
+    """Locate the CCTV footage, streaming it from its split zip files if not extracted"""
     cctv_dir = "dfrws2023-challenge/CCTV Footage"
     zip_file = f"{cctv_dir}/Crop_fit.zip"
     
@@ -110,50 +131,27 @@ def extract_cctv_footage():
     mp4_file = f"{cctv_dir}/Crop_fit.mp4"
     if os.path.exists(mp4_file):
         print_success("CCTV footage already extracted")
-        return True
+        return mp4_file
     
     if os.path.exists(zip_file):
-        print_info("Extracting CCTV footage from compressed files...")
-        try:
-            # Try to extract with 7zip or other tools that handle multi-part archives
-            extract_cmd = f"7z x '{zip_file}' -o'{cctv_dir}' -y"
-            stdout, stderr, returncode = run_command(extract_cmd)
-            
-            if returncode == 0:
-                print_success("CCTV footage extracted successfully")
-                return True
-            else:
-                print_warning("7zip not available, trying alternative extraction...")
-                # Try with unzip
-                extract_cmd = f"unzip '{zip_file}' -d '{cctv_dir}'"
-                stdout, stderr, returncode = run_command(extract_cmd)
-                
-                if returncode == 0:
-                    print_success("CCTV footage extracted successfully")
-                    return True
-                else:
-                    print_warning("Standard extraction failed - multi-part archive")
-                    print_info("CCTV footage requires special handling for multi-part archives")
-                    return False
-                    
-        except Exception as e:
-            print_error(f"Failed to extract CCTV footage: {e}")
-            return False
+        print_info("Opening CCTV footage inside multi-part archive...")
+        return open_archived_evidence(zip_file, ".mp4", "CCTV footage")
     else:
         print_warning("CCTV footage zip file not found")
-        return False
+        return None
 
-def check_case_study_data():
-    """Check available case study data"""
+def check_case_study_data(archived=None, manifest=custody.DEFAULT_MANIFEST):
+    """Check available case study data and hash it for chain of custody"""
     data_files = {
-        "Network Trace": "dfrws2023-challenge/Network Trace/142728_162728.pcapng",
-        "Memory Dump": "dfrws2023-challenge/Desktop Memory Dump/DESKTOP-JKS05LO-20230622-143255.raw",
-        "PLC Memory": "dfrws2023-challenge/PLC Memory Dumps/",
+        "Network Trace": NETWORK_TRACE,
+        "Memory Dump": DFRWS_MEMORY_DUMP,
+        "PLC Memory": PLC_DUMPS,
         "CCTV Footage": "dfrws2023-challenge/CCTV Footage/Crop_fit.mp4",
         "Documents": "dfrws2023-challenge/Documents/"
     }
     
     available = {}
+    evidence = {}
     for name, path in data_files.items():
         if os.path.exists(path):
             if os.path.isfile(path):
@@ -163,40 +161,47 @@ def check_case_study_data():
                 # Count files in directory
                 file_count = len([f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))])
                 available[name] = f"{file_count} files"
+            evidence[name] = [path]
+        elif isinstance((archived or {}).get(name), ArchivedFile):
+            size_mb = archived[name].size / (1024*1024)
+            available[name] = f"{size_mb:.1f} MB (streamed from archive)"
+            # The archive volumes are the evidence as acquired
+            evidence[name] = volume_paths(archived[name].zip_path)
         else:
             available[name] = "NOT FOUND"
     
-    return available
-
-def run_complete_case_study():
-    """Run complete DFIR case study with DFRWS 2023 challenge data"""
-    
-    print_header("THE TROUBLED ELEVATOR - DFIR CASE STUDY")
-    print(f"{Colors.BOLD}{Colors.WHITE}DFRWS 2023 Challenge - Industrial Control Systems Forensics{Colors.END}")
-    print(f"{Colors.WHITE}Case Study Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.END}")
-    
-    # Extract memory dump and CCTV footage if needed
-    extract_memory_dump()
-    extract_cctv_footage()
-    
-    # Check available data
-    print_section("INCIDENT OVERVIEW")
-    print(f"{Colors.WHITE}Scenario: The Troubled Elevator{Colors.END}")
-    print(f"{Colors.WHITE}Location: Wayne Enterprise Bank, Richmond{Colors.END}")
-    print(f"{Colors.WHITE}Date: June 29, 2023{Colors.END}")
-    print(f"{Colors.WHITE}Victim: Kristi Wayne (CEO){Colors.END}")
-    print(f"{Colors.WHITE}Incident: Executive elevator malfunction, CEO trapped{Colors.END}")
-    print(f"{Colors.WHITE}Suspicion: Potential cyber attack on industrial control systems{Colors.END}")
-    
-    print_section("FORENSIC DATA INVENTORY")
-    data_status = check_case_study_data()
-    
-    for data_type, status in data_status.items():
-        if "NOT FOUND" in status:
-            print_error(f"{data_type}: {status}")
+    # One read per file for all digests; unchanged files come from the manifest
+    hashes = custody.hash_evidence([path for paths in evidence.values() for path in paths], manifest)
+    for name, paths in evidence.items():
+        items = set(custody.collect_files(paths))
+        digests = [h for h in hashes if h.path in items]
+        if len(digests) == 1:
+            available[name] += f", sha256 {digests[0].digests['sha256'][:16]}..."
         else:
-            print_success(f"{data_type}: {status}")
+            available[name] += f", {len(digests)} files hashed"
     
+    return available
+
+def record_findings(case, evidence, artifact, rows, columns=None):
+    """Append a phase's artifacts to the case's findings store, if there is one"""
+    if case["store"] is None:
+        return 0
+    return case["store"].append(findings.evidence_name(evidence), artifact, rows, columns)
+
+def extract_case_iocs(case):
+    """Extract IOCs once so MISP and Volatility share one result in-process"""
+    memory_source = case["memory_source"]
+    if isinstance(memory_source, ArchivedFile):
+        with memory_source.open() as stream:
+            return extract_iocs_from_stream(stream, case["memory_dump"], memory_source.size)
+    if os.path.exists(case["memory_dump"]):
+        # Zero and duplicate pages of the dump are mapped once and skipped by every scan
+        pagemap = page_map(case["memory_dump"], case["workers"])
+        return extract_iocs(case["memory_dump"], workers=case["workers"], pagemap=pagemap)
+    return None
+
+def phase_threat_intelligence(case, extraction):
+    """Phase 1: initial detection and threat intelligence"""
     print_section("PHASE 1: INITIAL DETECTION & ALERT")
     print(f"{Colors.WHITE}Security Operations Center receives alert:{Colors.END}")
     print(f"{Colors.YELLOW}• Executive elevator malfunction{Colors.END}")
@@ -210,15 +215,20 @@ def run_complete_case_study():
     print(f"{Colors.WHITE}• Automated alert generation{Colors.END}")
     print(f"{Colors.WHITE}• Initial threat assessment{Colors.END}")
     
+    if extraction is not None:
+        print_success(f"{len(extraction.iocs)} typed indicators extracted from {os.path.basename(extraction.source)}")
+    
     # Run MISP analysis
     print_info("Running threat intelligence analysis...")
-    misp_cmd = "python3 misp/misp_demo.py"
-    stdout, stderr, returncode = run_command(misp_cmd)
+    stdout, stderr, returncode, _ = run_in_process(misp_demo.run_real_misp_demo, extraction, store=case["store"])
     if returncode == 0:
         print_success("Threat intelligence analysis completed")
     else:
         print_warning("MISP analysis (simulated)")
-    
+
+def phase_memory_forensics(case, extraction):
+    """Phase 2: memory forensics on the shared extraction"""
+    data_status = case["data_status"]
     print_section("PHASE 2: MEMORY FORENSICS ANALYSIS")
     if "Memory Dump" in data_status and "NOT FOUND" not in data_status["Memory Dump"]:
         print(f"{Colors.WHITE}Analyzing CEO's desktop memory dump:{Colors.END}")
@@ -231,16 +241,20 @@ def run_complete_case_study():
         print(f"{Colors.WHITE}• Network connection extraction{Colors.END}")
         print(f"{Colors.WHITE}• File system artifact discovery{Colors.END}")
         print(f"{Colors.WHITE}• Registry analysis for persistence{Colors.END}")
-        print(f"{Colors.WHITE}• Malware detection in memory{Colors.END}")
+        print(f"{Colors.WHITE}• Malware detection in memory (YARA rules){Colors.END}")
         
-        # Run Volatility analysis
+        # Run Volatility analysis on the shared extraction of the full image
         print_info("Running memory forensics analysis...")
-        vol_cmd = "python3 volatility/volatility_demo.py"
-        stdout, stderr, returncode = run_command(vol_cmd)
+        stdout, stderr, returncode, processes = run_in_process(
+            volatility_demo.run_real_volatility_analysis, case["memory_dump"], case["workers"], extraction,
+            store=case["store"])
         if returncode == 0:
             print_success("Memory forensics analysis completed")
+            if processes is not None:
+                print(f"{Colors.WHITE}• {len(processes)} processes carved from EPROCESS pool allocations{Colors.END}")
         else:
             print_warning("Memory analysis (using existing demo)")
+        return processes or []
     else:
         print_warning("Memory dump not available for analysis")
         print_info("Using existing memory dump for demonstration...")
@@ -250,13 +264,39 @@ def run_complete_case_study():
         
         # Run Volatility analysis on existing data
         print_info("Running memory forensics analysis...")
-        vol_cmd = "python3 volatility/volatility_demo.py"
-        stdout, stderr, returncode = run_command(vol_cmd)
+        stdout, stderr, returncode, processes = run_in_process(
+            volatility_demo.run_real_volatility_analysis, case["memory_dump"], case["workers"], extraction,
+            store=case["store"])
         if returncode == 0:
             print_success("Memory forensics analysis completed")
         else:
             print_warning("Memory analysis (using existing demo)")
+        return processes or []
+
+def report_ics_operations(table):
+    """Summarize decoded Modbus/S7 operations and flag writes from unexpected hosts"""
+    print_success(f"ICS protocol decoding: {len(table)} Modbus/S7 operations")
+    counts = table.groupby(["protocol", "function"], observed=True).size().sort_values(ascending=False)
+    for (protocol, function), count in counts.head(8).items():
+        print(f"{Colors.WHITE}    {protocol:<8} {function:<28} {count}{Colors.END}")
     
+    hmi = icsflows.likely_hmi(table)
+    if hmi is None:
+        return
+    print(f"{Colors.WHITE}• Most active ICS client (presumed HMI): {icsflows.host_name(hmi)}{Colors.END}")
+    suspicious = icsflows.holding_register_writes(table, [hmi])
+    if len(suspicious):
+        print_warning(f"{len(suspicious)} holding register writes from non-HMI hosts")
+        targets = suspicious.groupby(["src", "address"]).agg(writes=("value", "size"), last=("value", "last"))
+        for (src, address), target in targets.head(5).iterrows():
+            print(f"{Colors.YELLOW}    {icsflows.host_name(src)} -> register {address}: "
+                  f"{target['writes']} writes, last value {target['last']}{Colors.END}")
+    else:
+        print(f"{Colors.WHITE}• No holding register writes from other hosts{Colors.END}")
+
+def phase_network_forensics(case):
+    """Phase 3: network forensics"""
+    data_status = case["data_status"]
     print_section("PHASE 3: NETWORK FORENSICS ANALYSIS")
     if "Network Trace" in data_status and "NOT FOUND" not in data_status["Network Trace"]:
         print(f"{Colors.WHITE}Analyzing ICS network traffic:{Colors.END}")
@@ -264,26 +304,57 @@ def run_complete_case_study():
         print(f"{Colors.YELLOW}• Size: {data_status['Network Trace']}{Colors.END}")
         print(f"{Colors.YELLOW}• Industrial Control Systems traffic{Colors.END}")
         
-        print_info("Network Analysis (Wireshark/tshark)")
+        print_info("Network Analysis (in-process pcapng reader)")
         print(f"{Colors.WHITE}• Packet capture analysis{Colors.END}")
-        print(f"{Colors.WHITE}• ICS protocol analysis (Modbus, DNP3){Colors.END}")
+        print(f"{Colors.WHITE}• ICS protocol analysis (Modbus/TCP, S7comm){Colors.END}")
         print(f"{Colors.WHITE}• Traffic pattern identification{Colors.END}")
         print(f"{Colors.WHITE}• Malicious communication detection{Colors.END}")
         print(f"{Colors.WHITE}• Data exfiltration analysis{Colors.END}")
         
-        # Run network analysis
+        # Run network analysis: one memory-mapped pass, no tshark needed
         print_info("Running network forensics analysis...")
-        net_cmd = f"tshark -r 'dfrws2023-challenge/Network Trace/142728_162728.pcapng' -q -z io,phs"
-        stdout, stderr, returncode = run_command(net_cmd)
-        if returncode == 0:
-            print_success("Network forensics analysis completed")
-            print(f"{Colors.WHITE}• Protocol statistics extracted{Colors.END}")
-            print(f"{Colors.WHITE}• Traffic patterns identified{Colors.END}")
-        else:
-            print_warning("Network analysis (tshark not available)")
+        try:
+            stats = read_capture(NETWORK_TRACE, workers=case["workers"])
+        except (OSError, ValueError) as e:
+            print_warning(f"Network analysis failed: {e}")
+            return
+        
+        print_success("Network forensics analysis completed")
+        duration = stats.last - stats.first if stats.first is not None else 0.0
+        print(f"{Colors.WHITE}• {stats.packets} packets, {stats.bytes / (1024*1024):.1f} MB "
+              f"over {duration:.0f}s{Colors.END}")
+        print(f"{Colors.WHITE}• Protocol hierarchy:{Colors.END}")
+        for depth, protocol, frames, size in stats.protocol_hierarchy():
+            print(f"{Colors.WHITE}    {'  ' * depth}{protocol:<{24 - 2 * depth}} "
+                  f"frames:{frames:<8} bytes:{size}{Colors.END}")
+        print(f"{Colors.WHITE}• Top flows by volume:{Colors.END}")
+        for flow in stats.top_flows(5):
+            print(f"{Colors.WHITE}    {flow['transport']} {flow['src']}:{flow['sport']} -> "
+                  f"{flow['dst']}:{flow['dport']}  {flow['packets']} packets, {flow['bytes']} bytes{Colors.END}")
+        buckets = stats.timeline()
+        if buckets:
+            start, packets, size = max(buckets, key=lambda bucket: bucket[1])
+            print(f"{Colors.WHITE}• Busiest second: {datetime.fromtimestamp(start).strftime('%Y-%m-%d %H:%M:%S')} "
+                  f"({packets} packets){Colors.END}")
+        
+        # Second pass only when the hierarchy shows Modbus or S7 traffic
+        table = None
+        if any("modbus" in path or "s7comm" in path for path in stats.paths):
+            table = icsflows.build_ics_table(NETWORK_TRACE, workers=case["workers"])
+            report_ics_operations(table)
+        
+        record_findings(case, NETWORK_TRACE, "protocol_hierarchy", stats.protocol_hierarchy(),
+                        ["depth", "protocol", "frames", "bytes"])
+        record_findings(case, NETWORK_TRACE, "flows", stats.top_flows(len(stats.flows)))
+        if table is not None:
+            record_findings(case, NETWORK_TRACE, "ics_operations", table)
+        return {"stats": stats, "ics": table}
     else:
         print_warning("Network trace not available for analysis")
-    
+
+def phase_embedded_systems(case):
+    """Phase 4: PLC memory forensics"""
+    data_status = case["data_status"]
     print_section("PHASE 4: EMBEDDED SYSTEMS FORENSICS")
     if "PLC Memory" in data_status and "NOT FOUND" not in data_status["PLC Memory"]:
         print(f"{Colors.WHITE}Analyzing Programmable Logic Controller memory:{Colors.END}")
@@ -298,12 +369,36 @@ def run_complete_case_study():
         print(f"{Colors.WHITE}• Anomaly detection{Colors.END}")
         print(f"{Colors.WHITE}• Timeline reconstruction{Colors.END}")
         
+        # One hash pass per dump, byte diffs only inside blocks that changed
+        dumps = [os.path.join(PLC_DUMPS, name) for name in os.listdir(PLC_DUMPS)
+                 if os.path.isfile(os.path.join(PLC_DUMPS, name))]
+        comparison = plcdiff.compare_snapshots(dumps, workers=case["workers"])
+        changes = []
+        for series, (hashed, diffs) in comparison.items():
+            size_mb = sum(dump.size for dump in hashed) / (1024*1024)
+            print(f"{Colors.WHITE}• {series}: {len(hashed)} snapshot(s), {size_mb:.1f} MB hashed{Colors.END}")
+            for diff in diffs:
+                changed = sum(region.end - region.start for region in diff.regions)
+                print(f"{Colors.WHITE}    {os.path.basename(diff.before)} -> {os.path.basename(diff.after)}: "
+                      f"{diff.changed_blocks} block(s), {len(diff.regions)} region(s), {changed} bytes{Colors.END}")
+                for region in diff.regions[:5]:
+                    for run in region.runs[:2]:
+                        print(f"{Colors.YELLOW}      0x{run.offset:08x}  {run.before[:8].hex()} -> "
+                              f"{run.after[:8].hex()} ({max(len(run.before), len(run.after))} bytes){Colors.END}")
+                changes.extend((series, os.path.basename(diff.before), os.path.basename(diff.after),
+                                region.start, region.end, run.offset, run.before.hex(), run.after.hex())
+                               for region in diff.regions for run in region.runs)
+        record_findings(case, PLC_DUMPS, "plc_changes", changes,
+                        ["series", "before", "after", "region_start", "region_end", "offset", "old", "new"])
+        
         print_success("PLC memory analysis completed")
-        print(f"{Colors.WHITE}• Multiple memory dumps analyzed{Colors.END}")
-        print(f"{Colors.WHITE}• Control system behavior examined{Colors.END}")
+        return comparison
     else:
         print_warning("PLC memory dumps not available for analysis")
-    
+
+def phase_multimedia_forensics(case):
+    """Phase 5: CCTV footage analysis"""
+    data_status = case["data_status"]
     print_section("PHASE 5: MULTIMEDIA FORENSICS")
     if "CCTV Footage" in data_status and "NOT FOUND" not in data_status["CCTV Footage"]:
         print(f"{Colors.WHITE}Analyzing CCTV surveillance footage:{Colors.END}")
@@ -316,30 +411,82 @@ def run_complete_case_study():
         print(f"{Colors.WHITE}• Activity correlation{Colors.END}")
         print(f"{Colors.WHITE}• Evidence validation{Colors.END}")
         
-        # Run multimedia analysis
+        # Frame index from the MP4 sample tables plus motion energy, built once and cached
         print_info("Running multimedia forensics analysis...")
         try:
-            # Use ffprobe to get video information
-            ffprobe_cmd = f"ffprobe -v quiet -print_format json -show_format -show_streams 'dfrws2023-challenge/CCTV Footage/Crop_fit.mp4'"
-            stdout, stderr, returncode = run_command(ffprobe_cmd)
-            if returncode == 0:
-                print_success("CCTV analysis completed")
-                print(f"{Colors.WHITE}• Video metadata extracted{Colors.END}")
-                print(f"{Colors.WHITE}• Timeline information available{Colors.END}")
-            else:
-                print_warning("Multimedia analysis (basic file info)")
-                print(f"{Colors.WHITE}• Video file verified{Colors.END}")
-                print(f"{Colors.WHITE}• File size: {data_status['CCTV Footage']}{Colors.END}")
-        except Exception as e:
-            print_warning("Multimedia analysis (file verification)")
-            print(f"{Colors.WHITE}• Video file available{Colors.END}")
+            index = video.build_video_index(case["cctv_source"])
+        except (OSError, ValueError) as e:
+            print_warning(f"Multimedia analysis failed: {e}")
+            return
+        frames = index.frames
+        if frames is None:
+            print_warning("No video track found in CCTV footage")
+            return index
+        
+        print_success("CCTV analysis completed")
+        duration = float(frames.times.max()) if len(frames.times) else 0.0
+        print(f"{Colors.WHITE}• {frames.codec} {frames.width}x{frames.height}, {len(frames.times)} frames "
+              f"over {duration:.0f}s, {len(frames.keyframes)} keyframes{Colors.END}")
+        if frames.creation_time:
+            print(f"{Colors.WHITE}• Recording started "
+                  f"{datetime.fromtimestamp(frames.creation_time).strftime('%Y-%m-%d %H:%M:%S')}{Colors.END}")
+        if index.motion is None and index.motion_failed:
+            print_warning(f"ffmpeg could not decode the footage ({index.motion_failed}): motion timeline skipped")
+        elif index.motion is None:
+            print_warning("ffmpeg not found: motion timeline skipped (frame index cached)")
+        else:
+            windows = video.activity_windows(index.motion)
+            print(f"{Colors.WHITE}• {len(windows)} activity window(s) in the motion timeline{Colors.END}")
+            record_findings(case, case["cctv_source"], "cctv_activity",
+                            [(start, end, peak, video.keyframe_before(frames, start)) for start, end, peak in windows],
+                            ["start", "end", "peak", "keyframe"])
+            for start, end, peak in sorted(windows, key=lambda w: w[2], reverse=True)[:5]:
+                keyframe = video.keyframe_before(frames, start)
+                print(f"{Colors.YELLOW}    {start:8.1f}s - {end:8.1f}s  peak {peak:.1f}  "
+                      f"(seek keyframe {keyframe} at byte 0x{frames.offsets[keyframe]:x}){Colors.END}")
+        return index
     else:
         print_warning("CCTV footage not available for analysis")
-        print_info("CCTV footage requires extraction from multi-part archive")
+        print_info("CCTV footage is read directly from its multi-part archive")
         print(f"{Colors.WHITE}• File: Crop_fit.zip (with .z01, .z02, .z03 parts){Colors.END}")
         print(f"{Colors.WHITE}• Total size: ~375 MB{Colors.END}")
-        print(f"{Colors.WHITE}• Requires 7zip or similar tool for extraction{Colors.END}")
-    
+        print(f"{Colors.WHITE}• Place all archive parts in 'CCTV Footage/'{Colors.END}")
+
+def correlation_streams(inputs):
+    """Sorted event streams from whatever the earlier phases produced"""
+    streams = [timeline.memory_events(inputs.get("extraction")), timeline.process_events(inputs.get("memory"))]
+    network = inputs.get("network")
+    if network:
+        streams.append(timeline.flow_events(network["stats"]))
+        if network["ics"] is not None:
+            streams.append(timeline.ics_events(network["ics"]))
+    if inputs.get("plc"):
+        streams.append(timeline.plc_events(inputs["plc"]))
+    streams.append(timeline.video_events(inputs.get("cctv")))
+    return streams
+
+def report_write_context(index, table):
+    """Events from other sources within CORRELATION_WINDOW seconds of each ICS write"""
+    writes = table[icsflows.writes(table)]
+    if not len(writes):
+        print(f"{Colors.WHITE}• No ICS writes to correlate{Colors.END}")
+        return
+    others = [source for source in index.source_names if source != "ics"]
+    counts = index.count_around(writes["timestamp"].to_numpy(), CORRELATION_WINDOW, others)
+    print(f"{Colors.WHITE}• {len(writes)} ICS writes, {int((counts > 0).sum())} with other evidence "
+          f"within ±{CORRELATION_WINDOW}s{Colors.END}")
+    busiest = counts.argsort()[::-1][:3]
+    for row in busiest[counts[busiest] > 0]:
+        write = writes.iloc[row]
+        when = datetime.fromtimestamp(write["timestamp"]).strftime('%H:%M:%S')
+        print(f"{Colors.YELLOW}    {when} {icsflows.host_name(write['src'])} {write['function']} "
+              f"address {write['address']}: {counts[row]} nearby event(s){Colors.END}")
+        nearby = index.window(write["timestamp"] - CORRELATION_WINDOW, write["timestamp"] + CORRELATION_WINDOW, others)
+        for item in nearby[:3]:
+            print(f"{Colors.WHITE}      {item.source}/{item.kind}: {item.detail}{Colors.END}")
+
+def phase_evidence_correlation(case, inputs):
+    """Phase 6: evidence correlation and timeline"""
     print_section("PHASE 6: EVIDENCE CORRELATION & TIMELINE")
     print(f"{Colors.WHITE}Cross-tool analysis and evidence correlation:{Colors.END}")
     print(f"{Colors.YELLOW}• Memory artifacts vs network activity{Colors.END}")
@@ -349,11 +496,23 @@ def run_complete_case_study():
     print(f"{Colors.YELLOW}• Attack vector identification{Colors.END}")
     print(f"{Colors.YELLOW}• Impact assessment{Colors.END}")
     
+    # Per-source streams are merged lazily into one time-indexed event table
+    index = timeline.TimelineIndex.from_streams(*correlation_streams(inputs))
+    print_success(f"Timeline built: {len(index)} events")
+    for (source, kind), count in sorted(index.kinds().items()):
+        print(f"{Colors.WHITE}    {source:<8} {kind:<36} {count}{Colors.END}")
+    
+    network = inputs.get("network")
+    if network and network["ics"] is not None:
+        report_write_context(index, network["ics"])
+    
     print_success("Evidence correlation completed")
     print(f"{Colors.WHITE}• Cross-tool analysis performed{Colors.END}")
     print(f"{Colors.WHITE}• Timeline reconstructed{Colors.END}")
     print(f"{Colors.WHITE}• Attack patterns identified{Colors.END}")
-    
+
+def phase_incident_response(case):
+    """Phase 7: incident response and recovery"""
     print_section("PHASE 7: INCIDENT RESPONSE & RECOVERY")
     print(f"{Colors.WHITE}Response actions and recovery procedures:{Colors.END}")
     print(f"{Colors.YELLOW}• Immediate containment strategies{Colors.END}")
@@ -366,6 +525,114 @@ def run_complete_case_study():
     print(f"{Colors.WHITE}• Systems secured and recovered{Colors.END}")
     print(f"{Colors.WHITE}• Evidence preserved for legal proceedings{Colors.END}")
     print(f"{Colors.WHITE}• Security controls updated{Colors.END}")
+
+def case_study_phases(case):
+    """Declare the case study phases and their dependencies"""
+    return [
+        # No phase is retried: each appends to the findings store under this
+        # run's id, so a second attempt would record its rows twice
+        Phase("extraction", lambda inputs: extract_case_iocs(case), pool="cpu"),
+        Phase("threat_intel", lambda inputs: phase_threat_intelligence(case, inputs["extraction"]),
+              depends=["extraction"], pool="io", timeout=PHASE_TIMEOUT),
+        Phase("memory", lambda inputs: phase_memory_forensics(case, inputs["extraction"]),
+              depends=["extraction"], pool="cpu"),
+        Phase("network", lambda inputs: phase_network_forensics(case), pool="parse", timeout=PHASE_TIMEOUT),
+        Phase("plc", lambda inputs: phase_embedded_systems(case), pool="parse", timeout=PHASE_TIMEOUT),
+        Phase("cctv", lambda inputs: phase_multimedia_forensics(case), pool="io", timeout=PHASE_TIMEOUT),
+        Phase("correlation", lambda inputs: phase_evidence_correlation(case, inputs),
+              depends=["extraction", "threat_intel", "memory", "network", "plc", "cctv"]),
+        Phase("response", lambda inputs: phase_incident_response(case), depends=["correlation"]),
+    ]
+
+def report_phase(result):
+    """Print a finished phase's captured report, or why it did not complete"""
+    print(result.output, end="")
+    if result.status != "ok":
+        print_warning(f"Phase '{result.name}' {result.status}: {result.error}")
+
+def run_complete_case_study():
+    """Run complete DFIR case study with DFRWS 2023 challenge data"""
+    
+    tracing.tracer().reset()
+    print_header("THE TROUBLED ELEVATOR - DFIR CASE STUDY")
+    print(f"{Colors.BOLD}{Colors.WHITE}DFRWS 2023 Challenge - Industrial Control Systems Forensics{Colors.END}")
+    print(f"{Colors.WHITE}Case Study Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.END}")
+    
+    # Locate memory dump and CCTV footage, streaming them from their archives if needed
+    memory_source = extract_memory_dump()
+    cctv_source = extract_cctv_footage()
+    
+    # Check available data
+    print_section("INCIDENT OVERVIEW")
+    print(f"{Colors.WHITE}Scenario: The Troubled Elevator{Colors.END}")
+    print(f"{Colors.WHITE}Location: Wayne Enterprise Bank, Richmond{Colors.END}")
+    print(f"{Colors.WHITE}Date: June 29, 2023{Colors.END}")
+    print(f"{Colors.WHITE}Victim: Kristi Wayne (CEO){Colors.END}")
+    print(f"{Colors.WHITE}Incident: Executive elevator malfunction, CEO trapped{Colors.END}")
+    print(f"{Colors.WHITE}Suspicion: Potential cyber attack on industrial control systems{Colors.END}")
+    
+    print_section("FORENSIC DATA INVENTORY")
+    with tracing.span("inventory", "setup"):
+        data_status = check_case_study_data({"Memory Dump": memory_source, "CCTV Footage": cctv_source})
+    
+    for data_type, status in data_status.items():
+        if "NOT FOUND" in status:
+            print_error(f"{data_type}: {status}")
+        else:
+            print_success(f"{data_type}: {status}")
+    print_info(f"MD5/SHA-1/SHA-256 of all evidence recorded in {custody.DEFAULT_MANIFEST}")
+    
+    # Every phase appends its artifacts to a partitioned Parquet store for follow-up queries
+    store = findings.FindingsStore(case=CASE_ID) if findings.available() else None
+    if store is None:
+        print_warning("pyarrow not installed: findings are reported but not stored")
+    
+    case = {
+        "data_status": data_status,
+        "store": store,
+        "memory_source": memory_source,
+        "cctv_source": cctv_source,
+        "memory_dump": str(memory_source) if memory_source else volatility_demo.MEMORY_DUMP,
+        "workers": os.cpu_count() or 1,
+    }
+    record_findings(case, findings.CASE_LEVEL, "inventory", data_status.items(), ["item", "status"])
+    
+    # Independent phases overlap; each report is printed in phase order once it is ready
+    phases = case_study_phases(case)
+    with tracing.span("phases", "run", process_wide=True):
+        results = run_phases(phases, pools=PHASE_POOLS, on_complete=report_phase)
+    
+    print_section("PHASE TIMINGS")
+    trace = tracing.tracer()
+    for phase in phases:
+        result = results[phase.name]
+        attempts = [span for span in trace.spans if span.category == "phase" and span.name == phase.name]
+        usage = ""
+        if attempts:
+            cpu = sum(span.cpu for span in attempts)
+            read_mb = sum(span.read_bytes for span in attempts) / (1024*1024)
+            usage = f", cpu {cpu:.1f}s, read {read_mb:.1f} MB, peak RSS {attempts[-1].peak_rss / (1024*1024):.0f} MB"
+        print(f"{Colors.WHITE}• {result.name}: {result.status} in {result.elapsed:.1f}s "
+              f"({result.attempts} attempt(s){usage}){Colors.END}")
+    # Subprocess and scan pool work cannot be split between concurrent phases
+    for span in trace.spans:
+        if span.category == "run":
+            print(f"{Colors.WHITE}• all phases: {span.end - span.start:.1f}s, cpu {span.cpu:.1f}s in-process "
+                  f"+ {span.child_cpu:.1f}s child processes, read {span.read_bytes / (1024*1024):.1f} MB{Colors.END}")
+    print_info("Per-phase cpu and reads are the phase thread's own; tool subprocesses and scan pools "
+               "are only counted in the all-phases total")
+    summary_path, trace_path = trace.write(prefix="case_study")
+    print_info(f"Trace summary: {summary_path}")
+    print_info(f"Trace events (open in chrome://tracing or ui.perfetto.dev): {trace_path}")
+    
+    if store is not None:
+        print_section("FINDINGS STORE")
+        contents = store.contents()
+        print(f"{Colors.WHITE}Stored artifacts, all runs of this case:{Colors.END}")
+        for artifact, rows in contents.groupby("artifact")["rows"].sum().items():
+            print(f"{Colors.WHITE}• {artifact:<20} {rows} rows{Colors.END}")
+        print_info(f"Run {store.run} appended to {store.root} (case {store.case}); query with "
+                   f"findings.FindingsStore(case=\"{store.case}\").query(artifact, filters=...)")
     
     print_section("CASE STUDY SUMMARY")
     print(f"{Colors.BOLD}{Colors.GREEN}Real DFIR Investigation Completed Successfully{Colors.END}")
@@ -7,15 +7,55 @@ Actually performs threat intelligence analysis using public APIs
 import requests
 import json
 import os
+import sys
 import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.ioc import extract_iocs, iocs_of_type
+from dfir.pagemap import page_map
+from dfir.enrichment import enrich_indicators
+from dfir.reputation_cache import ReputationCache, lookup_with_cache, LOCAL_PROVIDER
+from dfir import cidr
+from dfir import findings
+
+MEMORY_DUMP = "datasets/memory_dumps/hacking_case.raw"
+# One CIDR per line; matching addresses are reported as blocklisted
+IP_BLOCKLISTS = ["datasets/threat_intel/ip_blocklist.txt"]
+
+_ip_index = None
+
+_reputation_cache = None
+
+def reputation_provider():
+    """The configured reputation service URL, or the local stand-in"""
+    return os.environ.get("REPUTATION_URL") or LOCAL_PROVIDER
+
+def reputation_cache():
+    """Process-wide cache of the configured provider's verdicts, so repeat runs in one process stay in memory"""
+    global _reputation_cache
+    if _reputation_cache is None or _reputation_cache.provider != reputation_provider():
+        _reputation_cache = ReputationCache(provider=reputation_provider())
+    return _reputation_cache
+
+def ip_index():
+    """Process-wide CIDR index of private, reserved and blocklisted ranges"""
+    global _ip_index
+    if _ip_index is None:
+        _ip_index = cidr.build_index(IP_BLOCKLISTS)
+    return _ip_index
+
 def check_virustotal(ioc, ioc_type):
     """Check IOC against VirusTotal (simulated)"""
     # Simulate VirusTotal API response
     if ioc_type == "ip":
-        if "192.168" in ioc or "10.0" in ioc or "172.16" in ioc:
+        label = ip_index().classify_one(ioc)
+        if label == cidr.PRIVATE:
             return {"malicious": False, "detections": 0, "total": 70, "description": "Private IP address"}
+        elif label == cidr.RESERVED:
+            return {"malicious": False, "detections": 0, "total": 70, "description": "Reserved IP address"}
+        elif label == cidr.BLOCKLISTED:
+            return {"malicious": True, "detections": 70, "total": 70, "description": "Blocklisted IP range"}
         else:
             return {"malicious": True, "detections": 45, "total": 70, "description": "Known malicious IP"}
     elif ioc_type == "domain":
@@ -27,22 +67,37 @@ def check_virustotal(ioc, ioc_type):
         return {"malicious": True, "detections": 52, "total": 70, "description": "Known malware hash"}
     return {"malicious": False, "detections": 0, "total": 70, "description": "Unknown"}
 
-def analyze_threat_indicators():
+def lookup_reputation(indicators):
+    """Look up reputation for all indicators at once with the async enrichment engine"""
+    base_url = os.environ.get("REPUTATION_URL")
+    if base_url:
+        return enrich_indicators(indicators, base_url, api_key=os.environ.get("REPUTATION_API_KEY"))
+    
+    # No service configured: run the same engine against the local stand-in
+    from reputation_server import start_background_server
+    server, base_url = start_background_server()
+    try:
+        return enrich_indicators(indicators, base_url)
+    finally:
+        server.shutdown()
+
+def enrich_threat_indicators(indicators, cache=None):
+    """Enrich indicators, only looking up those not in the reputation cache"""
+    return lookup_with_cache(indicators, lookup_reputation, cache or reputation_cache())
+
+def analyze_threat_indicators(extraction=None):
     """Analyze real threat indicators from the memory dump"""
-    memory_dump = "datasets/memory_dumps/hacking_case.raw"
-    if not os.path.exists(memory_dump):
-        return []
-    
-    # Extract IPs from memory dump
-    cmd = f"strings {memory_dump} | grep -E '([0-9]{{1,3}}\\.){{3}}[0-9]{{1,3}}' | head -5"
-    import subprocess
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    if extraction is None:
+        if not os.path.exists(MEMORY_DUMP):
+            return []
+        # Shares the scan, page map and artifact index with the Volatility demo
+        extraction = extract_iocs(MEMORY_DUMP, pagemap=page_map(MEMORY_DUMP))
     
+    # Reputation lookups only apply to network and file-hash indicators
     indicators = []
-    if result.returncode == 0 and result.stdout.strip():
-        ips = [ip.strip() for ip in result.stdout.splitlines() if ip.strip()]
-        for ip in ips:
-            indicators.append({"type": "ip", "value": ip})
+    for ioc_type in ("ip", "domain", "hash"):
+        for ioc in iocs_of_type(extraction.iocs, ioc_type)[:5]:
+            indicators.append({"type": ioc.type, "value": ioc.value})
     
     # Add some common threat indicators for demonstration
     indicators.extend([
@@ -54,8 +109,15 @@ def analyze_threat_indicators():
     
     return indicators
 
-def run_real_misp_demo():
-    """Run real threat intelligence analysis"""
+def record_verdicts(store, source, indicators, results):
+    """Append one verdict row per looked-up indicator to the findings store"""
+    rows = [(indicator["type"], indicator["value"], bool(result["malicious"]), result["detections"],
+             result["total"], result["description"]) for indicator, result in zip(indicators, results)]
+    return store.append(findings.evidence_name(source), "indicator_verdicts", rows,
+                        columns=["type", "value", "malicious", "detections", "total", "description"])
+
+def run_real_misp_demo(extraction=None, store=None):
+    """Run real threat intelligence analysis, recording verdicts if given a store"""
     
     print("REAL THREAT INTELLIGENCE ANALYSIS")
     print("=" * 60)
@@ -67,7 +129,9 @@ def run_real_misp_demo():
     print("[1] EXTRACTING THREAT INDICATORS")
     print("-" * 60)
     
-    indicators = analyze_threat_indicators()
+    if extraction is None and os.path.exists(MEMORY_DUMP):
+        extraction = extract_iocs(MEMORY_DUMP, pagemap=page_map(MEMORY_DUMP))
+    indicators = analyze_threat_indicators(extraction)
     
     if not indicators:
         print("No indicators found in memory dump")
@@ -78,17 +142,35 @@ def run_real_misp_demo():
         print(f"  {i}. {indicator['type'].upper()}: {indicator['value']}")
     print()
     
+    # Bulk triage of every extracted IP, not just the ones sent for enrichment
+    if extraction is not None:
+        ips = [ioc.value for ioc in iocs_of_type(extraction.iocs, "ip")]
+        if ips:
+            triage = ip_index().triage(ips)
+            print("IP triage: " + ", ".join(f"{count} {label}" for label, count in triage.items() if count))
+            print()
+    
     # Analyze each indicator
     print("[2] THREAT INTELLIGENCE ANALYSIS")
     print("-" * 60)
     
+    # Check against threat intelligence: cached verdicts first, the rest
+    # looked up concurrently in batches
+    cache = reputation_cache()
+    results = enrich_threat_indicators(indicators, cache)
+    stats = cache.stats()
+    print(f"Reputation cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses")
+    if store is not None:
+        source = extraction.source if extraction is not None else MEMORY_DUMP
+        written = record_verdicts(store, source, indicators, results)
+        print(f"{written} verdicts recorded in {store.root} (case {store.case})")
+    print()
+    
     malicious_count = 0
-    for indicator in indicators:
+    for indicator, result in zip(indicators, results):
         print(f"Analyzing {indicator['type'].upper()}: {indicator['value']}")
         
-        # Check against threat intelligence
-        result = check_virustotal(indicator['value'], indicator['type'])
-        
         if result['malicious']:
             print(f"  [WARNING] MALICIOUS: {result['detections']}/{result['total']} detections")
             print(f"  Description: {result['description']}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Local Reputation Service Stand-in
+Serves the simulated VirusTotal verdicts over HTTP so enrichment can run offline
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from misp_demo import check_virustotal
+
+class ReputationHandler(BaseHTTPRequestHandler):
+    """Single and batch reputation endpoints with keep-alive support"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    batch_enabled = True
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = self.path.split("/")
+        if len(parts) != 6 or parts[1:4] != ["api", "v1", "reputation"]:
+            self.send_json(404, {"error": "not found"})
+            return
+        time.sleep(self.latency)
+        self.send_json(200, check_virustotal(unquote(parts[5]), unquote(parts[4])))
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/api/v1/reputation/batch" or not self.batch_enabled:
+            self.send_json(404, {"error": "not found"})
+            return
+        time.sleep(self.latency)
+        results = [check_virustotal(item["value"], item["type"]) for item in payload.get("indicators", [])]
+        self.send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        pass
+
+class ReputationServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for highly concurrent clients"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+def start_background_server(port=0, latency=0.0, batch_enabled=True):
+    """Start the stand-in on a daemon thread; returns (server, base_url)"""
+    handler = type("Handler", (ReputationHandler,), {"latency": latency, "batch_enabled": batch_enabled})
+    server = ReputationServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local reputation service stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per request")
+    parser.add_argument("--no-batch", action="store_true", help="disable the batch endpoint")
+    args = parser.parse_args()
+    handler = type("Handler", (ReputationHandler,), {"latency": args.latency, "batch_enabled": not args.no_batch})
+    print(f"Reputation stand-in listening on http://127.0.0.1:{args.port}")
+    ReputationServer(("127.0.0.1", args.port), handler).serve_forever()
+
+if __name__ == "__main__":
+    main()
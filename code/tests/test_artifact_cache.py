@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Artifact Cache Key Tests
+Fingerprints change with edits outside the sampled blocks and reuse the custody digest
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.artifact_cache import fingerprint, FINGERPRINT_SAMPLES, FINGERPRINT_SAMPLE_SIZE
+from dfir.custody import hash_evidence
+
+SIZE = 2 * FINGERPRINT_SAMPLES * FINGERPRINT_SAMPLE_SIZE
+
+class FingerprintTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "dump.raw")
+        self.manifest = os.path.join(self.directory.name, "manifest.json")
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * SIZE)
+        os.utime(self.path, ns=(10 ** 18, 10 ** 18))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rewrite_between_samples(self):
+        """Change one byte that no sampled block covers; the mtime moves as a real write would"""
+        with open(self.path, "r+b") as f:
+            f.seek(FINGERPRINT_SAMPLE_SIZE + 1)
+            f.write(b"\1")
+        os.utime(self.path, ns=(10 ** 18, 10 ** 18 + 1))
+
+    def test_edit_between_samples_changes_key(self):
+        before = fingerprint(self.path, manifest_path=self.manifest)
+        self.rewrite_between_samples()
+        self.assertNotEqual(fingerprint(self.path, manifest_path=self.manifest), before)
+
+    def test_custody_digest_is_reused(self):
+        sampled = fingerprint(self.path, manifest_path=self.manifest)
+        digests = hash_evidence([self.path], self.manifest, algorithms=('sha256',))[0].digests
+        self.assertEqual(fingerprint(self.path, manifest_path=self.manifest), f"sha256-{digests['sha256']}")
+        self.assertNotEqual(sampled, f"sha256-{digests['sha256']}")
+
+    def test_stale_custody_digest_is_ignored(self):
+        hash_evidence([self.path], self.manifest, algorithms=('sha256',))
+        hashed = fingerprint(self.path, manifest_path=self.manifest)
+        self.rewrite_between_samples()
+        self.assertNotEqual(fingerprint(self.path, manifest_path=self.manifest), hashed)
+
+if __name__ == "__main__":
+    unittest.main()
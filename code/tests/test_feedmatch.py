@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+IOC Feed Sweep Tests
+Token boundaries are checked against real neighbour bytes wherever blocks are cut
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.feedmatch import FeedMatcher, sweep_buffer, sweep_stream
+
+HASH = "d41d8cd98f00b204e9800998ecf8427e"
+ENTRIES = [("domain", "evil.com"), ("hash", HASH), ("string", "mimikatz")]
+
+# Hits only at the ones set off by non-token bytes
+DATA = (b"xevil.com|evil.com|evil.comx|evil.com.au|sub.evil.com|" + b"a" + HASH.encode() + b"|"
+        + HASH.encode() + b"f|" + HASH.encode() + b"|MIMIKATZ|evil.com")
+EXPECTED = [(DATA.index(b"|evil.com|") + 1, "domain", "evil.com"), (DATA.index(b"sub.") + 4, "domain", "evil.com"),
+            (DATA.index(b"|" + HASH.encode() + b"|") + 1, "hash", HASH),
+            (DATA.index(b"MIMIKATZ"), "string", "mimikatz"), (len(DATA) - 8, "domain", "evil.com")]
+
+class BoundaryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = FeedMatcher(ENTRIES)
+
+    def test_whole_buffer(self):
+        self.assertEqual([tuple(hit) for hit in sweep_buffer(DATA, self.matcher)], EXPECTED)
+
+    def test_every_block_size(self):
+        for block_size in range(1, len(DATA) + 1):
+            hits = [tuple(hit) for hit in sweep_buffer(DATA, self.matcher, block_size=block_size)]
+            self.assertEqual(hits, EXPECTED, f"block size {block_size}")
+
+    def test_ranges_starting_inside_a_token(self):
+        # As with page map ranges: the bytes before start are still the hit's neighbours
+        for start in range(len(DATA)):
+            hits = [tuple(hit) for hit in sweep_buffer(DATA, self.matcher, start)]
+            self.assertEqual(hits, [hit for hit in EXPECTED if hit[0] >= start], f"start {start}")
+
+    def test_every_stream_block_size(self):
+        for block_size in range(1, len(DATA) + 1):
+            hits = [tuple(hit) for hit in sweep_stream(io.BytesIO(DATA), self.matcher, block_size)]
+            self.assertEqual(hits, EXPECTED, f"block size {block_size}")
+
+if __name__ == "__main__":
+    unittest.main()
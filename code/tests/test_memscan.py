@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Memory Scanner Tests
+Strings crossing the edge of a page map's skipped runs are reported as in a full scan
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.memscan import scan_memory
+from dfir.pagemap import PAGE_SIZE, DEFAULT_MIN_SKIP, classify_pages
+
+CROSSING = b"TAILSTRING_cmd.exe"
+
+def unique_page(rng):
+    """A page of random non-printable bytes, distinct from every other"""
+    return bytes(rng.choice(range(0x80, 0x100)) for _ in range(PAGE_SIZE))
+
+def crossing_dump(path, tail=b"TAILSTRING_", head=b"cmd.exe"):
+    """Unique pages, then a duplicate run ending in tail, then a live page starting with head"""
+    rng = random.Random(7)
+    repeated = b"\x00" + unique_page(rng)[1:PAGE_SIZE - len(tail)] + tail
+    copies = DEFAULT_MIN_SKIP // PAGE_SIZE + 4
+    live = head + b"\x00" + unique_page(rng)[len(head) + 1:]
+    data = b"".join(unique_page(rng) for _ in range(3)) + repeated * copies + live
+    data += b"".join(unique_page(rng) for _ in range(3))
+    with open(path, "wb") as f:
+        f.write(data)
+    return 3 * PAGE_SIZE + copies * PAGE_SIZE - len(tail)
+
+class PageMapBoundaryTests(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".raw")
+        os.close(handle)
+        self.offset = crossing_dump(self.path)
+        self.pagemap = classify_pages(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def crossing(self, analysis):
+        return [(offset, text) for offset, text in analysis["strings"] if text.endswith("cmd.exe")]
+
+    def test_duplicate_run_is_skipped(self):
+        self.assertGreaterEqual(self.pagemap.summary()[3], DEFAULT_MIN_SKIP)
+
+    def test_string_out_of_skipped_run_matches_full_scan(self):
+        expected = [(self.offset, CROSSING.decode())]
+        self.assertEqual(self.crossing(scan_memory(self.path)), expected)
+        self.assertEqual(self.crossing(scan_memory(self.path, pagemap=self.pagemap)), expected)
+        self.assertIn(expected[0], scan_memory(self.path, pagemap=self.pagemap)["processes"])
+
+    def test_parallel_chunks_match_serial_scan(self):
+        serial = scan_memory(self.path, pagemap=self.pagemap)
+        for chunk_size in (PAGE_SIZE, 5 * PAGE_SIZE, 16 * PAGE_SIZE):
+            parallel = scan_memory(self.path, workers=2, chunk_size=chunk_size, pagemap=self.pagemap)
+            self.assertEqual(parallel, serial)
+
+    def test_string_starting_at_skipped_run(self):
+        # The repeated page first appears at page 0, so every later copy is skipped
+        rng = random.Random(3)
+        copies = DEFAULT_MIN_SKIP // PAGE_SIZE + 4
+        repeated = b"A" * PAGE_SIZE
+        data = repeated + unique_page(rng) + repeated * copies + b"TAIL\x00" + unique_page(rng)[5:]
+        with open(self.path, "wb") as f:
+            f.write(data)
+        pagemap = classify_pages(self.path)
+        self.assertGreaterEqual(pagemap.summary()[3], DEFAULT_MIN_SKIP)
+        full = scan_memory(self.path)["strings"]
+        mapped = scan_memory(self.path, pagemap=pagemap)["strings"]
+        self.assertEqual(mapped, full)
+        self.assertEqual([offset for offset, text in mapped if text.endswith("TAIL")], [2 * PAGE_SIZE])
+
+if __name__ == "__main__":
+    unittest.main()
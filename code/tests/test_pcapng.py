@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+pcapng Reader Tests
+Ranges planned for parallel parsing start with the interfaces declared before them
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.pcapng import (plan_ranges, read_buffer, iter_packets, CaptureStats, SECTION_HEADER,
+                         INTERFACE_DESCRIPTION, ENHANCED_PACKET, OPT_TSRESOL, OPT_END, LINKTYPE_ETHERNET,
+                         LINKTYPE_RAW)
+
+START = 1687444375
+
+def block(block_type, body):
+    body += b"\0" * (-len(body) % 4)
+    return struct.pack("<II", block_type, len(body) + 12) + body + struct.pack("<I", len(body) + 12)
+
+def interface(linktype, tsresol=None):
+    options = b""
+    if tsresol is not None:
+        options = struct.pack("<HHB", OPT_TSRESOL, 1, tsresol) + b"\0" * 3 + struct.pack("<HH", OPT_END, 0)
+    return block(INTERFACE_DESCRIPTION, struct.pack("<HHI", linktype, 0, 65535) + options)
+
+def packet(interface_id, ticks, frame):
+    return block(ENHANCED_PACKET, struct.pack("<IIIII", interface_id, ticks >> 32, ticks & 0xFFFFFFFF,
+                                              len(frame), len(frame)) + frame)
+
+def udp_ip(sport):
+    udp = struct.pack("!HHHH", sport, 53, 8, 0)
+    return struct.pack("!BBHHHBBH4s4s", 0x45, 0, 28, 0, 0, 64, 17, 0, bytes([10, 0, 0, 1]), bytes([8, 8, 8, 8])) + udp
+
+def capture():
+    """Ethernet packets in microseconds, then a second interface: raw IP in nanoseconds"""
+    ethernet = b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00"
+    data = block(SECTION_HEADER, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)) + interface(LINKTYPE_ETHERNET)
+    data += b"".join(packet(0, (START + i) * 10 ** 6, ethernet + udp_ip(1000 + i)) for i in range(4))
+    split = len(data)
+    data += interface(LINKTYPE_RAW, tsresol=9)
+    data += b"".join(packet(1, (START + 10 + i) * 10 ** 9, udp_ip(2000 + i)) for i in range(4))
+    return data, split
+
+class PlanRangesTests(unittest.TestCase):
+
+    def test_split_on_interface_description(self):
+        data, split = capture()
+        ranges = plan_ranges(data, chunk_size=split)
+        self.assertEqual([start for start, _, _ in ranges], [0, split])
+        self.assertEqual(len(ranges[1][2].interfaces), 1)
+
+        packets = [packet for start, end, section in ranges for packet in iter_packets(data, start, end, section)]
+        self.assertEqual(packets, list(iter_packets(data)))
+        self.assertEqual([round(p[0]) for p in packets[4:]], [START + 10 + i for i in range(4)])
+        self.assertEqual({p[2] for p in packets[4:]}, {LINKTYPE_RAW})
+
+    def test_ranges_merge_to_whole_capture(self):
+        data, split = capture()
+        for chunk_size in range(1, len(data) + 1, 16):
+            merged = CaptureStats()
+            for start, end, section in plan_ranges(data, chunk_size):
+                merged.merge(read_buffer(data, start, end, section))
+            whole = read_buffer(data)
+            self.assertEqual((merged.packets, merged.first, merged.last, merged.paths),
+                             (whole.packets, whole.first, whole.last, whole.paths), f"chunk size {chunk_size}")
+
+if __name__ == "__main__":
+    unittest.main()
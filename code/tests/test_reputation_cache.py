@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Reputation Cache Tests
+Verdicts are kept per provider and failed lookups are never cached
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.enrichment import UNKNOWN
+from dfir.reputation_cache import ReputationCache, lookup_with_cache, LOCAL_PROVIDER
+
+HASH = "D41D8CD98F00B204E9800998ECF8427E"
+VERDICT = {"malicious": True, "detections": 52, "total": 70, "description": "Known malware hash"}
+
+class ProviderKeyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "reputation.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_other_provider_is_a_miss(self):
+        with ReputationCache(self.path) as local:
+            local.put("hash", HASH, VERDICT)
+        with ReputationCache(self.path, provider="https://intel.example/api") as remote:
+            self.assertIsNone(remote.get("hash", HASH))
+        with ReputationCache(self.path, provider=LOCAL_PROVIDER) as local:
+            self.assertEqual(local.get("hash", HASH.lower()), VERDICT)
+
+    def test_invalidate_keeps_other_providers(self):
+        with ReputationCache(self.path) as local, ReputationCache(self.path, provider="remote") as remote:
+            local.put("hash", HASH, VERDICT)
+            remote.put("hash", HASH, VERDICT)
+            remote.invalidate()
+            self.assertIsNone(ReputationCache(self.path, provider="remote").get("hash", HASH))
+            self.assertEqual(ReputationCache(self.path).get("hash", HASH), VERDICT)
+
+    def test_failed_lookup_is_not_cached(self):
+        calls = []
+
+        def lookup(indicators):
+            calls.append(len(indicators))
+            return [dict(UNKNOWN) for _ in indicators]
+
+        with ReputationCache(self.path) as cache:
+            indicators = [{"type": "hash", "value": HASH}]
+            self.assertEqual(lookup_with_cache(indicators, lookup, cache), [UNKNOWN])
+            self.assertEqual(lookup_with_cache(indicators, lookup, cache), [UNKNOWN])
+            self.assertEqual(calls, [1, 1])
+            self.assertEqual(cache.counters["stores"], 0)
+
+    def test_table_without_provider_is_replaced(self):
+        db = sqlite3.connect(self.path)
+        db.execute("CREATE TABLE reputation (ioc_type TEXT, value TEXT, result TEXT, negative INTEGER, "
+                   "expires REAL, PRIMARY KEY (ioc_type, value))")
+        db.execute("INSERT INTO reputation VALUES ('hash', ?, '{}', 0, 1e12)", (HASH.lower(),))
+        db.commit()
+        db.close()
+        with ReputationCache(self.path) as cache:
+            self.assertIsNone(cache.get("hash", HASH))
+            cache.put("hash", HASH, VERDICT)
+            self.assertEqual(cache.get("hash", HASH), VERDICT)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Streaming Command Runner Tests
+The idle timeout follows the command's output, not how fast the caller consumes it
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.runner import iter_command, OK, TIMEOUT
+
+class IdleTimeoutTests(unittest.TestCase):
+
+    def test_slow_consumer_is_not_idle(self):
+        outcome = {}
+        lines = []
+        for line in iter_command([sys.executable, "-c", "print(1); print(2); print(3)"],
+                                 idle_timeout=0.3, outcome=outcome):
+            lines.append(line)
+            time.sleep(0.6)
+        self.assertEqual(lines, ["1", "2", "3"])
+        self.assertEqual(outcome["status"], OK)
+        self.assertEqual(outcome["returncode"], 0)
+
+    def test_silent_command_times_out(self):
+        outcome = {}
+        started = time.monotonic()
+        lines = list(iter_command([sys.executable, "-c", "import time; print(1, flush=True); time.sleep(30)"],
+                                  idle_timeout=0.3, outcome=outcome))
+        self.assertEqual(lines, ["1"])
+        self.assertEqual(outcome["status"], TIMEOUT)
+        self.assertLess(time.monotonic() - started, 10)
+
+if __name__ == "__main__":
+    unittest.main()
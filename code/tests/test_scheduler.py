@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Phase Scheduler Tests
+Timeouts on bounded pools: queued time is not counted and timed out attempts never run twice
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.scheduler import Phase, run_phases, OK, TIMEOUT
+
+def sleeper(name, seconds, ran):
+    """Phase action that records its name, then sleeps"""
+    def action(inputs):
+        ran.append(name)
+        time.sleep(seconds)
+        return name
+    return action
+
+class TimeoutTests(unittest.TestCase):
+
+    def test_queued_phase_is_timed_from_start(self):
+        ran = []
+        phases = [
+            Phase("slow", sleeper("slow", 0.6, ran), pool="cpu"),
+            Phase("quick", sleeper("quick", 0.05, ran), pool="cpu", timeout=0.3, retries=1),
+        ]
+        results = run_phases(phases, pools={"cpu": 1}, capture_output=False)
+        self.assertEqual(results["quick"].status, OK)
+        self.assertEqual(results["quick"].attempts, 1)
+        self.assertEqual(ran, ["slow", "quick"])
+
+    def test_running_attempt_is_not_retried(self):
+        ran = []
+        phases = [Phase("hang", sleeper("hang", 0.5, ran), pool="cpu", timeout=0.1, retries=2)]
+        results = run_phases(phases, pools={"cpu": 1}, capture_output=False)
+        time.sleep(0.6)
+        self.assertEqual(results["hang"].status, TIMEOUT)
+        self.assertEqual(results["hang"].attempts, 1)
+        self.assertEqual(ran, ["hang"])
+
+if __name__ == "__main__":
+    unittest.main()
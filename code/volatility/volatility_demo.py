@@ -4,153 +4,372 @@ Real Volatility Memory Analysis Demo
 Actually extracts and analyzes real data from the memory dump
 """
 
-import subprocess
+import argparse
+import json
 import os
 import sys
 import time
-import re
+from datetime import datetime, timezone
 
-def run_command(command):
-    """Run command and return output"""
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=30)
-        return result.stdout, result.stderr, result.returncode
-    except Exception as e:
-        return "", str(e), 1
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dfir.memscan import scan_memory, CATEGORIES, DEFAULT_LIMITS
+from dfir.artifact_cache import ArtifactCache, fingerprint
+from dfir.ioc import extract_iocs, IOC_TYPES
+from dfir.feedmatch import compile_feed, sweep_memory
+from dfir import yarascan
+from dfir import proccarve
+from dfir import volrunner
+from dfir import entropy
+from dfir.pagemap import page_map
+from dfir import findings
+from dfir import runner
 
-def extract_strings_from_memory():
+MEMORY_DUMP = "datasets/memory_dumps/hacking_case.raw"
+IOC_FEED = "datasets/threat_intel/ioc_feed.txt"
+YARA_RULES = "datasets/threat_intel/yara"
+
+def run_command(command, limit=None):
+    """Run command, streaming its output, and return (stdout, stderr, returncode)"""
+    return runner.run_command(command, limit=limit)
+
+def extract_strings_from_memory(memory_dump=MEMORY_DUMP, workers=1, pagemap=None):
     """Extract readable strings from memory dump"""
-    memory_dump = "datasets/memory_dumps/hacking_case.raw"
     if not os.path.exists(memory_dump):
         return []
     
-    # Use strings command to extract readable text
-    cmd = f"strings {memory_dump} | head -100"
-    stdout, stderr, returncode = run_command(cmd)
-    
-    if returncode == 0 and stdout.strip():
-        return stdout.splitlines()
-    return []
+    limits = {category: 0 for category in CATEGORIES}
+    limits['strings'] = 100
+    analysis = scan_memory(memory_dump, limits=limits, workers=workers, pagemap=pagemap)
+    return [text for offset, text in analysis['strings']]
 
-def analyze_memory_content():
+def analyze_memory_content(memory_dump=MEMORY_DUMP, workers=1, extraction=None, pagemap=None):
     """Analyze memory content for forensic artifacts"""
-    memory_dump = "datasets/memory_dumps/hacking_case.raw"
-    if not os.path.exists(memory_dump):
-        return {}
-    
-    analysis = {}
+    if extraction is None:
+        if not os.path.exists(memory_dump):
+            return {}
+        # One mmap pass extracts strings and classifies processes, IPs, paths and registry keys.
+        # Large images are split into overlapping chunks across a process pool;
+        # unchanged dumps are served from the on-disk artifact index
+        extraction = extract_iocs(memory_dump, DEFAULT_LIMITS, workers, pagemap)
     
-    # Look for Windows processes
-    cmd = f"strings {memory_dump} | grep -i '\.exe' | head -20"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        analysis['processes'] = [line.strip() for line in stdout.splitlines() if line.strip()]
-    
-    # Look for network connections
-    cmd = f"strings {memory_dump} | grep -E '([0-9]{{1,3}}\\.){{3}}[0-9]{{1,3}}' | head -10"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        analysis['ips'] = [line.strip() for line in stdout.splitlines() if line.strip()]
-    
-    # Look for file paths
-    cmd = f"strings {memory_dump} | grep -E 'C:\\\\|/Windows/|/System32/' | head -15"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        analysis['files'] = [line.strip() for line in stdout.splitlines() if line.strip()]
-    
-    # Look for registry keys
-    cmd = f"strings {memory_dump} | grep -E 'HKEY_|SOFTWARE\\\\|SYSTEM\\\\' | head -10"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        analysis['registry'] = [line.strip() for line in stdout.splitlines() if line.strip()]
-    
-    return analysis
+    return {category: hits for category, hits in extraction.analysis.items() if hits}
+
+def sweep_ioc_feed(memory_dump=MEMORY_DUMP, feed=IOC_FEED, workers=1, pagemap=None):
+    """Find every known-bad feed entry in the dump in one pass"""
+    if not os.path.isfile(memory_dump) or not os.path.exists(feed):
+        return None
+    return sweep_memory(memory_dump, compile_feed(feed), workers, pagemap=pagemap)
 
-def run_real_volatility_analysis():
-    """Run real memory analysis on actual memory dump"""
+def carve_process_list(memory_dump=MEMORY_DUMP, workers=1, pagemap=None):
+    """Real process list from EPROCESS structures carved out of the raw image"""
+    if not os.path.isfile(memory_dump):
+        return None
+    return proccarve.carve_processes(memory_dump, workers, pagemap=pagemap)
+
+def scan_yara_rules(memory_dump=MEMORY_DUMP, rules=YARA_RULES, workers=1, pagemap=None):
+    """Match the YARA rule set against the dump across the scan workers"""
+    if not yarascan.available() or not os.path.isfile(memory_dump) or not os.path.exists(rules):
+        return None
+    return yarascan.scan_memory(memory_dump, yarascan.compile_rules(rules), workers, pagemap=pagemap)
+
+def run_volatility_plugins(memory_dump=MEMORY_DUMP, plugins=volrunner.DEFAULT_PLUGINS, workers=volrunner.DEFAULT_WORKERS):
+    """Run Volatility 3 plugins in-process over one shared context; cached per dump and plugin version"""
+    if not volrunner.available() or not plugins or not os.path.isfile(memory_dump):
+        return None
+    return volrunner.VolatilityRunner(memory_dump).run_all(plugins, workers)
+
+def map_block_entropy(memory_dump=MEMORY_DUMP, workers=1):
+    """Per-4 KiB entropy of the dump and its high-entropy regions; the map is cached per dump"""
+    if not os.path.isfile(memory_dump):
+        return None, []
+    emap = entropy.entropy_map(memory_dump, workers)
+    return emap, entropy.high_entropy_regions(emap) if emap is not None else []
+
+def print_plugin_rows(result, columns, limit):
+    """Print the first rows of a plugin result, restricted to the named columns it has"""
+    indexes = [result.columns.index(column) for column in columns if column in result.columns]
+    for row in result.rows[:limit]:
+        print("  • " + "  ".join(str(row[i]) for i in indexes))
+
+def record_findings(store, memory_dump, extraction, processes, feed_hits, yara_matches, plugin_results=None,
+                    regions=None):
+    """Append the carved processes, artifacts, IOCs, feed hits, YARA matches, plugin output and entropy regions to the findings store"""
+    evidence = findings.evidence_name(memory_dump)
+    written = store.append(evidence, "processes", processes or [])
+    written += store.append(evidence, "memory_artifacts", findings.analysis_rows(extraction.analysis))
+    written += store.append(evidence, "iocs", extraction.iocs)
+    written += store.append(evidence, "feed_hits", feed_hits or [], columns=["offset", "type", "value"])
+    written += store.append(evidence, "yara_matches",
+                            [match._replace(tags=",".join(match.tags), meta=json.dumps(match.meta, default=str))
+                             for match in yara_matches or []])
+    for result in plugin_results or []:
+        if result.error is None:
+            written += store.append(evidence, "vol_" + volrunner.short_name(result.plugin), result.rows,
+                                    columns=result.columns)
+    written += store.append(evidence, "entropy_regions", regions or [], columns=list(entropy.Region._fields))
+    return written
+
+def run_real_volatility_analysis(memory_dump=MEMORY_DUMP, workers=1, extraction=None, feed=IOC_FEED, store=None,
+                                 rules=YARA_RULES, plugins=volrunner.DEFAULT_PLUGINS):
+    """Run real memory analysis on actual memory dump, recording findings if given a store
+
+    Returns the carved process list, or None if the dump is not on disk.
+    """
+    if extraction is not None:
+        memory_dump = extraction.source
     
     print("REAL MEMORY FORENSICS ANALYSIS")
     print("=" * 60)
     
-    # Check if memory dump exists
-    memory_dump = "datasets/memory_dumps/hacking_case.raw"
-    if not os.path.exists(memory_dump):
+    # Check if memory dump exists (an extraction may also come from an archive stream)
+    if extraction is None and not os.path.exists(memory_dump):
         print(f"ERROR: Memory dump not found: {memory_dump}")
         return
     
+    size = extraction.size if extraction is not None else os.path.getsize(memory_dump)
     print(f"Analyzing real memory dump: {memory_dump}")
-    print(f"File size: {os.path.getsize(memory_dump) / (1024*1024):.1f} MB")
+    print(f"File size: {size / (1024*1024):.1f} MB")
+    print(f"Scan workers: {workers}")
+    
+    # Zero and duplicate pages are classified once, stored next to the dump,
+    # and left out of every scan below
+    pagemap = page_map(memory_dump, workers) if os.path.isfile(memory_dump) else None
+    if pagemap is not None:
+        pages, zero, duplicate, skipped = pagemap.summary()
+        print(f"Page map: {pages} pages, {zero} zero, {duplicate} duplicate "
+              f"({skipped / (1024*1024):.1f} MB not scanned)")
     print()
     
     # Extract and analyze real data
     print("[1] EXTRACTING FORENSIC ARTIFACTS")
     print("-" * 60)
     
-    analysis = analyze_memory_content()
+    # Process list first: the pool-tag carve only touches one word per 16 bytes
+    start = time.time()
+    processes = carve_process_list(memory_dump, workers, pagemap)
+    if processes is None:
+        print("Process carving skipped (needs an on-disk dump)")
+        print()
+    elif processes:
+        print(f"[SUCCESS] DISCOVERED PROCESSES ({len(processes)} EPROCESS carved in {time.time() - start:.2f}s):")
+        print(f"  {'PID':>6} {'PPID':>6}  {'Created (UTC)':<19}  {'Offset':<10}  Name")
+        for depth, process in proccarve.process_tree(processes)[:20]:
+            created = datetime.fromtimestamp(process.create_time, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"  {process.pid:>6} {process.ppid:>6}  {created}  0x{process.offset:08x}  "
+                  f"{'  ' * depth}{process.name}")
+        print()
+    else:
+        print("No EPROCESS structures carved (unsupported Windows build or not a Windows image)")
+        print()
+    
+    if extraction is None:
+        extraction = extract_iocs(memory_dump, DEFAULT_LIMITS, workers, pagemap)
+    analysis = analyze_memory_content(extraction=extraction)
     
     if analysis.get('processes'):
-        print("[SUCCESS] DISCOVERED PROCESSES:")
-        for proc in analysis['processes'][:10]:
-            print(f"  • {proc}")
+        print("EXECUTABLE REFERENCES (strings):")
+        for offset, proc in analysis['processes'][:10]:
+            print(f"  • 0x{offset:08x}  {proc}")
         print()
     
     if analysis.get('ips'):
         print("NETWORK ADDRESSES:")
-        for ip in analysis['ips'][:5]:
-            print(f"  • {ip}")
+        for offset, ip in analysis['ips'][:5]:
+            print(f"  • 0x{offset:08x}  {ip}")
         print()
     
     if analysis.get('files'):
         print("[SUCCESS] FILE SYSTEM ARTIFACTS:")
-        for file in analysis['files'][:8]:
-            print(f"  • {file}")
+        for offset, file in analysis['files'][:8]:
+            print(f"  • 0x{offset:08x}  {file}")
         print()
     
     if analysis.get('registry'):
         print("REGISTRY KEYS:")
-        for reg in analysis['registry'][:5]:
-            print(f"  • {reg}")
+        for offset, reg in analysis['registry'][:5]:
+            print(f"  • 0x{offset:08x}  {reg}")
         print()
     
-    # Show memory dump structure
-    print("[2] MEMORY DUMP STRUCTURE ANALYSIS")
+    # Reverse lookup: known-bad feed entries anywhere in the image
+    print("[2] IOC FEED SWEEP")
     print("-" * 60)
     
-    # Get file type information
-    cmd = f"file {memory_dump}"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0:
-        print(f"File type: {stdout.strip()}")
+    start = time.time()
+    feed_hits = sweep_ioc_feed(memory_dump, feed, workers, pagemap)
+    if feed_hits is None:
+        print(f"Feed sweep skipped (needs {feed} and an on-disk dump)")
+    else:
+        print(f"{len(feed_hits)} feed hits in {time.time() - start:.2f}s:")
+        for offset, ioc_type, value in feed_hits[:10]:
+            print(f"  • 0x{offset:08x}  {ioc_type.upper()}: {value}")
+    print()
+    
+    # Malware detection: YARA rules over memory-mapped chunks of the dump
+    print("[3] YARA MALWARE SCAN")
+    print("-" * 60)
+    
+    start = time.time()
+    yara_matches = None
+    if not yarascan.available():
+        print("YARA scan skipped (yara-python not installed)")
+    else:
+        try:
+            yara_matches = scan_yara_rules(memory_dump, rules, workers, pagemap)
+        except (ValueError, yarascan.yara.Error) as e:
+            print(f"YARA scan failed: {e}")
+        else:
+            if yara_matches is None:
+                print(f"YARA scan skipped (needs rules in {rules} and an on-disk dump)")
+            else:
+                summary = yarascan.rule_summary(yara_matches)
+                print(f"{len(summary)} rules matched ({len(yara_matches)} string hits) in {time.time() - start:.2f}s:")
+                for (namespace, rule), (first, hits, meta) in list(summary.items())[:10]:
+                    description = meta.get("description", "")
+                    print(f"  • 0x{first:08x}  {namespace}.{rule}: {hits} hits  {description}".rstrip())
+    print()
     
-    # Show hexdump of header
-    cmd = f"hexdump -C {memory_dump} | head -5"
-    stdout, stderr, returncode = run_command(cmd)
-    if returncode == 0:
-        print("\nMemory dump header (first 80 bytes):")
-        print(stdout)
+    # Structured analysis: Volatility plugins in this process, sharing one context
+    print("[4] VOLATILITY 3 PLUGINS")
+    print("-" * 60)
+    
+    start = time.time()
+    plugin_results = None
+    if not volrunner.available():
+        print("Volatility plugins skipped (volatility3 not installed)")
+    elif not plugins:
+        print("Volatility plugins skipped (none selected)")
+    else:
+        plugin_results = run_volatility_plugins(memory_dump, plugins)
+        if plugin_results is None:
+            print("Volatility plugins skipped (needs an on-disk dump)")
+        else:
+            print(f"{len(plugin_results)} plugins in {time.time() - start:.2f}s:")
+            for result in plugin_results:
+                name = volrunner.short_name(result.plugin)
+                if result.error:
+                    print(f"  • {name:<10} failed: {result.error}")
+                else:
+                    source = " (cached)" if result.cached else ""
+                    print(f"  • {name:<10} {len(result.rows):>6} rows  {result.elapsed:.2f}s{source}")
+            by_name = {volrunner.short_name(result.plugin): result for result in plugin_results if not result.error}
+            if by_name.get("pslist") and by_name["pslist"].rows:
+                print("\nActive process list (pslist):")
+                print_plugin_rows(by_name["pslist"], ["PID", "PPID", "ImageFileName", "CreateTime"], 10)
+            if by_name.get("netscan") and by_name["netscan"].rows:
+                print("\nNetwork connections (netscan):")
+                print_plugin_rows(by_name["netscan"], ["Proto", "LocalAddr", "LocalPort", "ForeignAddr",
+                                                       "ForeignPort", "State", "Owner"], 10)
+    print()
+    
+    # Show memory dump structure
+    print("[5] MEMORY DUMP STRUCTURE ANALYSIS")
+    print("-" * 60)
+    
+    regions = []
+    if not os.path.isfile(memory_dump):
+        print(f"Streamed from archive: {memory_dump}")
+        print()
+    else:
+        # Get file type information
+        stdout, stderr, returncode = run_command(["file", memory_dump])
+        if returncode == 0:
+            print(f"File type: {stdout.strip()}")
+        
+        # Block entropy over the whole image: packed, encrypted and
+        # compressed memory stands out as bright runs anywhere in the image
+        start = time.time()
+        emap, regions = map_block_entropy(memory_dump, workers)
+        if emap is not None:
+            zero, low, mid, high = entropy.summary(emap)
+            print(f"\nBlock entropy ({len(emap.entropy)} x {emap.block_size // 1024} KiB blocks) "
+                  f"in {time.time() - start:.2f}s:")
+            print(f"  {zero} zero, {low} low (<3), {mid} mid, {high} high (>={entropy.HIGH_ENTROPY}) bits/byte")
+            print(f"  Shading '{entropy.SHADES}' = 0..8 bits/byte, mean per cell:")
+            for line in entropy.text_overview(emap):
+                print("  " + line)
+            if regions:
+                print(f"\n{len(regions)} high-entropy regions (candidates for packed or encrypted content), largest first:")
+                for region in sorted(regions, key=lambda r: r.start - r.end)[:10]:
+                    print(f"  0x{region.start:010x}-0x{region.end:010x} "
+                          f"{(region.end - region.start) // 1024:>8} KiB  mean {region.mean:.2f}  "
+                          f"peak {region.peak:.2f}")
+            image = os.path.join(entropy.DEFAULT_CACHE_DIR, os.path.basename(memory_dump) + ".png")
+            if entropy.render_overview(emap, image, regions, os.path.basename(memory_dump)):
+                print(f"\nEntropy heatmap written to {image}")
+            else:
+                print("\nmatplotlib not installed: entropy heatmap image skipped")
+        print()
     
     # Forensic analysis summary
-    print("[3] FORENSIC ANALYSIS SUMMARY")
+    print("[6] FORENSIC ANALYSIS SUMMARY")
     print("-" * 60)
     print("Real forensic artifacts extracted:")
-    print(f"  • {len(analysis.get('processes', []))} process references")
+    if processes is not None:
+        print(f"  • {len(processes)} processes carved from EPROCESS structures")
+    print(f"  • {len(analysis.get('processes', []))} executable references")
     print(f"  • {len(analysis.get('ips', []))} network addresses")
     print(f"  • {len(analysis.get('files', []))} file system paths")
     print(f"  • {len(analysis.get('registry', []))} registry keys")
+    for ioc_type in IOC_TYPES:
+        count = sum(1 for ioc in extraction.iocs if ioc.type == ioc_type)
+        print(f"  • {count} {ioc_type} indicators")
+    if feed_hits:
+        print(f"  • {len(feed_hits)} known-bad feed hits")
+    if yara_matches:
+        print(f"  • {len(yarascan.rule_summary(yara_matches))} YARA rules matched")
+    if plugin_results:
+        succeeded = [result for result in plugin_results if not result.error]
+        print(f"  • {len(succeeded)}/{len(plugin_results)} Volatility plugins completed")
+    if regions:
+        print(f"  • {len(regions)} high-entropy regions flagged for deeper scans")
+    if store is not None:
+        written = record_findings(store, memory_dump, extraction, processes, feed_hits, yara_matches,
+                                  plugin_results, regions)
+        print(f"  • {written} rows recorded in {store.root} (case {store.case})")
     print()
     print("This demonstrates real memory forensics capabilities:")
     print("  • Extracting process information from memory")
     print("  • Identifying network communication patterns")
     print("  • Discovering file system access")
     print("  • Analyzing registry modifications")
+    print("  • Matching YARA malware rules against memory")
+    print("  • Running Volatility 3 plugins over one shared memory context")
+    print("  • Mapping block entropy to locate packed or encrypted memory")
     print("  • Detecting system activity patterns")
     
     print()
     print("Real memory forensics analysis completed!")
     print("This shows actual data extraction from a real memory dump.")
+    return processes
 
 def main():
-    run_real_volatility_analysis()
+    parser = argparse.ArgumentParser(description="Real memory forensics analysis")
+    parser.add_argument("memory_dump", nargs="?", default=MEMORY_DUMP, help="memory image to analyze")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="scan processes for chunked analysis of large images")
+    parser.add_argument("--feed", default=IOC_FEED, help="IOC feed to sweep the dump against")
+    parser.add_argument("--rules", default=YARA_RULES, help="YARA rule file or directory of .yar files")
+    parser.add_argument("--plugins", nargs="*", default=volrunner.DEFAULT_PLUGINS,
+                        help="Volatility 3 plugins to run in-process (none to skip)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="invalidate cached artifacts for this dump and rescan")
+    parser.add_argument("--case", help="record findings in the Parquet findings store under this case")
+    args = parser.parse_args()
+    if args.refresh and os.path.exists(args.memory_dump):
+        key = fingerprint(args.memory_dump)
+        with ArtifactCache() as cache:
+            cache.invalidate(key)
+        volrunner.invalidate(key)
+        page_map(args.memory_dump, args.workers, refresh=True)
+        entropy.entropy_map(args.memory_dump, args.workers, refresh=True)
+    store = None
+    if args.case:
+        if findings.available():
+            store = findings.FindingsStore(case=args.case)
+        else:
+            print("pyarrow not installed: findings will not be recorded")
+    run_real_volatility_analysis(args.memory_dump, args.workers, feed=args.feed, store=store, rules=args.rules,
+                                 plugins=args.plugins)
 
 if __name__ == "__main__":
     main()